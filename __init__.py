@@ -1,8 +1,17 @@
 import os
-import pandas as pd
-import matplotlib
-matplotlib.use("Agg")  # headless backend for Windows
-from .computation_engine import run_pipeline as original_run_pipeline, conn
+from .computation_engine import (
+    run_pipeline as original_run_pipeline,
+    run_pipeline_streaming,
+    resolve_outputs,
+    CHART_ARTIFACTS,
+    SENSOR_COLUMN,
+    ARCHIVE_AVAILABLE,
+    get_history as engine_get_history,
+)
+from . import profiling
+from .artifacts import (
+    hash_file, run_dir, lookup_run, record_run, evict_runs, ensure_artifact, was_ingested,
+)
 
 # Base paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -11,68 +20,110 @@ CHART_DIR  = os.path.join(BASE_DIR, "static", "charts")
 os.makedirs(REPORT_DIR, exist_ok=True)
 os.makedirs(CHART_DIR, exist_ok=True)
 
-def run_pipeline_on_uploaded_csv(csv_path: str):
+# Files larger than this are processed chunk by chunk instead of in memory
+STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+STREAMING_CHUNKSIZE = 100_000
+
+# Rendered during the run; everything else is rendered lazily on first request.
+# The processed CSV is always written: it is the run's stored results. The
+# Parquet copy (columnar archive tier) is written too when pyarrow is installed.
+EAGER_OUTPUTS = ("csv",) + (("parquet",) if ARCHIVE_AVAILABLE else ())
+
+ALERT_COLUMNS = ["measured", "anomaly", "alert", "maintenance"]
+
+def _latest_alerts(last_row):
+    """Alerts: latest row summary."""
+    if last_row is None:
+        return []
+    columns = ALERT_COLUMNS + ([SENSOR_COLUMN] if SENSOR_COLUMN in last_row.columns else [])
+    return last_row.reindex(columns=columns).to_dict(orient="records")
+
+def _build_result(run_id, artifacts, alerts):
+    return {
+    "run_id": run_id,
+    "artifacts": artifacts,
+    "processed_csv": artifacts.get("csv"),
+    "report_files": {k: artifacts[k] for k in ("csv", "excel", "pdf") if k in artifacts},
+    "alerts": alerts,
+    "chart_files": {k: artifacts[k] for k in CHART_ARTIFACTS if k in artifacts},
+    }
+
+def run_pipeline_on_uploaded_csv(csv_path: str, chunksize: int = None, progress=None,
+                                 run_id: str = None, outputs=None, incremental: bool = False):
+    """
+    Profiled _run_uploaded_csv: the result also carries "timings", the
+    per-stage breakdown (see profiling.py), which is not cached with the run.
+    """
+    with profiling.profile_run(run_id) as profile:
+        result = _run_uploaded_csv(csv_path, chunksize=chunksize, progress=progress, run_id=run_id,
+                                  outputs=outputs, incremental=incremental)
+    return {**result, "timings": profile.timings}
+
+def _run_uploaded_csv(csv_path: str, chunksize: int = None, progress=None,
+                      run_id: str = None, outputs=None, incremental: bool = False):
     """
     Runs computation pipeline on uploaded CSV.
-    Saves processed CSV, Excel, PDF, charts for frontend access.
+    Saves the processed CSV plus any extra report artifacts requested in
+    `outputs` (see REPORT_ARTIFACTS; defaults to EAGER_OUTPUTS). Artifacts
+    not rendered here are produced on demand by ensure_artifact.
     Returns dict with file paths and alerts.
+    Large files (or an explicit chunksize) use the chunked streaming pipeline.
+    progress(stage, fraction) is called as the pipeline moves between stages.
+
+    Artifacts go to static/runs/<run_id>, where run_id defaults to the CSV's
+    SHA-256. An identical CSV that was already processed returns the cached
+    result without recomputation; missing artifacts are rendered from the
+    stored results. If its run was evicted, the reports are rendered again
+    but its readings, already stored, are not.
+
+    incremental=True continues every sensor's series from the state saved by
+    its previous incremental upload (see load_stream_state). Those runs are
+    cached under "<run_id>-incremental", apart from standalone runs.
     """
+    outputs = resolve_outputs(EAGER_OUTPUTS + tuple(outputs if outputs is not None else ()))
+    run_id = run_id or hash_file(csv_path)
+    if incremental:
+        run_id += "-incremental"
+    cached = lookup_run(run_id)
+    if cached is not None and "csv" in cached.get("artifacts", {}):
+        artifacts = dict(cached["artifacts"])
+        for name in outputs:
+            if name not in artifacts:
+                artifacts[name] = ensure_artifact(run_id, name)
+        artifacts = {k: v for k, v in artifacts.items() if v}
+        if artifacts != cached["artifacts"]:
+            cached = _build_result(run_id, artifacts, cached["alerts"])
+            record_run(run_id, cached)
+        return {**cached, "cached": True}
+
+    out_dir = run_dir(run_id)
+    save_readings = not was_ingested(run_id)
+    if chunksize is None and os.path.getsize(csv_path) > STREAMING_THRESHOLD_BYTES:
+        chunksize = STREAMING_CHUNKSIZE
     try:
-        df = original_run_pipeline(csv_path)
+        if chunksize:
+            last_row, artifacts = run_pipeline_streaming(
+                csv_path, chunksize=chunksize, progress=progress, out_dir=out_dir, outputs=outputs,
+                incremental=incremental, save_readings=save_readings)
+        else:
+            df, artifacts = original_run_pipeline(
+                csv_path, progress=progress, out_dir=out_dir, outputs=outputs,
+                incremental=incremental, save_readings=save_readings)
+            last_row = df.tail(1)
     except KeyError as e:
         # CSV missing expected columns
         raise Exception(f"CSV is missing required column: {e}")
 
-    # Save reports
-    csv_file = os.path.join(REPORT_DIR, "latest_processed.csv")
-    excel_file = os.path.join(REPORT_DIR, "latest_processed.xlsx")
-    pdf_file = os.path.join(REPORT_DIR, "latest_report.pdf")
-
-    df.to_csv(csv_file, index=False)
-    df.to_excel(excel_file, index=False)
-
-    # Charts
-    import matplotlib.pyplot as plt
-
-    # Drift
-    drift_chart = os.path.join(CHART_DIR, "drift.png")
-    plt.figure()
-    if "drift" in df.columns:
-        df["drift"].plot(title="Drift Over Time")
-    plt.savefig(drift_chart)
-    plt.close()
-
-    # RUL & Health
-    rul_chart = os.path.join(CHART_DIR, "rul_health.png")
-    plt.figure()
-    cols = [c for c in ["rul_days", "health"] if c in df.columns]
-    if cols:
-        df[cols].plot(title="RUL & Health")
-    plt.savefig(rul_chart)
-    plt.close()
-
-    # Alerts: latest row summary
-    alerts = []
-    for col in ["measured", "anomaly", "alert", "maintenance"]:
-        if col not in df.columns:
-            df[col] = None
-    alerts = df[["measured", "anomaly", "alert", "maintenance"]].tail(1).to_dict(orient="records")
-
-    return {
-    "processed_csv": csv_file,
-    "report_files": {"csv": csv_file, "excel": excel_file, "pdf": pdf_file},
-    "alerts": alerts,
-    "chart_files": {"drift": drift_chart, "rul_health": rul_chart}
-    }
+    result = _build_result(run_id, artifacts, _latest_alerts(last_row))
+    record_run(run_id, result)
+    evict_runs(keep=(run_id,))
+    return {**result, "cached": False}
 
 
 
-def get_history(limit: int = 200):
+def get_history(limit: int = 200, sensor_id: str = None):
     """
-    Returns last 'limit' rows from SQLite as pandas DataFrame
+    Returns last 'limit' rows from SQLite as pandas DataFrame,
+    optionally for a single sensor
     """
-    import sqlite3
-    from .computation_engine import conn
-    query = f"SELECT * FROM temperature_readings ORDER BY id DESC LIMIT {limit}"
-    df = pd.read_sql_query(query, conn)
-    return df.iloc[::-1].reset_index(drop=True)
+    return engine_get_history(limit=limit, sensor_id=sensor_id)
@@ -176,14 +176,32 @@ if __name__ == "__main__":
 """
 
 import os
-import shutil
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+import re
+import json
+import time
+import uuid
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import FastAPI, File, UploadFile, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import (
+    JSONResponse, FileResponse, HTMLResponse, PlainTextResponse, Response, StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 
-from pipeline import run_pipeline_on_uploaded_csv, get_history
+from pipeline import archive, db, jobs, live, profiling, rendering
+from pipeline.artifacts import ensure_artifact
+from pipeline.sweep import expand_grid, sweep_thresholds
+from pipeline.timeseries import chart_series
+from pipeline.upload_stream import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES, UploadRejected, UploadSink
+from pipeline.computation_engine import (
+    resolve_outputs, REPORT_ARTIFACTS, CHART_ARTIFACTS, DEFAULT_OUTPUTS, ARCHIVE_AVAILABLE,
+    HISTORY_COLUMNS, iter_history, history_next_cursor, init_storage, get_summary,
+)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
@@ -251,56 +269,391 @@ async def upload_csv(file: UploadFile = File(...)):
     }'''
 
 
-@app.post("/upload_csv/")
-async def upload_csv(file: UploadFile = File(...)):
-    save_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(save_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,80}$")
 
-    try:
-        result = run_pipeline_on_uploaded_csv(save_path)
-    except Exception as e:
-        import traceback
-        return JSONResponse(
-            {"error": str(e), "trace": traceback.format_exc()},
-            status_code=500
-        )
 
-    # Convert local paths → frontend URLs
-    pdf_url = None
-    if "report_files" in result and result["report_files"].get("pdf"):
-        pdf_path = result["report_files"]["pdf"]
-        pdf_url = "/static/reports/" + os.path.basename(pdf_path)
+async def _file_chunks(file):
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        yield chunk
 
-    # Preserve chart keys (drift, rul_health, etc.)
-    chart_files = {}
-    for k, v in result.get("chart_files", {}).items():
-        chart_files[k] = "/static/charts/" + os.path.basename(v)
 
-    return {
+def artifact_url(run_id, name):
+    """Per-run artifact URL; rendered on first request, cached afterwards."""
+    return f"/runs/{run_id}/artifacts/{name}"
+
+
+def format_result(result, timings=False):
+    """
+    Convert pipeline results → URLs usable by the frontend.
+    timings=True keeps the per-stage timing breakdown.
+    """
+    run_id = result.get("run_id")
+    artifacts = {name: artifact_url(run_id, name) for name in DEFAULT_OUTPUTS}
+    formatted = {
+        "run_id": run_id,
+        "cached": result.get("cached", False),
+        "artifacts": artifacts,
         "alerts": result.get("alerts", []),
-        "report_pdf_url": pdf_url,
-        "chart_files": chart_files
+        "report_pdf_url": artifacts["pdf"],
+        "chart_files": {k: artifacts[k] for k in CHART_ARTIFACTS}
     }
+    if timings and "timings" in result:
+        formatted["timings"] = result["timings"]
+    return formatted
+
+
+def parse_outputs(outputs):
+    """
+    ?outputs= query value → artifact names rendered eagerly during the run.
+    Omitted or "json" means only the stored results; the rest render lazily.
+    """
+    if outputs is None:
+        return ()
+    names = [name.strip() for name in outputs.split(",") if name.strip()]
+    return tuple(name for name in names if name != "json")
+
+
+def file_etag(path, salt=""):
+    st = os.stat(path)
+    return f'"{hashlib.sha1(f"{salt}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()}"'
+
+
+def conditional_file_response(request, path, media_type, etag, filename=None):
+    """FileResponse with a strong ETag; answers If-None-Match with 304."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+
+
+@app.post("/upload_csv/", status_code=202)
+async def upload_csv(request: Request, file: Optional[UploadFile] = File(None),
+                     outputs: Optional[str] = None, incremental: bool = False,
+                     timings: bool = False):
+    """
+    Store the upload and queue a pipeline job; returns a job id immediately.
+    Poll /jobs/{job_id} for stage progress and the final result.
+    The CSV is sent as the multipart `file` field or as the raw request body
+    (streamed straight to disk), plain or gzip/zstd compressed. Uploads are
+    hashed as they are decompressed, and rejected as soon as they exceed
+    MAX_UPLOAD_BYTES (413) or their header lacks measured/ideal (400).
+    ?outputs=csv,excel,pdf,drift,rul_health picks the rendered artifacts
+    (?outputs=json for none).
+    ?incremental=true appends to each sensor's series from its previous
+    incremental upload instead of starting from zero.
+    ?timings=true adds the upload's own timing here, and the per-stage
+    breakdown of the run to the job result (via the returned status_url).
+    """
+    try:
+        requested = resolve_outputs(parse_outputs(outputs))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if file is None and int(request.headers.get("content-length") or 0) > MAX_UPLOAD_BYTES:
+        return JSONResponse({"error": f"Upload exceeds {MAX_UPLOAD_BYTES:,} bytes"}, status_code=413)
+
+    received = time.perf_counter()
+    # Decoding, hashing and disk writes block: they run in the thread pool,
+    # a piece of about UPLOAD_CHUNK_BYTES at a time, never on the event loop
+    sink = await run_in_threadpool(UploadSink, os.path.join(UPLOAD_DIR, f".{uuid.uuid4().hex}.part"))
+    try:
+        pending = bytearray()
+        async for chunk in (request.stream() if file is None else _file_chunks(file)):
+            pending += chunk
+            if len(pending) >= UPLOAD_CHUNK_BYTES:
+                await run_in_threadpool(sink.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await run_in_threadpool(sink.write, bytes(pending))
+        csv_hash = await run_in_threadpool(sink.close)
+    except UploadRejected as e:
+        await run_in_threadpool(sink.discard)
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+    except BaseException:   # incl. cancellation: clean up without awaiting
+        sink.discard()
+        raise
+
+    # Content-addressed name: re-uploading the same CSV (compressed or not) reuses one file
+    save_path = os.path.join(UPLOAD_DIR, f"{csv_hash}.csv")
+    await run_in_threadpool(os.replace, sink.path, save_path)
+
+    try:
+        job_id, deduplicated = jobs.submit_job(save_path, csv_hash, requested, incremental)
+    except jobs.QueueFullError as e:
+        return JSONResponse({"error": str(e)}, status_code=429)
+
+    response = {"job_id": job_id, "status_url": f"/jobs/{job_id}", "deduplicated": deduplicated}
+    if timings:
+        response["status_url"] += "?timings=true"
+        response["timings"] = {"upload_seconds": time.perf_counter() - received,
+                               "upload_bytes": sink.received, "csv_bytes": sink.size}
+    return response
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, timings: bool = False):
+    """Job progress; ?timings=true adds the run's per-stage timing breakdown to the result."""
+    status = jobs.get_job(job_id)
+    if status is None:
+        return JSONResponse({"error": "job not found"}, status_code=404)
+    if "result" in status:
+        status["result"] = format_result(status["result"], timings)
+    return status
+
+
+@app.get("/metrics")
+def metrics():
+    """Pipeline stage timings, rows, bytes and memory in the Prometheus text format."""
+    return PlainTextResponse(profiling.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("startup")
+def startup():
+    # DB connection and schema migrations happen here, not at import time
+    init_storage()
+    live.start()
+
+
+@app.on_event("shutdown")
+def shutdown_jobs():
+    jobs.shutdown()
+    live.stop()
+    rendering.shutdown()
+    db.close()
 
 
 
+@app.get("/runs/{run_id}/artifacts/{name}")
+def run_artifact(run_id: str, name: str, request: Request):
+    """
+    Serve a run's artifact, rendering it from the stored results on first
+    request. Supports ETag / If-None-Match so polling dashboards get 304s.
+    """
+    if not RUN_ID_PATTERN.match(run_id) or name not in DEFAULT_OUTPUTS:
+        return JSONResponse({"error": "file not found"}, status_code=404)
+    path = ensure_artifact(run_id, name)
+    if path is None:
+        return JSONResponse({"error": "file not found"}, status_code=404)
+    spec = REPORT_ARTIFACTS[name]
+    return conditional_file_response(request, path, spec["media_type"],
+                                     file_etag(path, f"{run_id}/{name}"),
+                                     filename=spec["filename"])
+
+
 @app.get("/download_report/{fname}")
-def download_report(fname: str):
-    fpath = os.path.join(REPORT_DIR, fname)
+def download_report(fname: str, request: Request):
+    fpath = os.path.join(REPORT_DIR, os.path.basename(fname))
     if not os.path.exists(fpath):
         return JSONResponse({"error": "file not found"}, status_code=404)
-    return FileResponse(fpath, media_type="application/pdf", filename=fname)
+    return conditional_file_response(request, fpath, "application/pdf",
+                                     file_etag(fpath, fname), filename=fname)
+
+
+MAX_HISTORY_PAGE = 50_000
+
+
+def parse_timestamp(value):
+    """
+    ISO 8601 query value → the ISO text format stored in temperature_readings.
+    A UTC offset is converted to UTC first, as stored; naive values are taken as given.
+    """
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%dT%H:%M:%S.%f")
 
 
 @app.get("/history/")
-def history(limit: int = 200):
+def history(limit: int = 200, cursor: Optional[int] = None, order: str = "desc",
+            sensor_id: Optional[str] = None, start: Optional[str] = None,
+            end: Optional[str] = None, alert: Optional[str] = None, format: str = "records",
+            archived: bool = False):
+    """
+    Keyset-paginated history. Pass the X-Next-Cursor header (or next_cursor)
+    back as ?cursor= to fetch the next page.
+    format=records  → list of row objects, oldest → newest within the page
+    format=columnar → {"columns": [...], "data": {column: [...]}, "next_cursor"}
+    format=ndjson   → one JSON object per line, streamed in `order`
+    ndjson pages may be larger than MAX_HISTORY_PAGE.
+    archived=true reads readings compacted into the columnar archive
+    (same ids, filters and cursors).
+    """
+    if format not in ("records", "columnar", "ndjson") or order not in ("asc", "desc") or limit < 1:
+        return JSONResponse({"error": "invalid format, order or limit"}, status_code=400)
+    if archived and not ARCHIVE_AVAILABLE:
+        return JSONResponse({"error": "the columnar archive needs pyarrow"}, status_code=501)
+    read_page = archive.iter_history if archived else iter_history
     try:
-        df = get_history(limit=limit)
+        filters = dict(order=order, sensor_id=sensor_id, alert=alert,
+                       start=parse_timestamp(start), end=parse_timestamp(end))
+    except ValueError as e:
+        return JSONResponse({"error": f"invalid timestamp: {e}"}, status_code=400)
+
+    try:
+        if format == "ndjson":
+            if archived:
+                # Archive pages are decoded in one go, so the cursor is known afterwards
+                rows = list(read_page(limit, cursor, **filters))
+                next_cursor = rows[-1][0] if len(rows) == limit else None
+            else:
+                next_cursor = history_next_cursor(limit, cursor, **filters)
+                rows = iter_history(limit, cursor, **filters)
+            lines = (json.dumps(dict(zip(HISTORY_COLUMNS, row))) + "\n" for row in rows)
+            headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+            return StreamingResponse(lines, media_type="application/x-ndjson", headers=headers)
+
+        rows = list(read_page(min(limit, MAX_HISTORY_PAGE), cursor, **filters))
     except Exception as e:
         import traceback
         return JSONResponse({"error": str(e), "trace": traceback.format_exc()}, status_code=500)
-    return df.to_dict(orient="records")
+
+    next_cursor = rows[-1][0] if len(rows) == min(limit, MAX_HISTORY_PAGE) else None
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+    if format == "columnar":
+        columns = list(zip(*rows)) if rows else [()] * len(HISTORY_COLUMNS)
+        body = {"columns": HISTORY_COLUMNS,
+                "data": {name: list(col) for name, col in zip(HISTORY_COLUMNS, columns)},
+                "next_cursor": next_cursor}
+        return JSONResponse(body, headers=headers)
+    if order == "desc":
+        rows.reverse()  # oldest → newest, as the dashboard expects
+    return JSONResponse([dict(zip(HISTORY_COLUMNS, row)) for row in rows], headers=headers)
+
+
+
+@app.get("/summary/")
+def summary(days: int = 30, sensors: int = 100, sensor_id: Optional[str] = None):
+    """
+    Fleet overview maintained on ingest (summary tables), so the cost does
+    not grow with stored history: alert/anomaly counts, drift min/max/avg,
+    lowest and latest health/RUL for the fleet, the last `days` days and up
+    to `sensors` sensors (least healthy first).
+    """
+    if days < 0 or sensors < 0:
+        return JSONResponse({"error": "days and sensors must not be negative"}, status_code=400)
+    return JSONResponse(get_summary(days=days, sensors=sensors, sensor_id=sensor_id))
+
+
+@app.get("/chart_data/")
+def chart_data(metric: str = "drift", start: Optional[str] = None, end: Optional[str] = None,
+               width: int = 800, sensor_id: Optional[str] = None, method: str = "minmax"):
+    """
+    Downsampled series for interactive charts (replaces drift.png / rul_health.png).
+    metric: drift | rul_days | health
+    method=minmax → {"t", "min", "max", "avg"}, method=lttb → {"t", "v"}
+    t is epoch milliseconds; the window defaults to all stored readings.
+    """
+    try:
+        series = chart_series(metric, start=parse_timestamp(start), end=parse_timestamp(end),
+                              width=width, sensor_id=sensor_id, method=method)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(series)
+
+
+@app.post("/threshold_sweep/")
+async def threshold_sweep(request: Request):
+    """
+    What-if evaluation of threshold configurations over stored history, all
+    in one pass (sweep.py). JSON body:
+    {"grid": {"min_val": [94, 95], "spike_threshold": [1.5, 2.0]}}  (all combinations)
+    or {"configs": [{"min_val": 94}, ...]}, plus optional "sensor_id",
+    "start"/"end" (ISO) and "reference" (index of the configuration to compare
+    with; stored labels by default).
+    Returns per-configuration anomaly/alert/maintenance counts and confusion stats.
+    """
+    try:
+        body = await request.json()
+        configs = expand_grid(body["grid"]) if "grid" in body else body.get("configs")
+        report = await run_in_threadpool(
+            sweep_thresholds, configs, sensor_id=body.get("sensor_id"),
+            start=parse_timestamp(body.get("start")), end=parse_timestamp(body.get("end")),
+            reference=body.get("reference"))
+    except (ValueError, TypeError, AttributeError) as e:
+        return JSONResponse({"error": f"invalid sweep request: {e}"}, status_code=400)
+    return JSONResponse(report)
+
+
+
+async def process_line(line):
+    """live.process_ndjson_line, seeding a new sensor's context off the event loop."""
+    reading = live.parse_ndjson_line(line)
+    if reading is None:
+        return None
+    if live.needs_context(reading):
+        await run_in_threadpool(live.load_context, reading)
+    return live.process_reading(reading)
+
+
+@app.post("/ingest/")
+async def ingest(request: Request):
+    """
+    Streaming ingest: the body is NDJSON, one reading per line
+    ({"sensor_id", "measured", "ideal", "timestamp"?}). Lines are processed
+    as they arrive; rows are written to the DB in micro-batches.
+    Returns counts, per-line errors and the CRITICAL/WARNING rows.
+    """
+    processed, errors, alerts = 0, [], []
+    pending = b""
+    line_no = 0
+
+    async def handle(line):
+        nonlocal processed, line_no
+        line_no += 1
+        try:
+            row = await process_line(line.decode())
+        except (ValueError, KeyError, TypeError) as e:
+            errors.append({"line": line_no, "error": f"{type(e).__name__}: {e}"})
+            return
+        if row is not None:
+            processed += 1
+            if row["alert"] in live.PUSH_ALERTS:
+                alerts.append(live.json_row(row))
+
+    async for chunk in request.stream():
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            await handle(line)
+    if pending:
+        await handle(pending)
+    return {"processed": processed, "errors": errors, "alerts": alerts}
+
+
+@app.websocket("/ws/ingest")
+async def ws_ingest(websocket: WebSocket):
+    """
+    One or more NDJSON readings per message; each reading is answered with
+    its processed row (or {"error": ...}).
+    """
+    await websocket.accept()
+    try:
+        while True:
+            for line in (await websocket.receive_text()).splitlines():
+                try:
+                    row = await process_line(line)
+                except (ValueError, KeyError, TypeError) as e:
+                    await websocket.send_json({"error": f"{type(e).__name__}: {e}"})
+                    continue
+                if row is not None:
+                    await websocket.send_json(live.json_row(row))
+    except WebSocketDisconnect:
+        pass
+
+
+@app.websocket("/ws/alerts")
+async def ws_alerts(websocket: WebSocket):
+    """Push CRITICAL/WARNING alerts and throttled latest readings to a dashboard."""
+    await websocket.accept()
+    queue = live.subscribe()
+    try:
+        while True:
+            await websocket.send_json(await queue.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live.unsubscribe(queue)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+"""
+Columnar archival tier (Parquet, via the optional pyarrow dependency).
+
+- Each processed run can be written as processed.parquet next to its CSV
+  (the "parquet" report artifact).
+- Readings older than ARCHIVE_RETENTION_DAYS are compacted out of
+  temperature_readings into a dataset partitioned by day:
+  database/archive/history/day=YYYY-MM-DD/part-<first id>-<last id>-0.parquet
+  Chart rollups are kept, so charts still cover archived periods.
+
+Files are zstd-compressed. sensor_id and the anomaly / alert / maintenance
+labels are dictionary-encoded (categorical enums), and timestamps are
+int64 epoch microseconds. Reads memory-map the files and push filters on
+day, timestamp, sensor, alert and id down to partitions and row-group
+statistics, so only matching row groups are decoded.
+
+    python -m pipeline.archive compact --retention-days 90
+"""
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from . import db
+from .computation_engine import BASE_DIR, HISTORY_COLUMNS, SENSOR_COLUMN, ANOMALY_LABELS
+
+ARCHIVE_DIR = os.path.join(BASE_DIR, "database", "archive")
+HISTORY_ARCHIVE_DIR = os.path.join(ARCHIVE_DIR, "history")
+ARCHIVE_RETENTION_DAYS = int(os.environ.get("CALIBRATION_RETENTION_DAYS", 90))
+COMPACT_BATCH_ROWS = 500_000
+ROW_GROUP_ROWS = 128_000   # finer row groups = more selective statistics
+DICTIONARY_COLUMNS = (SENSOR_COLUMN, "anomaly", "alert", "maintenance")
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"   # as stored in temperature_readings
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.fs
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The columnar archive needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _epoch_us(values):
+    parsed = pd.to_datetime(pd.Series(values), errors="coerce", format="ISO8601")
+    return parsed.values.astype("datetime64[us]").astype(np.int64), parsed.isna().values
+
+
+def frame_table(df, schema=None):
+    """
+    Processed frame -> Arrow table with the archive's column encodings.
+    :param schema: cast to this schema (columns that are all NULL in df
+                   would otherwise be typed null)
+    """
+    pa = _pyarrow()
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if name == "timestamp":
+            epochs, missing = _epoch_us(values)
+            columns[name] = pa.array(epochs, type=pa.int64(), mask=missing)
+        elif name in DICTIONARY_COLUMNS:
+            strings = values.astype(object).where(values.notna(), None)
+            strings = strings.map(lambda v: v if v is None else str(v))
+            columns[name] = pa.array(strings, type=pa.string()).dictionary_encode().cast(dictionary)
+        else:
+            columns[name] = pa.array(values, from_pandas=True)
+    table = pa.table(columns)
+    return table if schema is None else table.cast(schema)
+
+
+def history_schema(partitioned=False):
+    """Fixed schema of archived temperature_readings rows (+ the day partition)."""
+    pa = _pyarrow()
+    types = {"id": pa.int64(), "timestamp": pa.int64()}
+    fields = [(name, types.get(name, pa.dictionary(pa.int32(), pa.string())
+                                if name in DICTIONARY_COLUMNS else pa.float64()))
+              for name in HISTORY_COLUMNS]
+    return pa.schema(fields + ([("day", pa.string())] if partitioned else []))
+
+
+def table_frame(table):
+    """Archive table -> DataFrame with ISO text timestamps and categorical labels."""
+    df = table.to_pandas()
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="us").dt.strftime(TIMESTAMP_FORMAT)
+    if "anomaly" in df.columns:
+        df["anomaly"] = pd.Categorical(df["anomaly"], categories=ANOMALY_LABELS)
+    return df
+
+
+# ---------------------------
+# Processed runs
+# ---------------------------
+def open_run_writer(path, first_chunk):
+    """ParquetWriter for a run written chunk by chunk (see write_run_chunk)."""
+    pq = _pyarrow().parquet
+    return pq.ParquetWriter(path, frame_table(first_chunk).schema, compression="zstd")
+
+
+def write_run_chunk(writer, chunk):
+    writer.write_table(frame_table(chunk).cast(writer.schema), row_group_size=ROW_GROUP_ROWS)
+
+
+def write_run(df, path):
+    """Write a whole processed frame as one Parquet file."""
+    writer = open_run_writer(path, df)
+    try:
+        write_run_chunk(writer, df)
+    finally:
+        writer.close()
+    return path
+
+
+def read_run(path, columns=None, filter=None):
+    """
+    Memory-mapped read of a run's processed.parquet.
+    :param filter: pyarrow.dataset expression, pushed down to row groups
+    """
+    ds = _pyarrow().dataset
+    return table_frame(ds.dataset(path, format="parquet", filesystem=_mmap_fs())
+                       .to_table(columns=columns, filter=filter))
+
+
+# ---------------------------
+# History archive
+# ---------------------------
+def _mmap_fs():
+    return _pyarrow().fs.LocalFileSystem(use_mmap=True)
+
+
+def _partitioning():
+    pa = _pyarrow()
+    return pa.dataset.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+
+
+def history_dataset(path=HISTORY_ARCHIVE_DIR):
+    """The archived history as a pyarrow Dataset (None if nothing is archived yet)."""
+    ds = _pyarrow().dataset
+    if not os.path.isdir(path):
+        return None
+    return ds.dataset(path, format="parquet", schema=history_schema(partitioned=True),
+                      partitioning=_partitioning(), filesystem=_mmap_fs())
+
+
+def history_filter(cursor=None, order="desc", sensor_id=None, start=None, end=None, alert=None):
+    """
+    Dataset expression equivalent to the SQLite history filters
+    (ISO start inclusive, end exclusive).
+    """
+    ds = _pyarrow().dataset
+    conditions = []
+    if cursor is not None:
+        conditions.append(ds.field("id") < int(cursor) if order == "desc" else ds.field("id") > int(cursor))
+    if sensor_id is not None:
+        conditions.append(ds.field(SENSOR_COLUMN) == str(sensor_id))
+    for bound, op in ((start, "ge"), (end, "lt")):
+        if bound is None:
+            continue
+        epoch = int(_epoch_us([bound])[0][0])
+        day = pd.Timestamp(bound).strftime("%Y-%m-%d")
+        if op == "ge":
+            conditions += [ds.field("day") >= day, ds.field("timestamp") >= epoch]
+        else:
+            conditions += [ds.field("day") <= day, ds.field("timestamp") < epoch]
+    if alert is not None:
+        conditions.append(ds.field("alert") == alert)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_history(columns=None, sensor_id=None, start=None, end=None, alert=None, path=HISTORY_ARCHIVE_DIR):
+    """Archived readings matching the filters as a DataFrame, oldest id first."""
+    dataset = history_dataset(path)
+    if dataset is None:
+        return pd.DataFrame(columns=columns or HISTORY_COLUMNS)
+    table = dataset.to_table(columns=columns or HISTORY_COLUMNS,
+                             filter=history_filter(None, "asc", sensor_id, start, end, alert))
+    if "id" in table.column_names:
+        table = table.sort_by("id")
+    return table_frame(table)
+
+
+def iter_history(limit=200, cursor=None, order="desc", sensor_id=None, start=None, end=None,
+                 alert=None, path=HISTORY_ARCHIVE_DIR):
+    """
+    Archive counterpart of computation_engine.iter_history: rows as tuples in
+    HISTORY_COLUMNS order, keyset-paginated on the original ids.
+    """
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+    dataset = history_dataset(path)
+    if dataset is None:
+        return iter(())
+    pc = _pyarrow().compute
+    ds = _pyarrow().dataset
+    expression = history_filter(cursor, order, sensor_id, start, end, alert)
+    # Find the page's id range from the id column alone, then decode just those rows
+    ids = dataset.to_table(columns=["id"], filter=expression)["id"]
+    if not len(ids):
+        return iter(())
+    select = pc.top_k_unstable if order == "desc" else pc.bottom_k_unstable
+    page_ids = ids.take(select(ids, int(limit)))
+    low, high = pc.min(page_ids).as_py(), pc.max(page_ids).as_py()
+    id_range = (ds.field("id") >= low) & (ds.field("id") <= high)
+    table = dataset.to_table(columns=HISTORY_COLUMNS,
+                             filter=id_range if expression is None else expression & id_range)
+    table = table.sort_by([("id", "descending" if order == "desc" else "ascending")])
+    df = table_frame(table).astype(object)
+    return df.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def archived_until(db_conn=None):
+    """Cutoff (ISO text) of the latest compaction; older raw rows live in the archive."""
+    row = db.query_one("SELECT MAX(cutoff) FROM archive_compactions", (), db_conn)
+    return row[0] if row else None
+
+
+def compact_history(retention_days=ARCHIVE_RETENTION_DAYS, now=None, batch_rows=COMPACT_BATCH_ROWS,
+                    path=HISTORY_ARCHIVE_DIR):
+    """
+    Move readings older than retention_days from SQLite into the archive.
+    Each batch is written before its rows are deleted, and file names are
+    derived from the batch's id range, so a compaction interrupted between
+    the two steps rewrites the same files when run again.
+    :return: number of rows archived
+    """
+    pa = _pyarrow()
+    cutoff = ((now or datetime.now()) - timedelta(days=retention_days)).strftime(TIMESTAMP_FORMAT)
+    moved = 0
+    while True:
+        df = db.read_frame(
+            f"SELECT {', '.join(HISTORY_COLUMNS)} FROM temperature_readings "
+            "WHERE timestamp < ? ORDER BY id LIMIT ?", (cutoff, int(batch_rows)))
+        if df.empty:
+            break
+        first, last = int(df["id"].iloc[0]), int(df["id"].iloc[-1])
+        table = frame_table(df, history_schema())
+        days = pd.to_datetime(df["timestamp"], errors="coerce", format="ISO8601").dt.strftime("%Y-%m-%d")
+        table = table.append_column("day", pa.array(days.where(days.notna(), None), type=pa.string()))
+        pa.dataset.write_dataset(
+            table, path, format="parquet", partitioning=_partitioning(),
+            basename_template=f"part-{first}-{last}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=pa.dataset.ParquetFileFormat().make_write_options(compression="zstd"),
+            max_rows_per_group=ROW_GROUP_ROWS,
+        )
+        with db.transaction() as conn:
+            db.execute("DELETE FROM temperature_readings WHERE id BETWEEN ? AND ? AND timestamp < ?",
+                       (first, last, cutoff), conn)
+        moved += len(df)
+        print(f"✅ Archived readings {first}–{last} ({moved:,} rows so far)")
+    if moved:
+        with db.transaction() as conn:
+            db.execute("INSERT INTO archive_compactions (cutoff, rows, finished_at) VALUES (?, ?, ?)",
+                       (cutoff, moved, datetime.now().isoformat()), conn)
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact = commands.add_parser("compact", help="move old readings into the archive")
+    compact.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS)
+    compact.add_argument("--batch-rows", type=int, default=COMPACT_BATCH_ROWS)
+    args = parser.parse_args(argv)
+
+    moved = compact_history(args.retention_days, batch_rows=args.batch_rows)
+    print(f"✅ Compacted {moved:,} readings older than {args.retention_days} days into {HISTORY_ARCHIVE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Per-run artifact namespace.
+
+Every processed CSV gets its own directory under static/runs/<run_id>,
+where run_id is the SHA-256 of the CSV bytes. A `runs` index table in
+SQLite records each run's result so re-uploading identical bytes returns
+the existing artifacts without recomputation. Old runs are evicted by
+age and by total size on disk.
+
+Evicting a run removes its files but not its readings, so every recorded
+run also leaves a row in `ingested_runs`. A CSV uploaded again after its
+run was evicted only has its reports rendered again.
+
+The processed CSV is always kept as the run's stored results; Excel, PDF
+and chart artifacts are rendered from it on first request and cached.
+"""
+import os
+import json
+import shutil
+import time
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from . import db
+from .computation_engine import (
+    BASE_DIR, REPORT_ARTIFACTS, artifact_path, render_artifacts_from_csv,
+)
+
+RUNS_DIR = os.path.join(BASE_DIR, "static", "runs")
+os.makedirs(RUNS_DIR, exist_ok=True)
+
+RUN_MAX_AGE_DAYS = float(os.environ.get("CALIBRATION_RUN_MAX_AGE_DAYS", 30))
+RUNS_MAX_BYTES = int(os.environ.get("CALIBRATION_RUNS_MAX_BYTES", 5 * 1024 ** 3))
+
+# Cache hits are only recorded in memory and written in one batch at most
+# this often (and before every eviction), so lookups stay read-only
+TOUCH_FLUSH_SECONDS = 60
+
+_touch_lock = threading.Lock()
+_touched = {}          # run_id -> last access time not yet written
+_last_touch_flush = time.monotonic()
+
+
+def hash_file(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while block := fh.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_dir(run_id, create=True):
+    path = os.path.join(RUNS_DIR, run_id)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _dir_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def lookup_run(run_id):
+    """
+    Cached result for run_id, or None. Returns None (and drops the index
+    row) if the run's directory has been removed from disk.
+    """
+    row = db.query_one("SELECT result FROM runs WHERE run_id = ?", (run_id,))
+    if row is None:
+        return None
+    if not os.path.isdir(run_dir(run_id, create=False)):
+        with db.transaction() as conn:
+            db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,), conn)
+        return None
+    _touch(run_id)
+    return json.loads(row[0])
+
+
+def _touch(run_id):
+    global _last_touch_flush
+    with _touch_lock:
+        _touched[run_id] = datetime.now().isoformat()
+        due = time.monotonic() - _last_touch_flush >= TOUCH_FLUSH_SECONDS
+    if due:
+        flush_touches()
+
+
+def flush_touches():
+    """Write the access times of cache hits since the last flush."""
+    global _last_touch_flush
+    with _touch_lock:
+        touched = list(_touched.items())
+        _touched.clear()
+        _last_touch_flush = time.monotonic()
+    if touched:
+        with db.transaction() as conn:
+            db.executemany("UPDATE runs SET last_accessed = ? WHERE run_id = ?",
+                           [(at, run_id) for run_id, at in touched], conn)
+
+
+def was_ingested(run_id):
+    """True if run_id's readings were stored by an earlier run (even an evicted one)."""
+    return db.query_one("SELECT 1 FROM ingested_runs WHERE run_id = ?", (run_id,)) is not None
+
+
+def record_run(run_id, result):
+    now = datetime.now().isoformat()
+    with db.transaction() as conn:
+        db.execute(
+            "INSERT OR REPLACE INTO runs (run_id, created_at, last_accessed, size_bytes, result) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (run_id, now, now, _dir_size(run_dir(run_id)), json.dumps(result, default=str)),
+            conn,
+        )
+        db.execute("INSERT OR IGNORE INTO ingested_runs (run_id, ingested_at) VALUES (?, ?)",
+                   (run_id, now), conn)
+
+
+# pyplot keeps global state, so lazy renders from API threads are serialized
+_render_lock = threading.Lock()
+
+
+def ensure_artifact(run_id, name):
+    """
+    Path of artifact `name` for run_id, rendering it on first request from
+    the run's stored processed CSV and caching the file in the run dir.
+    :return: path, or None if the run (or its stored results) is missing
+    """
+    if name not in REPORT_ARTIFACTS:
+        raise KeyError(name)
+    out_dir = run_dir(run_id, create=False)
+    path = artifact_path(out_dir, name)
+    if os.path.exists(path):
+        return path
+    source = artifact_path(out_dir, "csv")
+    if not os.path.exists(source):
+        return None
+
+    with _render_lock:
+        if not os.path.exists(path):
+            # Render into a scratch dir and move into place so readers never
+            # see a half-written file
+            with tempfile.TemporaryDirectory(dir=out_dir) as scratch:
+                manifest = render_artifacts_from_csv(source, scratch, (name,))
+                if name not in manifest:
+                    return None
+                os.replace(manifest[name], path)
+            with db.transaction() as conn:
+                db.execute("UPDATE runs SET size_bytes = ? WHERE run_id = ?",
+                           (_dir_size(out_dir), run_id), conn)
+    return path
+
+
+def evict_runs(max_age_days=RUN_MAX_AGE_DAYS, max_total_bytes=RUNS_MAX_BYTES, keep=()):
+    """
+    Delete runs not accessed within max_age_days, then the least recently
+    accessed runs until the total size fits max_total_bytes.
+    :param keep: run ids that must survive (e.g. the run just produced)
+    :return: list of evicted run ids (their ingested_runs rows stay)
+    """
+    flush_touches()
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+    rows = db.query("SELECT run_id, last_accessed, size_bytes FROM runs ORDER BY last_accessed")
+
+    total = sum(size or 0 for _, _, size in rows)
+    evicted = []
+    for run_id, last_accessed, size in rows:
+        if run_id in keep:
+            continue
+        if last_accessed < cutoff or total > max_total_bytes:
+            shutil.rmtree(run_dir(run_id, create=False), ignore_errors=True)
+            evicted.append(run_id)
+            total -= size or 0
+
+    if evicted:
+        with db.transaction() as conn:
+            db.executemany("DELETE FROM runs WHERE run_id = ?", [(r,) for r in evicted], conn)
+    return evicted
@@ -0,0 +1,264 @@
+"""
+Parallel backfill of historical calibration exports.
+
+A directory or glob of CSVs is fanned out over a process pool that runs
+the computation stages (process_frame) on one file per task. Processed
+frames come back to this process, the single writer, and are saved to
+temperature_readings in file order, so readings stay in chronological id
+order when exports are named by date.
+
+Each file's readings are committed together with a checkpoint row in
+backfill_files, so a crashed or interrupted backfill resumes with the
+first file that was not committed and never loads a file twice. Files
+are processed independently: anomaly/drift context does not carry over
+from one file to the next (use incremental uploads for that).
+
+    python -m pipeline.backfill "exports/2023-*.csv" --workers 8
+    python -m pipeline.backfill exports/ --summary backfill_summary.json
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import multiprocessing as mp
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from . import db
+from .computation_engine import (
+    REPORT_DIR, SENSOR_COLUMN, load_csv, process_frame, save_to_db,
+)
+
+MAX_WORKERS = int(os.environ.get("CALIBRATION_WORKERS", os.cpu_count() or 1))
+# Processed files waiting for the writer, per worker; bounds parent memory
+IN_FLIGHT_PER_WORKER = 2
+SUMMARY_COLUMNS = ("anomaly", "alert", "maintenance")
+DEFAULT_SUMMARY_PATH = os.path.join(REPORT_DIR, "backfill_summary.json")
+
+
+def discover_files(source, pattern="*.csv"):
+    """
+    CSV files to backfill, sorted by path.
+    :param source: a directory (searched recursively for `pattern`), a
+                   glob, or a single file
+    """
+    if os.path.isdir(source):
+        matches = glob.glob(os.path.join(source, "**", pattern), recursive=True)
+    else:
+        matches = glob.glob(source)
+    return sorted(os.path.abspath(p) for p in matches if os.path.isfile(p))
+
+
+# ---------------------------
+# Worker side
+# ---------------------------
+def _init_worker(models):
+    if models:
+        from .models import warm_models
+        warm_models()
+
+
+def file_summary(df, seconds=None):
+    """Counts a combined report is built from, JSON-ready."""
+    summary = {"rows": len(df), "seconds": seconds}
+    if "timestamp" in df.columns and df["timestamp"].notna().any():
+        timestamps = df["timestamp"].dropna().astype(str)
+        summary.update(first_timestamp=timestamps.min(), last_timestamp=timestamps.max())
+    if SENSOR_COLUMN in df.columns:
+        summary["sensors"] = sorted(df[SENSOR_COLUMN].dropna().astype(str).unique().tolist())
+    for column in SUMMARY_COLUMNS:
+        summary[f"{column}_counts"] = {str(k): int(v) for k, v in df[column].value_counts().items()}
+    return summary
+
+
+def _process_file(csv_path, models):
+    start = time.perf_counter()
+    df = process_frame(load_csv(csv_path, models=models), models=models)
+    return df, file_summary(df, time.perf_counter() - start)
+
+
+# ---------------------------
+# Checkpoints
+# ---------------------------
+def load_checkpoints(paths, db_conn=None):
+    """path -> (size_bytes, mtime_ns, summary dict) for already backfilled paths."""
+    done = {}
+    paths = list(paths)
+    for first in range(0, len(paths), 500):
+        part = paths[first:first + 500]
+        rows = db.query(
+            "SELECT path, size_bytes, mtime_ns, summary FROM backfill_files "
+            f"WHERE path IN ({', '.join('?' * len(part))})", part, db_conn)
+        done.update({path: (size, mtime, json.loads(summary)) for path, size, mtime, summary in rows})
+    return done
+
+
+def _checkpoint_writer(csv_path, summary):
+    stat = os.stat(csv_path)
+
+    def write(db_conn):
+        db.execute(
+            "INSERT OR REPLACE INTO backfill_files (path, size_bytes, mtime_ns, finished_at, summary) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (csv_path, stat.st_size, stat.st_mtime_ns, datetime.now().isoformat(), json.dumps(summary)),
+            db_conn,
+        )
+    return write
+
+
+def clear_checkpoints(paths, db_conn=None):
+    """Forget checkpoints so the files are loaded again (their old rows stay)."""
+    db_conn = db_conn or db.connection()
+    with db_conn:
+        db.executemany("DELETE FROM backfill_files WHERE path = ?", [(p,) for p in paths], db_conn)
+
+
+# ---------------------------
+# Combined report
+# ---------------------------
+def combine_summaries(summaries):
+    """Fold per-file summaries into fleet-wide totals."""
+    combined = {"rows": 0, "first_timestamp": None, "last_timestamp": None, "sensors": set()}
+    for column in SUMMARY_COLUMNS:
+        combined[f"{column}_counts"] = {}
+    for summary in summaries:
+        combined["rows"] += summary["rows"]
+        for key, pick in (("first_timestamp", min), ("last_timestamp", max)):
+            if summary.get(key) is not None:
+                current = combined[key]
+                combined[key] = summary[key] if current is None else pick(current, summary[key])
+        combined["sensors"].update(summary.get("sensors", ()))
+        for column in SUMMARY_COLUMNS:
+            totals = combined[f"{column}_counts"]
+            for label, count in summary[f"{column}_counts"].items():
+                totals[label] = totals.get(label, 0) + count
+    combined["sensors"] = len(combined["sensors"])
+    return combined
+
+
+def _write_summary(report, summary_path):
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    tmp_path = summary_path + ".tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(report, fh, indent=2)
+    os.replace(tmp_path, summary_path)
+    print(f"✅ Backfill summary saved: {summary_path}")
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+def backfill(source, pattern="*.csv", workers=None, models=None, restart=False,
+             summary_path=DEFAULT_SUMMARY_PATH, progress=None):
+    """
+    Process every CSV under `source` in parallel and load the results into
+    temperature_readings through a single writer.
+    :param workers: worker processes (default CALIBRATION_WORKERS / CPU count)
+    :param models: score with the shipped models; None follows CALIBRATION_MODELS
+    :param restart: ignore checkpoints and load every file again
+    :param summary_path: where to write the combined JSON report (None = don't)
+    :param progress: optional callable(done, total, path) after each file
+    :return: combined report dict (covers files checkpointed by earlier runs too)
+    """
+    if models is None:
+        from .models import MODELS_ENABLED
+        models = MODELS_ENABLED
+    files = discover_files(source, pattern)
+    if restart:
+        clear_checkpoints(files)
+    done = load_checkpoints(files)
+    for path, (size, mtime, _) in done.items():
+        stat = os.stat(path)
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime):
+            print(f"⚠️ {path} changed since it was backfilled; skipped (rerun with restart to reload)")
+    todo = [path for path in files if path not in done]
+    print(f"Backfilling {len(todo)} of {len(files)} files ({len(done)} already checkpointed)")
+
+    summaries = {path: summary for path, (_, _, summary) in done.items()}
+    failed = {}
+    written = 0
+    start = time.perf_counter()
+    workers = max(1, min(workers or MAX_WORKERS, len(todo) or 1))
+    if todo:
+        # spawn, not fork: children must not inherit the parent's SQLite connections
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(models,)) as executor:
+            queue = iter(todo)
+            pending = deque()
+
+            def refill():
+                while len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                    path = next(queue, None)
+                    if path is None:
+                        return
+                    pending.append((path, executor.submit(_process_file, path, models)))
+
+            refill()
+            while pending:
+                path, future = pending.popleft()
+                try:
+                    df, summary = future.result()
+                    save_to_db(df, extra_writes=_checkpoint_writer(path, summary), verbose=True)
+                except KeyError as e:
+                    failed[path] = f"CSV is missing required column: {e}"
+                    print(f"⚠️ Backfill of {path} failed: {failed[path]}")
+                except Exception as e:
+                    failed[path] = str(e)
+                    print(f"⚠️ Backfill of {path} failed: {e}")
+                else:
+                    summaries[path] = summary
+                    written += summary["rows"]
+                refill()
+                if progress is not None:
+                    progress(len(summaries) + len(failed), len(files), path)
+
+    elapsed = time.perf_counter() - start
+    report = {
+        "source": source,
+        "finished_at": datetime.now().isoformat(),
+        "files": len(files),
+        "processed": len(summaries) - len(done),
+        "skipped": len(done),
+        "failed": [{"path": path, "error": error} for path, error in failed.items()],
+        "rows_written": written,
+        "seconds": elapsed,
+        "rows_per_sec": written / elapsed if elapsed > 0 else None,
+        "totals": combine_summaries(summaries[p] for p in files if p in summaries),
+        "per_file": [{"path": p, **summaries[p]} for p in files if p in summaries],
+    }
+    if summary_path:
+        _write_summary(report, summary_path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="directory, glob or CSV file")
+    parser.add_argument("--pattern", default="*.csv", help="file pattern inside a directory")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--models", action="store_true", help="score with the shipped models")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints")
+    parser.add_argument("--summary", default=DEFAULT_SUMMARY_PATH, help="combined JSON report path")
+    args = parser.parse_args(argv)
+
+    def progress(done, total, path):
+        print(f"[{done}/{total}] {os.path.basename(path)}")
+
+    report = backfill(args.source, pattern=args.pattern, workers=args.workers,
+                      models=args.models or None, restart=args.restart,
+                      summary_path=args.summary, progress=progress)
+    totals = report["totals"]
+    print(f"✅ Backfilled {report['processed']} files, {report['rows_written']:,} rows in "
+          f"{report['seconds']:.1f}s; {report['skipped']} skipped, {len(report['failed'])} failed")
+    print(f"   Total {totals['rows']:,} rows from {totals['sensors']} sensors, "
+          f"{totals['first_timestamp']} – {totals['last_timestamp']}")
+    print(f"   Alerts: {totals['alert_counts']}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,573 @@
+"""
+Benchmarks for the computation engine.
+
+Run from the directory that contains the package:
+    python -m pipeline.benchmark [sizes...]    # stage micro-benchmarks
+    python -m pipeline.benchmark --startup     # import-time regression check
+    python -m pipeline.benchmark --render      # report rendering before/after
+    python -m pipeline.benchmark --suite [sizes...] --output bench.json --baseline main.json
+
+The suite runs every stage, run_pipeline_on_uploaded_csv and the
+/upload_csv/ and /history/ endpoints (in-process test client) on
+generated data (synthetic.py) against a scratch database, writes the
+results as JSON and fails when a result is slower than the baseline's by
+more than --threshold.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import platform
+import argparse
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from .computation_engine import (
+    compute_correction, detect_anomalies, predict_drift_and_rul,
+    assign_alerts_and_maintenance, connect_db, save_to_db, init_db,
+    init_storage, load_csv, generate_report, process_frame, summarize_for_report,
+)
+from . import db, live, models, rendering
+from .synthetic import generate_calibration_frame, write_calibration_csv
+
+
+def _reference_anomalies(values, min_val=95, max_val=105, spike_threshold=2.0):
+    """Original per-sample loop, kept only to check the vectorized labels."""
+    anomalies = []
+    for i in range(len(values)):
+        val = values[i]
+        anomaly = None
+        if val < min_val or val > max_val:
+            anomaly = "Out-of-Range"
+        elif i > 0 and abs(val - values[i-1]) > spike_threshold:
+            anomaly = "Spike"
+        elif i >= 2 and values[i] == values[i-1] == values[i-2]:
+            anomaly = "Stuck"
+        elif i > 1 and ((val - values[i-1]) * (values[i-1] - values[i-2])) < 0:
+            anomaly = "Noisy"
+        anomalies.append(anomaly if anomaly else "Normal")
+    return anomalies
+
+
+def _synthetic_measured(n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = 100 + np.cumsum(rng.normal(0, 0.3, n)) * 0.05
+    values[rng.random(n) < 0.01] += 5          # spikes / out-of-range
+    stuck = np.flatnonzero(rng.random(n) < 0.01)
+    values[stuck[stuck > 1]] = values[stuck[stuck > 1] - 1]
+    return np.round(values, 2)
+
+
+def bench_detect_anomalies(sizes=(10_000, 1_000_000, 10_000_000), check_size=10_000):
+    # Equivalence check against the original loop on a small sample
+    values = _synthetic_measured(check_size)
+    df = detect_anomalies(pd.DataFrame({"measured": values}))
+    assert list(df["anomaly"].astype(str)) == _reference_anomalies(values), \
+        "vectorized labels differ from reference loop"
+
+    results = []
+    for n in sizes:
+        df = pd.DataFrame({"measured": _synthetic_measured(n)})
+        start = time.perf_counter()
+        detect_anomalies(df)
+        elapsed = time.perf_counter() - start
+        results.append({"stage": "detect_anomalies", "rows": n,
+                        "seconds": elapsed, "rows_per_sec": n / elapsed})
+    return results
+
+
+def bench_assign_alerts(sizes=(10_000, 1_000_000, 10_000_000)):
+    results = []
+    for n in sizes:
+        df = pd.DataFrame({"measured": _synthetic_measured(n), "ideal": 100.0})
+        df = predict_drift_and_rul(detect_anomalies(compute_correction(df)))
+        start = time.perf_counter()
+        assign_alerts_and_maintenance(df)
+        elapsed = time.perf_counter() - start
+        results.append({"stage": "assign_alerts_and_maintenance", "rows": n,
+                        "seconds": elapsed, "rows_per_sec": n / elapsed})
+    return results
+
+
+@contextmanager
+def scratch_database():
+    """
+    Point the pool at a throwaway database for the duration of a benchmark
+    run, exported as CALIBRATION_DB_PATH so job workers use it too; the
+    real database is never opened.
+    :return: the scratch directory (removed afterwards)
+    """
+    previous_db = os.environ.get("CALIBRATION_DB_PATH")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CALIBRATION_DB_PATH"] = os.path.join(tmp, "bench.db")
+        db.close()
+        init_storage(os.environ["CALIBRATION_DB_PATH"])
+        try:
+            yield tmp
+        finally:
+            db.close()
+            if previous_db is None:
+                os.environ.pop("CALIBRATION_DB_PATH", None)
+            else:
+                os.environ["CALIBRATION_DB_PATH"] = previous_db
+
+
+def bench_save_to_db(sizes=(10_000, 1_000_000)):
+    """Bulk ingest into a scratch database so the real one is untouched."""
+    results = []
+    for n in sizes:
+        df = pd.DataFrame({"measured": _synthetic_measured(n), "ideal": 100.0})
+        df = assign_alerts_and_maintenance(
+            predict_drift_and_rul(detect_anomalies(compute_correction(df))))
+        with tempfile.TemporaryDirectory() as tmp:
+            db_conn = connect_db(os.path.join(tmp, "bench.db"))
+            init_db(db_conn)
+            stats = save_to_db(df, db_conn=db_conn)
+            db_conn.close()
+        results.append({"stage": "save_to_db", **stats})
+    return results
+
+
+def bench_live_ingest(sizes=(10_000, 100_000), sensors=10):
+    """
+    Per-message latency of the live path. Labels are checked against the
+    batch pipeline; processed rows are discarded, not written to the DB.
+    Sensors are seeded from stream_state, so run it inside scratch_database().
+    """
+    results = []
+    for n in sizes:
+        names = np.array([f"bench-{uuid.uuid4().hex[:8]}" for _ in range(sensors)])
+        df = pd.DataFrame({"sensor_id": names[np.arange(n) % sensors],
+                           "measured": _synthetic_measured(n), "ideal": 100.0})
+        readings = df.to_dict(orient="records")
+        latencies = np.empty(n)
+        rows = []
+        for i, reading in enumerate(readings):
+            start = time.perf_counter()
+            rows.append(live.process_reading(reading))
+            latencies[i] = time.perf_counter() - start
+        with live._lock:
+            live._buffer.clear()
+        for name in names:
+            live._sensors.pop(name, None)
+
+        expected = assign_alerts_and_maintenance(
+            predict_drift_and_rul(detect_anomalies(compute_correction(df))))
+        got = pd.DataFrame(rows)
+        for column in ("anomaly", "alert", "maintenance"):
+            assert (got[column].values == expected[column].astype(str).values).all(), \
+                f"live {column} differs from batch pipeline"
+        assert np.allclose(got["drift"], expected["drift"], equal_nan=True)
+
+        print(f"{'live ingest latency':<32} p50 {np.percentile(latencies, 50) * 1e6:,.1f} µs  "
+              f"p99 {np.percentile(latencies, 99) * 1e6:,.1f} µs  max {latencies.max() * 1e3:,.2f} ms")
+        total = latencies.sum()
+        results.append({"stage": "live.process_reading", "rows": n,
+                        "seconds": total, "rows_per_sec": n / total})
+    return results
+
+
+def _synthetic_model_frame(n, sensors=10, seed=0):
+    """Readings plus the CSV-supplied MODEL_FEATURES columns."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"sensor_id": np.arange(n) % sensors,
+                       "measured": _synthetic_measured(n, seed), "ideal": 100.0})
+    for name in models.MODEL_FEATURES:
+        if name not in df.columns and name not in models.DERIVED_FEATURES:
+            df[name] = rng.uniform(0, 100, n)
+    return compute_correction(df)
+
+
+def bench_model_scoring(sizes=(10_000, 1_000_000)):
+    """
+    Heuristic anomaly/drift stages vs apply_models on the same frames, plus
+    the latency of scoring one reading's worth of history (a RUL window).
+    Models that cannot load are reported and skipped by apply_models.
+    """
+    available = models.warm_models()
+    print("models: " + ", ".join(f"{k}={'ok' if v else 'missing'}" for k, v in available.items()))
+    results = []
+    for n in sizes:
+        df = _synthetic_model_frame(n)
+        start = time.perf_counter()
+        df = predict_drift_and_rul(detect_anomalies(df))
+        elapsed = time.perf_counter() - start
+        results.append({"stage": "heuristic anomaly+drift", "rows": n,
+                        "seconds": elapsed, "rows_per_sec": n / elapsed})
+        start = time.perf_counter()
+        models.apply_models(df)
+        elapsed = time.perf_counter() - start
+        results.append({"stage": "models.apply_models", "rows": n,
+                        "seconds": elapsed, "rows_per_sec": n / elapsed})
+
+    small = predict_drift_and_rul(detect_anomalies(_synthetic_model_frame(models.RUL_WINDOW_ROWS, sensors=1)))
+    for name, score in (("heuristic", lambda f: predict_drift_and_rul(detect_anomalies(f))),
+                        ("models", models.apply_models)):
+        latencies = []
+        for _ in range(50):
+            frame = small.copy()
+            start = time.perf_counter()
+            score(frame)
+            latencies.append(time.perf_counter() - start)
+        print(f"{name + ' latency (1 window)':<32} p50 {np.percentile(latencies, 50) * 1e3:,.2f} ms  "
+              f"p99 {np.percentile(latencies, 99) * 1e3:,.2f} ms")
+    return results
+
+
+def _reference_render(summary, out_dir):
+    """
+    Original report rendering (new pyplot figures per run, every sample
+    plotted, global seaborn style), kept only for the before/after timing.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    idx = summary["index"]
+
+    def plot_drift():
+        plt.figure(figsize=(10,5))
+        plt.plot(idx, summary["drift"], label="Drift")
+        plt.title("Drift Over Time")
+        plt.xlabel("Reading #")
+        plt.ylabel("Drift")
+        plt.legend()
+
+    def plot_rul_health():
+        plt.figure(figsize=(10,5))
+        plt.plot(idx, summary["rul_days"], label="RUL (days)")
+        plt.plot(idx, summary["health"], label="Health (%)")
+        plt.title("RUL & Health")
+        plt.xlabel("Reading #")
+        plt.ylabel("Value")
+        plt.legend()
+
+    for name, plot in (("drift.png", plot_drift), ("rul_health.png", plot_rul_health)):
+        plot()
+        plt.savefig(os.path.join(out_dir, name))
+        plt.close()
+
+    sns.set(style="whitegrid")
+    with PdfPages(os.path.join(out_dir, "report.pdf")) as pdf:
+        fig, ax = plt.subplots(figsize=(12,6))
+        ax.axis("off")
+        table = ax.table(cellText=summary["head"].values, colLabels=summary["head"].columns, loc="center")
+        table.auto_set_font_size(False)
+        table.set_fontsize(9)
+        pdf.savefig(fig)
+        plt.close()
+        for plot in (plot_drift, plot_rul_health):
+            plot()
+            pdf.savefig()
+            plt.close()
+        for key, title, color in (("alert_counts", "Alert Levels", ["green","orange","red"]),
+                                  ("maintenance_counts", "Maintenance Suggestions", "skyblue")):
+            plt.figure(figsize=(8,4))
+            summary[key].sort_values(ascending=False).plot(kind="bar", color=color)
+            plt.title(title)
+            pdf.savefig()
+            plt.close()
+    sns.reset_orig()
+
+
+def bench_report_rendering(sizes=(10_000, 100_000, 1_000_000), sensors=10, repeat=3):
+    """
+    Chart + PDF rendering before (_reference_render) and after (rendering.py:
+    reused templates, decimated series, RENDER_WORKERS processes). The
+    first rendering.py call builds the templates / starts the pool and is
+    reported separately.
+    """
+    results = []
+    for n in sizes:
+        summary = summarize_for_report(process_frame(generate_calibration_frame(n, sensors=sensors),
+                                                     models=False))
+        with tempfile.TemporaryDirectory() as tmp:
+            targets = {name: os.path.join(tmp, f"new-{name}") for name in ("drift", "rul_health", "pdf")}
+            seconds, _ = _best_of(repeat, lambda _: _reference_render(summary, tmp))
+            results.append(_result("render before (pyplot)", n, seconds))
+            seconds, _ = _best_of(1, lambda _: rendering.render_artifacts(summary, targets))
+            results.append(_result("render after (first call)", n, seconds))
+            seconds, _ = _best_of(repeat, lambda _: rendering.render_artifacts(summary, targets))
+            results.append(_result(f"render after ({rendering.RENDER_WORKERS} workers)", n, seconds))
+    rendering.shutdown()
+    return results
+
+
+# Suite defaults; results within REGRESSION_MIN_SECONDS of the baseline never count as regressions
+SUITE_SIZES = (10_000, 100_000, 1_000_000)
+SUITE_SENSORS = 10
+SUITE_REPORT_OUTPUTS = ("csv", "pdf")
+REGRESSION_THRESHOLD = 0.2
+REGRESSION_MIN_SECONDS = 0.005
+
+
+def _result(stage, rows, seconds, **extra):
+    return {"stage": stage, "rows": rows, "seconds": seconds,
+            "rows_per_sec": rows / seconds if seconds > 0 else float("inf"), **extra}
+
+
+def _best_of(repeat, fn, setup=lambda: None):
+    """Best wall time of `repeat` calls of fn(setup()); setup is not timed."""
+    best, value = float("inf"), None
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        value = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def _bench_stages(csv_path, n, out_dir, repeat):
+    results = []
+    seconds, df = _best_of(repeat, lambda _: load_csv(csv_path))
+    results.append(_result("load_csv", n, seconds))
+    for name, stage in (("compute_correction", compute_correction),
+                        ("detect_anomalies", detect_anomalies),
+                        ("predict_drift_and_rul", predict_drift_and_rul),
+                        ("assign_alerts_and_maintenance", assign_alerts_and_maintenance)):
+        seconds, df = _best_of(repeat, stage, setup=df.copy)
+        results.append(_result(name, n, seconds))
+    seconds, _ = _best_of(repeat, lambda _: save_to_db(df))
+    results.append(_result("save_to_db", n, seconds))
+    report_dir = os.path.join(out_dir, f"report-{n}")
+    os.makedirs(report_dir, exist_ok=True)
+    seconds, _ = _best_of(repeat, lambda _: generate_report(df, out_dir=report_dir,
+                                                            outputs=SUITE_REPORT_OUTPUTS))
+    results.append(_result("generate_report", n, seconds, outputs=list(SUITE_REPORT_OUTPUTS)))
+    return results
+
+
+def _bench_end_to_end(n, sensors, seed, out_dir, repeat, run_ids):
+    # Each repeat gets new data: identical files would be served from the run cache
+    from . import run_pipeline_on_uploaded_csv
+    best = float("inf")
+    for r in range(repeat):
+        csv_path = write_calibration_csv(os.path.join(out_dir, f"e2e-{n}-{r}.csv"), n,
+                                         sensors=sensors, seed=seed + 1 + r)
+        start = time.perf_counter()
+        result = run_pipeline_on_uploaded_csv(csv_path)
+        best = min(best, time.perf_counter() - start)
+        run_ids.append(result["run_id"])
+    return [_result("run_pipeline_on_uploaded_csv", n, best)]
+
+
+def _bench_endpoints(client, n, sensors, seed, out_dir, repeat, run_ids):
+    results = []
+    best = float("inf")
+    for r in range(repeat):
+        csv_path = write_calibration_csv(os.path.join(out_dir, f"upload-{n}-{r}.csv"), n,
+                                         sensors=sensors, seed=seed + 100 + r)
+        with open(csv_path, "rb") as fh:
+            body = fh.read()
+        start = time.perf_counter()
+        job = client.post("/upload_csv/", files={"file": ("bench.csv", body, "text/csv")}).json()
+        while (status := client.get(job["status_url"]).json())["status"] not in ("done", "failed"):
+            time.sleep(0.01)
+        best = min(best, time.perf_counter() - start)
+        assert status["status"] == "done", f"benchmark upload failed: {status.get('error')}"
+        run_ids.append(status["result"]["run_id"])
+    results.append(_result("POST /upload_csv/ (until job done)", n, best))
+
+    from .app import MAX_HISTORY_PAGE
+    limit = min(n, MAX_HISTORY_PAGE)
+    for fmt in ("records", "columnar", "ndjson"):
+        seconds, _ = _best_of(repeat, lambda _: client.get(
+            "/history/", params={"limit": limit, "format": fmt}).content)
+        results.append(_result(f"GET /history/ format={fmt}", limit, seconds))
+    if sensors > 1:
+        sensor_id = f"sensor-{0:0{len(str(sensors - 1))}d}"   # as named by synthetic.py
+        seconds, _ = _best_of(repeat, lambda _: client.get(
+            "/history/", params={"limit": limit, "sensor_id": sensor_id}).content)
+        results.append(_result("GET /history/ sensor_id filter", limit, seconds))
+    return results
+
+
+def _git_commit():
+    import subprocess
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def bench_suite(sizes=SUITE_SIZES, sensors=SUITE_SENSORS, repeat=3, seed=0, endpoints=True):
+    """
+    Reproducible end-to-end suite on generated data (fixed seed). Runs
+    against a scratch database (scratch_database()); run directories and
+    uploads it creates are removed.
+    :return: {"meta": {...}, "results": [{"stage", "rows", "seconds", "rows_per_sec"}, ...]}
+    """
+    meta = {"created_at": datetime.now().isoformat(), "commit": _git_commit(),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "sizes": list(sizes), "sensors": sensors,
+            "repeat": repeat, "seed": seed}
+    results, run_ids = [], []
+    with scratch_database() as tmp:
+        try:
+            for n in sizes:
+                csv_path = write_calibration_csv(os.path.join(tmp, f"bench-{n}.csv"), n,
+                                                 sensors=sensors, seed=seed)
+                added = (_bench_stages(csv_path, n, tmp, repeat)
+                         + _bench_end_to_end(n, sensors, seed, tmp, repeat, run_ids))
+                print_results(added)
+                results += added
+            if endpoints:
+                from fastapi.testclient import TestClient
+                from . import app as api
+                with TestClient(api.app) as client:
+                    # The first job starts the worker pool; keep that out of the timings
+                    _bench_endpoints(client, 100, sensors, seed + 1000, tmp, 1, run_ids)
+                    for n in sizes:
+                        added = _bench_endpoints(client, n, sensors, seed, tmp, repeat, run_ids)
+                        print_results(added)
+                        results += added
+        finally:
+            from .artifacts import run_dir
+            for run_id in run_ids:
+                shutil.rmtree(run_dir(run_id, create=False), ignore_errors=True)
+                if endpoints:   # uploads are stored as <content hash = run id>.csv
+                    from .app import UPLOAD_DIR
+                    upload = os.path.join(UPLOAD_DIR, f"{run_id}.csv")
+                    if os.path.exists(upload):
+                        os.remove(upload)
+    return {"meta": meta, "results": results}
+
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Regression check against an earlier suite run.
+    :return: list of messages for (stage, rows) results more than
+             `threshold` (fraction) slower than in the baseline
+    """
+    base = {(r["stage"], r["rows"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        before = base.get((r["stage"], r["rows"]))
+        if before is None:
+            continue
+        if r["seconds"] > before * (1 + threshold) and r["seconds"] - before > REGRESSION_MIN_SECONDS:
+            regressions.append(f"{r['stage']} ({r['rows']:,} rows): {r['seconds']:.4f}s vs "
+                               f"{before:.4f}s baseline (+{r['seconds'] / before - 1:.0%})")
+    return regressions
+
+
+# Cold-start budget for importing the package / API module in a fresh interpreter
+IMPORT_BUDGET_SECONDS = float(os.environ.get("CALIBRATION_IMPORT_BUDGET", 1.5))
+# Must only be imported by the stage that needs them, never at package import
+DEFERRED_MODULES = ("matplotlib", "seaborn", "scipy", "sklearn", "openpyxl",
+                    "joblib", "tensorflow", "keras")
+
+_IMPORT_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "db_opened": sys.modules["{package}.db"].is_configured(),
+                  "deferred": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def check_import_time(modules=None, budget=IMPORT_BUDGET_SECONDS, repeat=3):
+    """
+    Import-time regression check. Each module is imported in a fresh
+    interpreter (best of `repeat`); fails if it exceeds the budget, pulls in
+    a DEFERRED_MODULES dependency or opens the database.
+    :return: list of failure messages (empty = pass)
+    """
+    import json
+    import subprocess
+
+    package = __package__
+    modules = modules or (package, f"{package}.app")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    failures = []
+    for module in modules:
+        code = _IMPORT_PROBE.format(module=module, package=package, deferred=DEFERRED_MODULES)
+        runs = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True,
+                                 text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        best = min(runs, key=lambda r: r["seconds"])
+        print(f"{'import ' + module:<32} {best['seconds']:>9.4f} s  (budget {budget:.2f} s)")
+        if best["seconds"] > budget:
+            failures.append(f"import {module} took {best['seconds']:.3f}s > {budget:.2f}s")
+        if best["deferred"]:
+            failures.append(f"import {module} loaded deferred modules: {best['deferred']}")
+        if best["db_opened"]:
+            failures.append(f"import {module} opened the database")
+    return failures
+
+
+def print_results(results):
+    for r in results:
+        print(f"{r['stage']:<32} {r['rows']:>12,} rows  "
+              f"{r['seconds']:>9.4f} s  {r['rows_per_sec']:>14,.0f} rows/sec")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the computation engine.")
+    parser.add_argument("sizes", nargs="*", type=int, help="row counts")
+    parser.add_argument("--startup", action="store_true", help="import-time regression check only")
+    parser.add_argument("--suite", action="store_true", help="reproducible suite with JSON results")
+    parser.add_argument("--render", action="store_true", help="report rendering before/after only")
+    parser.add_argument("--sensors", type=int, default=SUITE_SENSORS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-endpoints", action="store_true", help="skip the API endpoints")
+    parser.add_argument("--output", help="write suite results to this JSON file")
+    parser.add_argument("--baseline", help="suite results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="allowed slowdown vs the baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        failures = check_import_time()
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1 if failures else 0
+
+    if args.suite:
+        report = bench_suite(tuple(args.sizes) or SUITE_SIZES, sensors=args.sensors,
+                             repeat=args.repeat, seed=args.seed, endpoints=not args.no_endpoints)
+        if args.output:
+            with open(args.output, "w") as fh:
+                json.dump(report, fh, indent=2)
+            print(f"✅ Benchmark results saved: {args.output}")
+        if args.baseline:
+            with open(args.baseline) as fh:
+                regressions = compare_results(report, json.load(fh), args.threshold)
+            for regression in regressions:
+                print(f"❌ {regression}")
+            if regressions:
+                return 1
+            print(f"✅ No regressions beyond {args.threshold:.0%} of {args.baseline}")
+        return 0
+
+    if args.render:
+        print_results(bench_report_rendering(tuple(args.sizes) or (10_000, 100_000, 1_000_000),
+                                             sensors=args.sensors, repeat=args.repeat))
+        return 0
+
+    sizes = tuple(args.sizes) or (10_000, 1_000_000, 10_000_000)
+    with scratch_database():
+        print_results(bench_detect_anomalies(sizes))
+        print_results(bench_assign_alerts(sizes))
+        print_results(bench_save_to_db(sizes))
+        print_results(bench_live_ingest(tuple(min(n, 100_000) for n in sizes)))
+        print_results(bench_model_scoring(sizes))
+        print_results(bench_report_rendering(tuple(min(n, 1_000_000) for n in sizes)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
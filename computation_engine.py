@@ -1,18 +1,19 @@
 import os
-import sqlite3
+import time
+import importlib.util
+import threading
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
-from sklearn.ensemble import IsolationForest
-from matplotlib.backends.backend_pdf import PdfPages
+
+from . import db, profiling
+from .rules import ALERT_RULES, MAINTENANCE_RULES, evaluate_rules
 
 # ---------------------------
 # 1. Database setup
 # ---------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_PATH = os.path.join(BASE_DIR, "database", "calibration.db")
+DB_PATH = os.environ.get("CALIBRATION_DB_PATH", os.path.join(BASE_DIR, "database", "calibration.db"))
 
 REPORT_DIR = os.path.join(BASE_DIR, "static", "reports")
 CHART_DIR = os.path.join(BASE_DIR, "static", "charts")
@@ -21,9 +22,16 @@ os.makedirs(REPORT_DIR, exist_ok=True)
 os.makedirs(CHART_DIR, exist_ok=True)
 
 
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-cursor.execute("""
+def connect_db(db_path=DB_PATH):
+    """
+    Standalone SQLite connection tuned for bulk ingest (WAL, relaxed fsync,
+    in-memory temp tables), e.g. for scratch databases. Application code
+    uses the per-thread pool instead: get_conn() / db.query() / db.transaction().
+    """
+    return db.SQLiteBackend(db_path).connect()
+
+
+READINGS_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS temperature_readings (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     timestamp TEXT,
@@ -38,14 +46,315 @@ CREATE TABLE IF NOT EXISTS temperature_readings (
     alert TEXT,
     maintenance TEXT
 )
-""")
-conn.commit()
+"""
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+MIGRATIONS = [
+    # 1: multi-sensor support
+    [
+        "ALTER TABLE temperature_readings ADD COLUMN sensor_id TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_readings_sensor_ts "
+        "ON temperature_readings (sensor_id, timestamp)",
+    ],
+    # 2: history filters. SQLite index entries end with the rowid (= id), so
+    # single-column indexes also serve "WHERE col = ? AND id < ? ORDER BY id"
+    [
+        "CREATE INDEX IF NOT EXISTS idx_readings_sensor ON temperature_readings (sensor_id)",
+        "CREATE INDEX IF NOT EXISTS idx_readings_alert ON temperature_readings (alert)",
+        "CREATE INDEX IF NOT EXISTS idx_readings_timestamp ON temperature_readings (timestamp)",
+    ],
+    # 3: chart rollups (see update_rollups), backfilled from existing rows
+    [
+        """
+        CREATE TABLE IF NOT EXISTS readings_rollup (
+            resolution INTEGER,
+            bucket_start INTEGER,
+            sensor_id TEXT,
+            drift_n INTEGER, drift_min REAL, drift_max REAL, drift_sum REAL,
+            rul_days_n INTEGER, rul_days_min REAL, rul_days_max REAL, rul_days_sum REAL,
+            health_n INTEGER, health_min REAL, health_max REAL, health_sum REAL,
+            PRIMARY KEY (resolution, sensor_id, bucket_start)
+        )
+        """,
+        """
+        INSERT INTO readings_rollup
+        SELECT r.resolution,
+               CAST(strftime('%s', t.timestamp) AS INTEGER) / r.resolution * r.resolution,
+               COALESCE(t.sensor_id, ''),
+               COUNT(t.drift), MIN(t.drift), MAX(t.drift), SUM(t.drift),
+               COUNT(t.rul_days), MIN(t.rul_days), MAX(t.rul_days), SUM(t.rul_days),
+               COUNT(t.health), MIN(t.health), MAX(t.health), SUM(t.health)
+        FROM temperature_readings t,
+             (SELECT 60 AS resolution UNION ALL SELECT 3600 UNION ALL SELECT 86400) r
+        WHERE strftime('%s', t.timestamp) IS NOT NULL
+        GROUP BY 1, 2, 3
+        """,
+    ],
+    # 4: per-sensor streaming state for incremental runs (see save_stream_state)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS stream_state (
+            sensor_id TEXT,
+            position INTEGER,
+            measured REAL,
+            offset REAL,
+            PRIMARY KEY (sensor_id, position)
+        )
+        """,
+    ],
+    # 5: run index (artifacts.py); used to be created when that module was imported
+    [
+        """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            created_at TEXT,
+            last_accessed TEXT,
+            size_bytes INTEGER,
+            result TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ingested_runs (
+            run_id TEXT PRIMARY KEY,
+            ingested_at TEXT
+        )
+        """,
+    ],
+    # 6: backfill checkpoints (backfill.py), written with each file's readings
+    [
+        """
+        CREATE TABLE IF NOT EXISTS backfill_files (
+            path TEXT PRIMARY KEY,
+            size_bytes INTEGER,
+            mtime_ns INTEGER,
+            finished_at TEXT,
+            summary TEXT
+        )
+        """,
+    ],
+    # 7: history compactions into the columnar archive (archive.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS archive_compactions (
+            cutoff TEXT,
+            rows INTEGER,
+            finished_at TEXT
+        )
+        """,
+    ],
+    # 8: fleet summaries (see update_summaries), backfilled from existing rows.
+    # scope is 'fleet' (key ''), 'day' (key YYYY-MM-DD) or 'sensor' (key sensor_id, '' = none)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS summary_counts (
+            scope TEXT,
+            key TEXT,
+            field TEXT,
+            label TEXT,
+            n INTEGER,
+            PRIMARY KEY (scope, key, field, label)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS summary_stats (
+            scope TEXT,
+            key TEXT,
+            readings INTEGER,
+            drift_n INTEGER, drift_min REAL, drift_max REAL, drift_sum REAL,
+            health_min REAL,
+            rul_days_min REAL,
+            latest_timestamp TEXT, latest_health REAL, latest_rul_days REAL,
+            PRIMARY KEY (scope, key)
+        )
+        """,
+        """
+        INSERT INTO summary_counts
+        SELECT s.scope,
+               CASE s.scope WHEN 'day' THEN COALESCE(substr(t.timestamp, 1, 10), '')
+                            WHEN 'sensor' THEN COALESCE(t.sensor_id, '') ELSE '' END,
+               f.field,
+               COALESCE(CASE f.field WHEN 'alert' THEN t.alert ELSE t.anomaly END, ''),
+               COUNT(*)
+        FROM temperature_readings t,
+             (SELECT 'fleet' AS scope UNION ALL SELECT 'day' UNION ALL SELECT 'sensor') s,
+             (SELECT 'alert' AS field UNION ALL SELECT 'anomaly') f
+        GROUP BY 1, 2, 3, 4
+        """,
+        """
+        INSERT INTO summary_stats (scope, key, readings, drift_n, drift_min, drift_max, drift_sum,
+                                   health_min, rul_days_min)
+        SELECT s.scope,
+               CASE s.scope WHEN 'day' THEN COALESCE(substr(t.timestamp, 1, 10), '')
+                            WHEN 'sensor' THEN COALESCE(t.sensor_id, '') ELSE '' END,
+               COUNT(*), COUNT(t.drift), MIN(t.drift), MAX(t.drift), SUM(t.drift),
+               MIN(t.health), MIN(t.rul_days)
+        FROM temperature_readings t,
+             (SELECT 'fleet' AS scope UNION ALL SELECT 'day' UNION ALL SELECT 'sensor') s
+        GROUP BY 1, 2
+        """,
+        # Latest reading per key, one statement per scope so each can use an index
+        *(f"""
+        UPDATE summary_stats SET (latest_timestamp, latest_health, latest_rul_days) = (
+            SELECT t.timestamp, t.health, t.rul_days FROM temperature_readings t
+            WHERE {where} ORDER BY t.timestamp DESC, t.id DESC LIMIT 1
+        )
+        WHERE {scope}
+        """ for scope, where in (
+            ("scope = 'fleet'", "1"),
+            ("scope = 'day'", "t.timestamp >= summary_stats.key "
+                              "AND t.timestamp < date(summary_stats.key, '+1 day')"),
+            ("scope = 'sensor' AND key != ''", "t.sensor_id = summary_stats.key"),
+            ("scope = 'sensor' AND key = ''", "t.sensor_id IS NULL"),
+        )),
+    ],
+]
+
+def migrate_db(db_conn):
+    """Bring the schema up to date; safe to run from several processes."""
+    db_conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = db_conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for sql in statements:
+                db_conn.execute(sql)
+            db_conn.execute(f"PRAGMA user_version = {number}")
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+
+def init_db(db_conn):
+    db_conn.execute(READINGS_TABLE_SQL)
+    db_conn.commit()
+    migrate_db(db_conn)
+
+
+# The connection pool is set up by init_storage() (the API's startup hook)
+# or on first use by scripts and job workers, never as an import side effect
+_storage_lock = threading.Lock()
+
+def init_storage(db_path=DB_PATH, backend=None):
+    """
+    Configure the per-thread connection pool (SQLite at db_path unless a
+    backend is given) and bring the schema up to date.
+    """
+    with _storage_lock:
+        if not db.is_configured():
+            db.configure(backend or db.SQLiteBackend(db_path))
+            init_db(db.connection())
+    return db.connection()
+
+db.set_initializer(init_storage)
+
+def get_conn():
+    """This thread's pooled connection."""
+    return db.connection()
 
 # ---------------------------
 # 2. Load CSV data
 # ---------------------------
-def load_csv(csv_path):
-    return pd.read_csv(csv_path)
+SENSOR_COLUMN = "sensor_id"
+SENSOR_COLUMN_ALIASES = ["sensor_id", "sensor", "device_id", "device", "probe_id"]
+
+def normalize_sensor_column(df):
+    """Rename the first recognised sensor/device column to `sensor_id`."""
+    if SENSOR_COLUMN not in df.columns:
+        for alias in SENSOR_COLUMN_ALIASES:
+            if alias in df.columns:
+                return df.rename(columns={alias: SENSOR_COLUMN})
+    return df
+
+# Input schema: column -> dtype; every other CSV column is skipped. Readings
+# stay float64: float32 keeps ~7 significant digits, too few for 6-decimal
+# readings near 100, and stuck detection compares readings exactly.
+# Timestamps are read as text and parsed in one vectorized pass.
+INPUT_SCHEMA = {"timestamp": "datetime", SENSOR_COLUMN: "str", "measured": "float64", "ideal": "float64"}
+REQUIRED_COLUMNS = ("measured", "ideal")
+# pandas' pyarrow engine parses with all cores (whole files only, no
+# chunksize); on a single core the C parser is faster
+CSV_ENGINE = os.environ.get("CALIBRATION_CSV_ENGINE") or (
+    "pyarrow" if importlib.util.find_spec("pyarrow") is not None and (os.cpu_count() or 1) > 1
+    else "c")
+
+def csv_header(csv_file):
+    """Column names from a CSV's header line (the body is not parsed)."""
+    return list(pd.read_csv(csv_file, nrows=0).columns)
+
+def input_schema(models=None):
+    """
+    INPUT_SCHEMA, plus the model features the CSV supplies itself as
+    optional float64 columns when model scoring is on.
+    :param models: see run_pipeline
+    """
+    if not _models_enabled(models):
+        return INPUT_SCHEMA
+    from .models import DERIVED_FEATURES, MODEL_FEATURES
+    computed = {*INPUT_SCHEMA, *DERIVED_FEATURES, *READING_COLUMNS}
+    features = {name: "float64" for name in MODEL_FEATURES if name not in computed}
+    return {**INPUT_SCHEMA, **features}
+
+def resolve_input_columns(columns, models=None):
+    """
+    Match a CSV header against input_schema(models), taking the first sensor
+    alias when there is no sensor_id column.
+    :return: {CSV column: schema column} for the columns to read
+    :raises KeyError: naming the missing required columns
+    """
+    schema = input_schema(models)
+    columns = list(columns)
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise KeyError(", ".join(missing))
+    sensor = next((a for a in SENSOR_COLUMN_ALIASES if a in columns), None)
+    # In header order, which is the order columns are read in
+    return {c: SENSOR_COLUMN if c == sensor else c for c in columns
+            if c == sensor or (c in schema and c != SENSOR_COLUMN)}
+
+def csv_read_options(mapping, models=None):
+    """read_csv keyword arguments that read just the mapped columns, typed."""
+    schema = input_schema(models)
+    dtypes = {column: "str" if schema[name] == "datetime" else schema[name]
+              for column, name in mapping.items()}
+    return {"usecols": list(mapping), "dtype": dtypes}
+
+def parse_timestamps(values):
+    """
+    Vectorized ISO 8601 parse; the text is kept if any value fails to parse.
+    Values with a UTC offset are converted to naive UTC, like the stored
+    timestamps (see _batch_timestamps); naive values are taken as UTC.
+    """
+    try:
+        parsed = pd.to_datetime(values, errors="coerce", format="ISO8601", utc=True).dt.tz_convert(None)
+    except (ValueError, TypeError):
+        return values
+    return parsed if parsed.notna().sum() == values.notna().sum() else values
+
+def apply_input_schema(df, mapping):
+    """Rename a frame read with csv_read_options to schema names and parse timestamps."""
+    df = df.rename(columns={c: n for c, n in mapping.items() if c != n})
+    if "timestamp" in df.columns:
+        df["timestamp"] = parse_timestamps(df["timestamp"])
+    return df
+
+def load_csv(csv_path, engine=None, models=None):
+    """
+    Read a calibration CSV per input_schema(models). The header is checked
+    first, so a file without measured/ideal fails before its body is parsed.
+    :param engine: read_csv engine (default CSV_ENGINE)
+    :param models: keep the model feature columns (see run_pipeline)
+    :raises KeyError: naming the missing required columns
+    """
+    mapping = resolve_input_columns(csv_header(csv_path), models)
+    options = csv_read_options(mapping, models)
+    engine = engine or CSV_ENGINE
+    try:
+        df = pd.read_csv(csv_path, engine=engine, **options)
+    except ValueError:
+        if engine == "c":
+            raise
+        # The C parser tolerates more (and explains what it rejects)
+        df = pd.read_csv(csv_path, engine="c", **options)
+    return apply_input_schema(df[options["usecols"]], mapping)
 
 # ---------------------------
 # 3. Compute offset & correction
@@ -58,200 +367,957 @@ def compute_correction(df):
 # ---------------------------
 # 4. Anomaly detection
 # ---------------------------
-def detect_anomalies(df, min_val=95, max_val=105, spike_threshold=2.0):
-    anomalies = []
-    
-    values = df["measured"].values
-    for i in range(len(values)):
-        val = values[i]
-        anomaly = None
+# Rows of history each sensor needs from before a frame: two previous
+# values for spike/stuck/noisy and DRIFT_WINDOW - 1 offsets for drift.
+DRIFT_WINDOW = 3
+CONTEXT_ROWS = max(2, DRIFT_WINDOW - 1)
+PARALLEL_MIN_ROWS = 1_000_000
+MAX_WORKERS = os.cpu_count() or 1
+
+# "Trend-Deviation" is only produced by the model-backed scorer (models.py)
+ANOMALY_LABELS = ["Normal", "Out-of-Range", "Spike", "Stuck", "Noisy", "Trend-Deviation"]
+
+def classify_anomalies(values, min_val=95, max_val=105, spike_threshold=2.0, positions=None):
+    """
+    Vectorized anomaly classifier over a 1-D array of measured values.
+    Precedence matches the original per-sample rules:
+    Out-of-Range > Spike > Stuck > Noisy > Normal.
+    Thresholds may be (k, 1) arrays to classify under k configurations at
+    once, giving (k, n) codes (see sweep.py).
+    :param positions: index of each sample within its own sensor series
+                      (None = one series); comparisons never cross series
+    :return: int8 array of codes into ANOMALY_LABELS
+    """
+    values = np.asarray(values)
+    n = len(values)
+    out_of_range = (values < min_val) | (values > max_val)
 
-        # Out-of-range
-        if val < min_val or val > max_val:
-            anomaly = "Out-of-Range"
+    # Shifted-array masks: index i compares against i-1 and i-2
+    spike = np.zeros(np.broadcast_shapes(np.shape(spike_threshold), (n,)), dtype=bool)
+    stuck = np.zeros(n, dtype=bool)
+    noisy = np.zeros(n, dtype=bool)
+    if n > 1:
+        step = values[1:] - values[:-1]
+        spike[..., 1:] = np.abs(step) > spike_threshold
+    if n > 2:
+        stuck[2:] = (values[2:] == values[1:-1]) & (values[1:-1] == values[:-2])
+        noisy[2:] = (step[1:] * step[:-1]) < 0
+    if positions is not None:
+        spike &= positions >= 1
+        stuck &= positions >= 2
+        noisy &= positions >= 2
 
-        # Spike (sudden jump compared to previous)
-        elif i > 0 and abs(val - values[i-1]) > spike_threshold:
-            anomaly = "Spike"
+    codes = np.zeros(np.broadcast_shapes(out_of_range.shape, spike.shape), dtype=np.int8)
+    # Lowest precedence first; later masks overwrite
+    for code, mask in ((4, noisy), (3, stuck), (2, spike), (1, out_of_range)):
+        np.copyto(codes, code, where=mask)
+    return codes
 
-        # Stuck value (3 repeats in a row)
-        elif i >= 2 and values[i] == values[i-1] == values[i-2]:
-            anomaly = "Stuck"
+def _with_context(df, column, context):
+    """Prepend carried-over context rows; returns (values, sensors, n_context)."""
+    values = df[column].values
+    sensors = df[SENSOR_COLUMN].values if SENSOR_COLUMN in df.columns else None
+    if context is None or not len(context):
+        return values, sensors, 0
+    values = np.concatenate([context[column].values, values])
+    if sensors is not None:
+        sensors = np.concatenate([context[SENSOR_COLUMN].values, sensors])
+    return values, sensors, len(context)
 
-        # Erratic fluctuations (random up/down)
-        elif i > 1 and ((val - values[i-1]) * (values[i-1] - values[i-2])) < 0:
-            anomaly = "Noisy"
+def sensor_order(sensors):
+    """
+    Stable grouping of rows by sensor.
+    :return: (order that groups rows by sensor, position of each sorted row
+             within its own series, boolean mask of series starts)
+    """
+    codes, _ = pd.factorize(sensors, use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    n = len(sorted_codes)
+    starts = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]] if n else np.zeros(0, dtype=bool)
+    idx = np.arange(n)
+    positions = idx - np.maximum.accumulate(np.where(starts, idx, 0)) if n else idx
+    return order, positions, starts
+
+def run_per_sensor(kernel, values, sensors, max_workers=MAX_WORKERS, **kwargs):
+    """
+    Apply a vectorized kernel(values, positions=..., **kwargs) to every
+    sensor series independently, without a Python loop over sensors.
+    Rows are stably grouped by sensor, each row gets its position within its
+    series, and the kernel masks out comparisons that would cross series.
+    Large inputs are split at series boundaries and processed on a thread
+    pool (NumPy releases the GIL, so partitions run on separate cores).
+    """
+    if sensors is None:
+        return kernel(values, **kwargs)
 
-        anomalies.append(anomaly if anomaly else "Normal")
+    order, positions, starts = sensor_order(sensors)
+    sorted_values = np.asarray(values)[order]
+    n = len(order)
 
-    df["anomaly"] = anomalies
+    parts = 1 if n < PARALLEL_MIN_ROWS else min(max_workers, int(starts.sum()))
+    if parts <= 1:
+        result = kernel(sorted_values, positions=positions, **kwargs)
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        group_starts = np.flatnonzero(starts)
+        cuts = group_starts[np.searchsorted(group_starts, np.linspace(0, n, parts + 1)[1:-1])]
+        bounds = list(zip(np.r_[0, cuts], np.r_[cuts, n]))
+        with ThreadPoolExecutor(max_workers=parts) as pool:
+            pieces = pool.map(lambda b: kernel(sorted_values[b[0]:b[1]],
+                                               positions=positions[b[0]:b[1]], **kwargs), bounds)
+            result = np.concatenate(list(pieces))
+
+    out = np.empty_like(result)
+    out[order] = result
+    return out
+
+def detect_anomalies(df, min_val=95, max_val=105, spike_threshold=2.0, context=None):
+    """
+    Classify every reading; readings are compared only against earlier
+    readings of the same sensor when a sensor_id column is present.
+    :param context: DataFrame of the rows that precede this frame (at least
+                    the last CONTEXT_ROWS per sensor), carried across chunk
+                    boundaries when streaming
+    """
+    values, sensors, n_context = _with_context(df, "measured", context)
+    codes = run_per_sensor(classify_anomalies, values, sensors, min_val=min_val,
+                           max_val=max_val, spike_threshold=spike_threshold)
+    df["anomaly"] = pd.Categorical.from_codes(codes[n_context:], categories=ANOMALY_LABELS)
     return df
 
 # ---------------------------
 # 5. Drift & RUL Prediction
 # ---------------------------
-def predict_drift_and_rul(df):
-    df["drift"] = df["offset"].rolling(window=3, min_periods=1).mean()
+def rolling_mean(values, window=DRIFT_WINDOW, positions=None):
+    """
+    Trailing mean over the last `window` non-NaN samples (min_periods=1).
+    Each output depends only on its own window, so results are identical
+    whether a series is processed whole or in chunks with carried context.
+    :param positions: index of each sample within its own sensor series
+                      (None = one series); windows never cross series
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    total = np.zeros(n)
+    count = np.zeros(n)
+    for lag in range(min(window, n)):
+        shifted = values[:n - lag]
+        valid = ~np.isnan(shifted)
+        if positions is not None:
+            valid &= positions[lag:] >= lag
+        total[lag:] += np.where(valid, shifted, 0.0)
+        count[lag:] += valid
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+def predict_drift_and_rul(df, context=None):
+    """
+    Per-sensor rolling drift plus heuristic RUL and health.
+    :param context: see detect_anomalies
+    """
+    offsets, sensors, n_context = _with_context(df, "offset", context)
+    df["drift"] = run_per_sensor(rolling_mean, offsets, sensors)[n_context:]
     df["rul_days"] = np.maximum(0, 30 - df["drift"].abs()*10)
     df["health"] = np.clip(100 - df["drift"].abs()*20, 0, 100)
     return df
 
+def tail_context(context, df, rows=CONTEXT_ROWS, columns=("measured", "offset")):
+    """
+    Rows to carry into the next frame: the last `rows` readings of every
+    sensor seen so far (sensors absent from df keep their old tail).
+    """
+    columns = [c for c in (SENSOR_COLUMN, *columns) if c in df.columns]
+    frames = [df[columns]] if context is None else [context[columns], df[columns]]
+    combined = pd.concat(frames, ignore_index=True)
+    if SENSOR_COLUMN in combined.columns:
+        return combined.groupby(SENSOR_COLUMN, sort=False, dropna=False).tail(rows) \
+                       .reset_index(drop=True)
+    return combined.tail(rows).reset_index(drop=True)
+
+# Incremental mode: each sensor's context is persisted with its readings, so
+# the next upload for that sensor continues the series instead of starting
+# from zero. Results equal reprocessing the concatenated history, provided
+# uploads for the same sensor are processed one after another.
+STATE_QUERY_BATCH = 500  # stays under SQLite's bound-variable limit
+
+def _state_keys(df):
+    """
+    sensor value -> stream_state key. Files without sensors and readings
+    with no sensor_id share the key ''.
+    """
+    if SENSOR_COLUMN not in df.columns:
+        return {None: ""}
+    return {s: "" if pd.isna(s) else str(s) for s in pd.unique(df[SENSOR_COLUMN])}
+
+def load_stream_state(df, skip=(), db_conn=None):
+    """
+    Persisted context for the sensors in df, in the shape tail_context returns.
+    :param skip: state keys already loaded (streaming loads sensors as they appear)
+    :return: (context DataFrame or None, set of state keys looked up)
+    """
+    db_conn = db_conn or get_conn()
+    keys = {key: sensor for sensor, key in _state_keys(df).items() if key not in skip}
+    names = list(keys)
+    rows = []
+    for first in range(0, len(names), STATE_QUERY_BATCH):
+        part = names[first:first + STATE_QUERY_BATCH]
+        rows += db.query(
+            "SELECT sensor_id, measured, offset FROM stream_state "
+            f"WHERE sensor_id IN ({', '.join('?' * len(part))}) ORDER BY sensor_id, position",
+            part, db_conn,
+        )
+    if not rows:
+        return None, set(keys)
+    context = pd.DataFrame(rows, columns=[SENSOR_COLUMN, "measured", "offset"])
+    if SENSOR_COLUMN in df.columns:
+        context[SENSOR_COLUMN] = context[SENSOR_COLUMN].map(keys)
+    else:
+        context = context.drop(columns=SENSOR_COLUMN)
+    return context, set(keys)
+
+def save_stream_state(context, db_conn=None):
+    """
+    Replace the persisted context of every sensor present in `context`.
+    Runs inside the caller's transaction (save_to_db) so state and readings
+    are committed together.
+    """
+    db_conn = db_conn or get_conn()
+    if SENSOR_COLUMN in context.columns:
+        sensors = context[SENSOR_COLUMN]
+        keys = sensors.astype(str).where(sensors.notna(), "")
+    else:
+        keys = pd.Series("", index=context.index)
+    positions = keys.groupby(keys, sort=False).cumcount()
+    db.executemany("DELETE FROM stream_state WHERE sensor_id = ?",
+                   [(key,) for key in keys.unique()], db_conn)
+    db.executemany(
+        "INSERT INTO stream_state (sensor_id, position, measured, offset) VALUES (?, ?, ?, ?)",
+        zip(keys.tolist(), positions.tolist(), context["measured"].tolist(), context["offset"].tolist()),
+        db_conn,
+    )
+
 # ---------------------------
 # 6. Alerts & Maintenance Suggestion
 # ---------------------------
-def assign_alerts_and_maintenance(df, min_val=95, max_val=105):
-    alerts = []
-    maint = []
-    for _, row in df.iterrows():
-        if row["measured"] < min_val or row["measured"] > max_val:
-            alerts.append("CRITICAL")
-        elif row["anomaly"] != "Normal":
-            alerts.append("WARNING")
-        else:
-            alerts.append("NORMAL")
-
-        if row["health"] < 50 or row["rul_days"] < 7:
-            maint.append("Recalibrate within 1 week")
-        elif row["health"] < 70:
-            maint.append("Monitor closely, recalibrate soon")
-        else:
-            maint.append("No action needed")
-    
-    df["alert"] = alerts
-    df["maintenance"] = maint
+def assign_alerts_and_maintenance(df, min_val=95, max_val=105, thresholds=None,
+                                  alert_rules=None, maintenance_rules=None):
+    """
+    Column-wise alert and maintenance assignment driven by rule tables.
+    Sites can pass their own thresholds and rule tables (see rules.py).
+    """
+    thresholds = {"min_val": min_val, "max_val": max_val, **(thresholds or {})}
+    df["alert"] = evaluate_rules(df, alert_rules or ALERT_RULES, thresholds)
+    df["maintenance"] = evaluate_rules(df, maintenance_rules or MAINTENANCE_RULES, thresholds)
     return df
 
 # ---------------------------
 # 7. Store in SQLite
 # ---------------------------
-def save_to_db(df):
-    for _, row in df.iterrows():
-        cursor.execute("""
-        INSERT INTO temperature_readings 
-        (timestamp, measured, ideal, offset, corrected, anomaly, drift, rul_days, health, alert, maintenance)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            datetime.now().isoformat(),
-            row["measured"], row["ideal"], row["offset"], row["corrected"],
-            row["anomaly"], row["drift"], row["rul_days"], row["health"],
-            row["alert"], row["maintenance"]
-        ))
-    conn.commit()
+READING_COLUMNS = ["measured", "ideal", "offset", "corrected", "anomaly",
+                   "drift", "rul_days", "health", "alert", "maintenance", SENSOR_COLUMN]
+
+INSERT_READING_SQL = f"""
+INSERT INTO temperature_readings
+(timestamp, {", ".join(READING_COLUMNS)})
+VALUES ({", ".join("?" * (len(READING_COLUMNS) + 1))})
+"""
+
+def _batch_timestamps(batch, batch_time):
+    """
+    Use the CSV's own timestamp column when present, else one timestamp per batch.
+    Times with a UTC offset are stored converted to UTC; naive times as given.
+    :return: (ISO strings for the timestamp column, int64 epoch seconds)
+             Naive times are treated as UTC, matching SQLite's strftime('%s').
+    """
+    batch_ts = batch_time.isoformat()
+    batch_epoch = pd.Timestamp(batch_time).value // 10**9
+    if "timestamp" not in batch.columns:
+        return [batch_ts] * len(batch), np.full(len(batch), batch_epoch, dtype=np.int64)
+    parsed = pd.to_datetime(batch["timestamp"], errors="coerce", utc=True).dt.tz_convert(None)
+    iso = parsed.dt.strftime("%Y-%m-%dT%H:%M:%S.%f")
+    epochs = parsed.values.astype("datetime64[s]").astype(np.int64)
+    epochs[parsed.isna().values] = batch_epoch
+    return iso.where(parsed.notna(), batch_ts).tolist(), epochs
+
+# Rollup buckets (seconds) kept up to date on every insert for chart queries
+ROLLUP_RESOLUTIONS = [60, 3600, 86400]
+ROLLUP_METRICS = ["drift", "rul_days", "health"]
+
+_ROLLUP_FIELDS = [f"{m}_{agg}" for m in ROLLUP_METRICS for agg in ("n", "min", "max", "sum")]
+_ROLLUP_MERGE = ",\n    ".join(
+    f"{m}_n = {m}_n + excluded.{m}_n, "
+    f"{m}_min = coalesce(min({m}_min, excluded.{m}_min), {m}_min, excluded.{m}_min), "
+    f"{m}_max = coalesce(max({m}_max, excluded.{m}_max), {m}_max, excluded.{m}_max), "
+    f"{m}_sum = coalesce({m}_sum, 0) + coalesce(excluded.{m}_sum, 0)"
+    for m in ROLLUP_METRICS
+)
+UPSERT_ROLLUP_SQL = f"""
+INSERT INTO readings_rollup (resolution, bucket_start, sensor_id, {", ".join(_ROLLUP_FIELDS)})
+VALUES ({", ".join("?" * (3 + len(_ROLLUP_FIELDS)))})
+ON CONFLICT (resolution, sensor_id, bucket_start) DO UPDATE SET
+    {_ROLLUP_MERGE}
+"""
+
+def _text_values(batch, column):
+    """
+    A column as stored text keys: missing values (and a missing column)
+    become '', like the migrations' COALESCE(column, '').
+    """
+    if column not in batch.columns:
+        return np.full(len(batch), "", dtype=object)
+    values = batch[column].astype(object)
+    return values.where(values.notna(), "").astype(str).values
+
+def update_rollups(db_conn, batch, epochs):
+    """
+    Fold a batch into readings_rollup (count/min/max/sum per metric, per
+    sensor, per bucket) with one vectorized groupby and an UPSERT per bucket.
+    """
+    if not len(batch):
+        return
+    frame = pd.DataFrame({m: batch[m].values for m in ROLLUP_METRICS})
+    frame["sensor_id"] = _text_values(batch, SENSOR_COLUMN)
+    for resolution in ROLLUP_RESOLUTIONS:
+        frame["bucket_start"] = epochs // resolution * resolution
+        agg = frame.groupby(["bucket_start", "sensor_id"], sort=False) \
+                   .agg(["count", "min", "max", "sum"])
+        agg.columns = _ROLLUP_FIELDS
+        agg = agg.reset_index()
+        agg = agg.astype(object).where(agg.notna(), None)
+        rows = zip([resolution] * len(agg), agg["bucket_start"].tolist(), agg["sensor_id"].tolist(),
+                   *(agg[f].tolist() for f in _ROLLUP_FIELDS))
+        db.executemany(UPSERT_ROLLUP_SQL, rows, db_conn)
+
+# Fleet summaries (summary_counts/summary_stats) kept up to date on every
+# insert, so /summary/ reads a handful of rows however much history is stored
+SUMMARY_SCOPES = ["fleet", "day", "sensor"]
+SUMMARY_COUNT_FIELDS = ["alert", "anomaly"]
+
+UPSERT_SUMMARY_COUNT_SQL = """
+INSERT INTO summary_counts (scope, key, field, label, n) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (scope, key, field, label) DO UPDATE SET n = n + excluded.n
+"""
+_SUMMARY_LATEST = ["latest_timestamp", "latest_health", "latest_rul_days"]
+_SUMMARY_FIELDS = ["readings", "drift_n", "drift_min", "drift_max", "drift_sum",
+                   "health_min", "rul_days_min"] + _SUMMARY_LATEST
+UPSERT_SUMMARY_STATS_SQL = f"""
+INSERT INTO summary_stats (scope, key, {", ".join(_SUMMARY_FIELDS)})
+VALUES ({", ".join("?" * (2 + len(_SUMMARY_FIELDS)))})
+ON CONFLICT (scope, key) DO UPDATE SET
+    readings = readings + excluded.readings,
+    drift_n = drift_n + excluded.drift_n,
+    drift_min = coalesce(min(drift_min, excluded.drift_min), drift_min, excluded.drift_min),
+    drift_max = coalesce(max(drift_max, excluded.drift_max), drift_max, excluded.drift_max),
+    drift_sum = coalesce(drift_sum, 0) + coalesce(excluded.drift_sum, 0),
+    health_min = coalesce(min(health_min, excluded.health_min), health_min, excluded.health_min),
+    rul_days_min = coalesce(min(rul_days_min, excluded.rul_days_min), rul_days_min, excluded.rul_days_min),
+    {", ".join(f"{f} = CASE WHEN latest_timestamp IS NULL OR excluded.latest_timestamp >= latest_timestamp "
+               f"THEN excluded.{f} ELSE {f} END" for f in _SUMMARY_LATEST)}
+"""
+
+def update_summaries(db_conn, batch, timestamps):
+    """
+    Fold a batch into the fleet summaries: alert/anomaly counts, drift
+    min/max/sum, lowest health/RUL and the latest reading, for the whole
+    fleet, per day and per sensor. One groupby and two UPSERTs per scope.
+    :param timestamps: the batch's ISO timestamps, as stored
+    """
+    if not len(batch):
+        return
+    frame = batch.reindex(columns=["drift", "health", "rul_days"]).astype(float)
+    frame["timestamp"] = timestamps
+    for field in SUMMARY_COUNT_FIELDS:
+        frame[field] = _text_values(batch, field)
+    keys = {
+        "fleet": np.full(len(batch), "", dtype=object),
+        "day": frame["timestamp"].str[:10].values,
+        "sensor": _text_values(batch, SENSOR_COLUMN),
+    }
+    # Stable sort: equal timestamps keep insertion (id) order, so the last
+    # row per key is the reading the migration's backfill would pick
+    order = np.argsort(frame["timestamp"].values, kind="stable")
+    for scope in SUMMARY_SCOPES:
+        frame["key"] = keys[scope]
+        for field in SUMMARY_COUNT_FIELDS:
+            counts = frame.groupby(["key", field], sort=False).size()
+            db.executemany(UPSERT_SUMMARY_COUNT_SQL,
+                           ((scope, key, field, label, int(n)) for (key, label), n in counts.items()),
+                           db_conn)
+        agg = frame.groupby("key", sort=False).agg(
+            readings=("drift", "size"), drift_n=("drift", "count"), drift_min=("drift", "min"),
+            drift_max=("drift", "max"), drift_sum=("drift", "sum"),
+            health_min=("health", "min"), rul_days_min=("rul_days", "min"))
+        latest = frame.iloc[order].drop_duplicates("key", keep="last").set_index("key")
+        agg[_SUMMARY_LATEST] = latest.loc[agg.index, ["timestamp", "health", "rul_days"]].values
+        agg = agg.reset_index()
+        agg = agg.astype(object).where(agg.notna(), None)
+        rows = zip([scope] * len(agg), agg["key"].tolist(), *(agg[f].tolist() for f in _SUMMARY_FIELDS))
+        db.executemany(UPSERT_SUMMARY_STATS_SQL, rows, db_conn)
+
+def save_to_db(df, db_conn=None, batch_size=50_000, state=None, extra_writes=None, verbose=False):
+    """
+    Bulk insert processed readings with executemany in chunked batches,
+    all inside a single transaction. Chart rollups and fleet summaries are
+    updated in the same transaction.
+    :param state: per-sensor context to persist for incremental runs
+    :param extra_writes: callable(db_conn) run inside the same transaction,
+                         e.g. to record a backfill checkpoint
+    :param verbose: print the write rate; streaming chunks and live flushes stay quiet
+    :return: dict with rows written, elapsed seconds and rows/sec
+    """
+    db_conn = db_conn or get_conn()
+    profiled = profiling.current() is not None
+    if profiled:
+        pages = db.query_one("PRAGMA page_count", (), db_conn)[0]
+    start = time.perf_counter()
+    with db_conn:
+        for first in range(0, len(df), batch_size):
+            batch = df.iloc[first:first + batch_size]
+            timestamps, epochs = _batch_timestamps(batch, datetime.now())
+            # sensor_id is optional: single-sensor files store NULL
+            columns = [batch[c].tolist() if c in batch.columns else [None] * len(batch)
+                       for c in READING_COLUMNS]
+            db.executemany(INSERT_READING_SQL, zip(timestamps, *columns), db_conn)
+            update_rollups(db_conn, batch, epochs)
+            update_summaries(db_conn, batch, timestamps)
+        if state is not None:
+            save_stream_state(state, db_conn)
+        if extra_writes is not None:
+            extra_writes(db_conn)
+    elapsed = time.perf_counter() - start
+    if profiled:
+        page_size = db.query_one("PRAGMA page_size", (), db_conn)[0]
+        grown = db.query_one("PRAGMA page_count", (), db_conn)[0] - pages
+        profiling.count(bytes_written=max(grown, 0) * page_size)
+
+    stats = {"rows": len(df), "seconds": elapsed,
+             "rows_per_sec": len(df) / elapsed if elapsed > 0 else float("inf")}
+    if verbose:
+        print(f"✅ Saved {stats['rows']} rows to DB ({stats['rows_per_sec']:,.0f} rows/sec)")
+    return stats
 
 # ---------------------------
 # 8. Report generation (CSV, Excel, PDF with charts & insights)
 # ---------------------------
-def generate_report(df, filename_prefix="latest_report"):
-    csv_file = os.path.join(REPORT_DIR, f"{filename_prefix}.csv")
-    excel_file = os.path.join(REPORT_DIR, f"{filename_prefix}.xlsx")
-    pdf_file = os.path.join(REPORT_DIR, f"{filename_prefix}.pdf")
-        # --- Also save charts as PNG for frontend ---
-    plt.figure(figsize=(10,5))
-    plt.plot(df.index, df["drift"], label="Drift")
-    plt.title("Drift Over Time")
-    plt.xlabel("Reading #")
-    plt.ylabel("Drift")
-    plt.legend()
-    drift_png = os.path.join(CHART_DIR, "drift.png")
-    plt.savefig(drift_png)
-    plt.close()
-
-    plt.figure(figsize=(10,5))
-    plt.plot(df.index, df["rul_days"], label="RUL (days)")
-    plt.plot(df.index, df["health"], label="Health (%)")
-    plt.title("RUL & Health")
-    plt.xlabel("Reading #")
-    plt.ylabel("Value")
-    plt.legend()
-    rul_png = os.path.join(CHART_DIR, "rul_health.png")
-    plt.savefig(rul_png)
-    plt.close()
-
-    print(f"✅ Charts saved to {CHART_DIR}")
-
-
-
-    df.to_csv(csv_file, index=False)
-    df.to_excel(excel_file, index=False)
-
-    sns.set(style="whitegrid")
-    with PdfPages(pdf_file) as pdf:
-        # Table
-        fig, ax = plt.subplots(figsize=(12,6))
-        ax.axis("off")
-        table = ax.table(
-            cellText=df.head(20).values,
-            colLabels=df.columns,
-            loc="center"
-        )
-        table.auto_set_font_size(False)
-        table.set_fontsize(9)
-        pdf.savefig(fig)
-        plt.close()
-
-        # Drift
-        plt.figure(figsize=(10,5))
-        plt.plot(df.index, df["drift"], label="Drift")
-        plt.title("Drift Over Time")
-        plt.xlabel("Reading #")
-        plt.ylabel("Drift")
-        plt.legend()
-        pdf.savefig()
-        plt.close()
-
-        # RUL / Health
-        plt.figure(figsize=(10,5))
-        plt.plot(df.index, df["rul_days"], label="RUL (days)")
-        plt.plot(df.index, df["health"], label="Health (%)")
-        plt.title("RUL & Health")
-        plt.xlabel("Reading #")
-        plt.ylabel("Value")
-        plt.legend()
-        pdf.savefig()
-        plt.close()
-
-        # Alerts summary
-        plt.figure(figsize=(8,4))
-        df["alert"].value_counts().plot(kind="bar", color=["green","orange","red"])
-        plt.title("Alert Levels")
-        pdf.savefig()
-        plt.close()
-
-        # Maintenance summary
-        plt.figure(figsize=(8,4))
-        df["maintenance"].value_counts().plot(kind="bar", color="skyblue")
-        plt.title("Maintenance Suggestions")
-        pdf.savefig()
-        plt.close()
-
-    print(f"✅ CSV saved: {csv_file}")
-    print(f"✅ Excel saved: {excel_file}")
-    print(f"✅ PDF report saved: {pdf_file}")
+REPORT_SERIES = ["drift", "rul_days", "health"]
+REPORT_TABLE_ROWS = 20
+
+def summarize_for_report(df):
+    """Everything the charts and PDF need, taken from a fully loaded frame."""
+    summary = {
+        "head": df.head(REPORT_TABLE_ROWS),
+        "index": df.index.values,
+        "alert_counts": df["alert"].value_counts(),
+        "maintenance_counts": df["maintenance"].value_counts(),
+    }
+    for col in REPORT_SERIES:
+        summary[col] = df[col].values
+    return summary
+
+def new_report_summary(max_points=20_000):
+    """Empty bounded-size summary, filled chunk by chunk when streaming."""
+    summary = {
+        "head": None,
+        "index": np.empty(0, dtype=np.int64),
+        "alert_counts": pd.Series(dtype="int64"),
+        "maintenance_counts": pd.Series(dtype="int64"),
+        "stride": 1,
+        "max_points": max_points,
+    }
+    for col in REPORT_SERIES:
+        summary[col] = np.empty(0)
+    return summary
+
+def _add_counts(total, column):
+    counts = column.value_counts()
+    counts.index = counts.index.astype(str)
+    return total.add(counts, fill_value=0).astype("int64")
+
+def update_report_summary(summary, chunk):
+    """
+    Fold one processed chunk into a streaming summary. Chart series are
+    decimated by doubling the sampling stride so memory stays bounded.
+    """
+    if summary["head"] is None:
+        summary["head"] = chunk.head(REPORT_TABLE_ROWS)
+    elif len(summary["head"]) < REPORT_TABLE_ROWS:
+        summary["head"] = pd.concat([summary["head"], chunk]).head(REPORT_TABLE_ROWS)
+
+    keep = chunk.index.values % summary["stride"] == 0
+    summary["index"] = np.concatenate([summary["index"], chunk.index.values[keep]])
+    for col in REPORT_SERIES:
+        summary[col] = np.concatenate([summary[col], chunk[col].values[keep]])
+    while len(summary["index"]) > summary["max_points"]:
+        summary["stride"] *= 2
+        keep = summary["index"] % summary["stride"] == 0
+        for key in ["index"] + REPORT_SERIES:
+            summary[key] = summary[key][keep]
+
+    summary["alert_counts"] = _add_counts(summary["alert_counts"], chunk["alert"])
+    summary["maintenance_counts"] = _add_counts(summary["maintenance_counts"], chunk["maintenance"])
+    return summary
+
+# Declared artifact manifest: name -> file written inside a run's output dir
+REPORT_ARTIFACTS = {
+    "csv": {"filename": "processed.csv", "media_type": "text/csv"},
+    "excel": {"filename": "processed.xlsx",
+              "media_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "pdf": {"filename": "report.pdf", "media_type": "application/pdf"},
+    "drift": {"filename": "drift.png", "media_type": "image/png"},
+    "rul_health": {"filename": "rul_health.png", "media_type": "image/png"},
+    "parquet": {"filename": "processed.parquet", "media_type": "application/vnd.apache.parquet"},
+}
+# Parquet needs the optional pyarrow dependency (see archive.py)
+ARCHIVE_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+DEFAULT_OUTPUTS = tuple(name for name in REPORT_ARTIFACTS if name != "parquet" or ARCHIVE_AVAILABLE)
+CHART_ARTIFACTS = ("drift", "rul_health")
+
+def resolve_outputs(outputs=None):
+    """Validate requested artifact names; None means every artifact."""
+    if outputs is None:
+        return DEFAULT_OUTPUTS
+    unknown = set(outputs) - set(REPORT_ARTIFACTS)
+    if unknown:
+        raise ValueError(f"Unknown report outputs: {sorted(unknown)}")
+    return tuple(name for name in DEFAULT_OUTPUTS if name in outputs)
+
+def artifact_path(out_dir, name):
+    return os.path.join(out_dir, REPORT_ARTIFACTS[name]["filename"])
+
+def render_from_summary(summary, out_dir, outputs=DEFAULT_OUTPUTS):
+    """
+    Render the chart and PDF artifacts that were requested, each exactly
+    once, in parallel where cores allow (rendering.py).
+    :return: manifest dict {artifact name: path}
+    """
+    names = [name for name in CHART_ARTIFACTS + ("pdf",) if name in outputs]
+    if not names:
+        return {}
+    from .rendering import render_artifacts
+    manifest = render_artifacts(summary, {name: artifact_path(out_dir, name) for name in names})
+    for name, path in manifest.items():
+        print(f"✅ {name} saved: {path}")
+    return manifest
+
+def generate_report(df, out_dir=REPORT_DIR, outputs=DEFAULT_OUTPUTS):
+    """
+    Single report-rendering stage: writes only the requested artifacts.
+    outputs=() renders nothing (JSON-only API clients).
+    :return: manifest dict {artifact name: path}
+    """
+    manifest = {}
+    if "csv" in outputs:
+        manifest["csv"] = artifact_path(out_dir, "csv")
+        df.to_csv(manifest["csv"], index=False)
+        print(f"✅ CSV saved: {manifest['csv']}")
+    if "excel" in outputs:
+        manifest["excel"] = artifact_path(out_dir, "excel")
+        df.to_excel(manifest["excel"], index=False)
+        print(f"✅ Excel saved: {manifest['excel']}")
+    if "parquet" in outputs:
+        from .archive import write_run
+        manifest["parquet"] = write_run(df, artifact_path(out_dir, "parquet"))
+        print(f"✅ Parquet saved: {manifest['parquet']}")
+    if any(name in outputs for name in ("pdf",) + CHART_ARTIFACTS):
+        manifest.update(render_from_summary(summarize_for_report(df), out_dir, outputs))
+    profiling.count(bytes_written=profiling.file_bytes(manifest.values()))
+    return manifest
 
 # ---------------------------
 # 9. Full pipeline runner
 # ---------------------------
-def run_pipeline(csv_path):
-    df = load_csv(csv_path)
+PIPELINE_STAGES = [
+    "load_csv",
+    "compute_correction",
+    "detect_anomalies",
+    "predict_drift_and_rul",
+    "apply_models",
+    "assign_alerts_and_maintenance",
+    "save_to_db",
+    "generate_report",
+]
+
+def _report_stage(progress, stage, fraction=None, rows=0):
+    """
+    Call the optional progress(stage, fraction) hook used by the job queue,
+    and start timing the stage if the run is profiled (profiling.py).
+    :param rows: rows entering the stage
+    """
+    if stage in PIPELINE_STAGES:
+        profiling.stage(stage, rows)
+    if progress is not None:
+        if fraction is None and stage in PIPELINE_STAGES:
+            fraction = PIPELINE_STAGES.index(stage) / len(PIPELINE_STAGES)
+        progress(stage, fraction)
+
+def _models_enabled(models):
+    if models is None:
+        from .models import MODELS_ENABLED
+        return MODELS_ENABLED
+    return models
+
+def process_frame(df, context=None, models=None, progress=None):
+    """
+    Computation stages on a loaded frame, correction through alerts. Does
+    not touch the database, so it can run in worker processes.
+    :param context: see detect_anomalies
+    :param models: see run_pipeline
+    """
+    _report_stage(progress, "compute_correction", rows=len(df))
     df = compute_correction(df)
-    df = detect_anomalies(df)
-    df = predict_drift_and_rul(df)
-    df = assign_alerts_and_maintenance(df)
-    save_to_db(df)
-    generate_report(df)
-    return df
+    _report_stage(progress, "detect_anomalies", rows=len(df))
+    df = detect_anomalies(df, context=context)
+    _report_stage(progress, "predict_drift_and_rul", rows=len(df))
+    df = predict_drift_and_rul(df, context=context)
+    if _models_enabled(models):
+        from .models import apply_models
+        _report_stage(progress, "apply_models", rows=len(df))
+        df = apply_models(df)
+    _report_stage(progress, "assign_alerts_and_maintenance", rows=len(df))
+    return assign_alerts_and_maintenance(df)
+
+def run_pipeline(csv_path, progress=None, out_dir=REPORT_DIR, outputs=DEFAULT_OUTPUTS,
+                 incremental=False, save_readings=True, models=None):
+    """
+    Full in-memory run.
+    :param incremental: continue each sensor's series from its persisted
+                        state and persist the new state with the readings
+    :param save_readings: store the readings (and any new state); False only
+                          renders the reports (a run whose readings are
+                          already in the DB)
+    :param models: score with the shipped models where possible (models.py);
+                   None follows CALIBRATION_MODELS
+    :return: (processed DataFrame, artifact manifest)
+    """
+    _report_stage(progress, "load_csv")
+    df = load_csv(csv_path, models=models)
+    profiling.count(rows=len(df))
+    context = load_stream_state(df)[0] if incremental else None
+    df = process_frame(df, context=context, models=models, progress=progress)
+    if save_readings:
+        _report_stage(progress, "save_to_db", rows=len(df))
+        save_to_db(df, state=tail_context(context, df) if incremental else None, verbose=True)
+    _report_stage(progress, "generate_report", rows=len(df))
+    artifacts = generate_report(df, out_dir=out_dir, outputs=outputs)
+    return df, artifacts
+
+EXCEL_MAX_ROWS = 1_048_576
+
+def _append_excel_rows(sheet, chunk, written):
+    """
+    Append a chunk to a write-only openpyxl sheet (header first), stopping
+    at Excel's row limit.
+    :return: rows written so far, including the header
+    """
+    if written == 0:
+        sheet.append(list(chunk.columns))
+        written = 1
+    room = EXCEL_MAX_ROWS - written
+    if room > 0:
+        part = chunk.head(room).astype(object)
+        for values in part.where(part.notna(), None).values.tolist():
+            sheet.append(values)
+        written += len(part)
+    return written
+
+def _append_parquet_rows(writer, chunk, path):
+    """Append a chunk to a run's Parquet file, opening the writer on the first chunk."""
+    from .archive import open_run_writer, write_run_chunk
+    writer = writer or open_run_writer(path, chunk)
+    write_run_chunk(writer, chunk)
+    return writer
+
+def render_artifacts_from_csv(csv_file, out_dir, outputs, chunksize=100_000):
+    """
+    Render report artifacts after the fact from a run's stored processed CSV,
+    reading it in chunks so memory stays bounded. Used for lazy, on-demand
+    report generation.
+    :return: manifest dict {artifact name: path}
+    """
+    from openpyxl import Workbook
+
+    manifest = {}
+    if "excel" in outputs:
+        manifest["excel"] = artifact_path(out_dir, "excel")
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+    excel_rows = 0
+    parquet = None
+    summary = new_report_summary()
+    rows = 0
+
+    for chunk in pd.read_csv(csv_file, chunksize=chunksize):
+        if "excel" in manifest:
+            excel_rows = _append_excel_rows(sheet, chunk, excel_rows)
+        if "parquet" in outputs:
+            parquet = _append_parquet_rows(parquet, chunk, artifact_path(out_dir, "parquet"))
+        update_report_summary(summary, chunk)
+        rows += len(chunk)
+
+    if "excel" in manifest:
+        workbook.save(manifest["excel"])
+        print(f"✅ Excel saved: {manifest['excel']}")
+    if parquet is not None:
+        parquet.close()
+        manifest["parquet"] = artifact_path(out_dir, "parquet")
+        print(f"✅ Parquet saved: {manifest['parquet']}")
+    if rows and any(name in outputs for name in ("pdf",) + CHART_ARTIFACTS):
+        manifest.update(render_from_summary(summary, out_dir, outputs))
+    return manifest
+
+def run_pipeline_streaming(csv_path, chunksize=100_000, progress=None,
+                           out_dir=REPORT_DIR, outputs=DEFAULT_OUTPUTS, incremental=False,
+                           save_readings=True, models=None):
+    """
+    Process a CSV in fixed-size chunks so peak memory is bounded by chunksize.
+    Anomaly and drift context (the last readings of every sensor) is carried
+    across chunk boundaries, so labels match a whole-file run. With
+    incremental=True the context starts from (and is saved back to) each
+    sensor's persisted state, see run_pipeline. With models, each sensor's
+    recent feature rows are carried too, so model windows span chunks. Each chunk is
+    written to the DB, the CSV and the Excel report as soon as it is
+    processed; charts and the PDF are drawn from a bounded summary at the end.
+    :param save_readings: see run_pipeline
+    :return: (last processed row as a one-row DataFrame, artifact manifest)
+    """
+    from openpyxl import Workbook
+
+    manifest = {}
+    if "csv" in outputs:
+        manifest["csv"] = artifact_path(out_dir, "csv")
+    if "excel" in outputs:
+        manifest["excel"] = artifact_path(out_dir, "excel")
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+    excel_rows = 0
+    parquet = None
+
+    context = None
+    loaded = set()
+    use_models = _models_enabled(models)
+    if use_models:
+        from .models import apply_models, model_context_columns, MODEL_CONTEXT_ROWS
+    model_context = None
+    summary = new_report_summary()
+    last_row = None
+    rows = 0
+    saved_seconds = 0.0
+
+    total_bytes = os.path.getsize(csv_path)
+    mapping = resolve_input_columns(csv_header(csv_path), use_models)
+    with open(csv_path, "rb") as fh:
+        reader = pd.read_csv(fh, chunksize=chunksize, **csv_read_options(mapping, use_models))
+        # Stages repeat per chunk; the profiler adds their times up
+        profiling.stage("load_csv")
+        for chunk in reader:
+            profiling.count(rows=len(chunk))
+            # File position gives real progress without counting lines up front
+            _report_stage(progress, f"processing rows {rows:,}–{rows + len(chunk):,}",
+                          0.9 * fh.tell() / max(total_bytes, 1))
+            chunk = apply_input_schema(chunk, mapping)
+            if incremental:
+                # Pick up saved state the first time each sensor shows up
+                saved, keys = load_stream_state(chunk, skip=loaded)
+                loaded |= keys
+                if saved is not None:
+                    context = saved if context is None else pd.concat([context, saved],
+                                                                      ignore_index=True)
+            profiling.stage("compute_correction", rows=len(chunk))
+            chunk = compute_correction(chunk)
+            profiling.stage("detect_anomalies", rows=len(chunk))
+            chunk = detect_anomalies(chunk, context=context)
+            profiling.stage("predict_drift_and_rul", rows=len(chunk))
+            chunk = predict_drift_and_rul(chunk, context=context)
+            if use_models:
+                profiling.stage("apply_models", rows=len(chunk))
+                chunk = apply_models(chunk, context=model_context)
+                model_context = tail_context(model_context, chunk, rows=MODEL_CONTEXT_ROWS,
+                                             columns=model_context_columns(chunk))
+            profiling.stage("assign_alerts_and_maintenance", rows=len(chunk))
+            chunk = assign_alerts_and_maintenance(chunk)
+
+            next_context = tail_context(context, chunk)
+            state = None
+            if incremental:
+                state = next_context
+                if SENSOR_COLUMN in chunk.columns:
+                    state = state[state[SENSOR_COLUMN].isin(chunk[SENSOR_COLUMN].unique())]
+            if save_readings:
+                profiling.stage("save_to_db", rows=len(chunk))
+                saved_seconds += save_to_db(chunk, state=state)["seconds"]
+            profiling.stage("generate_report", rows=len(chunk))
+            if "csv" in manifest:
+                chunk.to_csv(manifest["csv"], mode="w" if rows == 0 else "a",
+                             header=rows == 0, index=False)
+            if "excel" in manifest:
+                excel_rows = _append_excel_rows(sheet, chunk, excel_rows)
+            if "parquet" in outputs:
+                parquet = _append_parquet_rows(parquet, chunk, artifact_path(out_dir, "parquet"))
+            update_report_summary(summary, chunk)
+
+            context = next_context
+            last_row = chunk.tail(1)
+            rows += len(chunk)
+            profiling.stage("load_csv")
+
+    profiling.stage("generate_report")
+    if save_readings:
+        print(f"✅ Saved {rows} rows to DB ({rows / saved_seconds if saved_seconds > 0 else 0:,.0f} rows/sec)")
+    if "csv" in manifest:
+        print(f"✅ CSV saved: {manifest['csv']} ({rows} rows)")
+    if "excel" in manifest:
+        workbook.save(manifest["excel"])
+        truncated = rows > max(excel_rows - 1, 0)
+        print(f"✅ Excel saved: {manifest['excel']}" + (" (truncated to Excel row limit)" if truncated else ""))
+    if parquet is not None:
+        parquet.close()
+        manifest["parquet"] = artifact_path(out_dir, "parquet")
+        print(f"✅ Parquet saved: {manifest['parquet']}")
+    if last_row is not None:
+        _report_stage(progress, "generate_report", 0.9)
+        manifest.update(render_from_summary(summary, out_dir, outputs))
+    profiling.count(bytes_written=profiling.file_bytes(manifest.values()))
+    return last_row, manifest
 
 # ---------------------------
 # 10. Fetch history from DB
 # ---------------------------
-def get_history(limit=None):
+def get_history(limit=None, sensor_id=None):
     """
     Fetch stored readings from SQLite.
     :param limit: int -> number of most recent rows, or None for all.
+    :param sensor_id: only rows from this sensor (uses the sensor/timestamp index)
     :return: pandas DataFrame
     """
-    query = "SELECT * FROM temperature_readings ORDER BY id DESC"
+    query = "SELECT * FROM temperature_readings"
+    params = []
+    if sensor_id is not None:
+        query += " WHERE sensor_id = ?"
+        params.append(str(sensor_id))
+    query += " ORDER BY id DESC"
     if limit:
-        query += f" LIMIT {limit}"
-    df = pd.read_sql_query(query, conn)
+        query += " LIMIT ?"
+        params.append(int(limit))
+    df = db.read_frame(query, params)
     return df.iloc[::-1].reset_index(drop=True)  # oldest → newest order
+
+SUMMARY_STATS_COLUMNS = ["key"] + _SUMMARY_FIELDS
+
+def _summary_entry(row, counts):
+    stats = dict(zip(SUMMARY_STATS_COLUMNS, row))
+    drift_n = stats["drift_n"]
+    return {
+        "readings": stats["readings"],
+        "alerts": counts.get(("alert", stats["key"]), {}),
+        "anomalies": counts.get(("anomaly", stats["key"]), {}),
+        "drift": {"min": stats["drift_min"], "max": stats["drift_max"],
+                  "avg": stats["drift_sum"] / drift_n if drift_n else None},
+        "health_min": stats["health_min"],
+        "rul_days_min": stats["rul_days_min"],
+        "latest": {"timestamp": stats["latest_timestamp"], "health": stats["latest_health"],
+                   "rul_days": stats["latest_rul_days"]},
+    }
+
+def get_summary(days=30, sensors=100, sensor_id=None, db_conn=None):
+    """
+    Fleet overview from the summary tables kept by save_to_db: it reads a
+    bounded number of rows, not the readings.
+    :param days: most recent days to include
+    :param sensors: sensors to include, least healthy (latest health) first
+    :param sensor_id: only this sensor in "sensors"
+    :return: {"fleet": entry, "days": [entry + "day"] newest first,
+             "sensors": [entry + "sensor_id"], "sensor_count": n}
+    """
+    columns = ", ".join(SUMMARY_STATS_COLUMNS)
+    fleet = db.query(f"SELECT {columns} FROM summary_stats WHERE scope = 'fleet'", (), db_conn)
+    day_rows = db.query(f"SELECT {columns} FROM summary_stats WHERE scope = 'day' "
+                        "ORDER BY key DESC LIMIT ?", (int(days),), db_conn)
+    if sensor_id is not None:
+        sensor_rows = db.query(f"SELECT {columns} FROM summary_stats WHERE scope = 'sensor' AND key = ?",
+                               (str(sensor_id),), db_conn)
+    else:
+        sensor_rows = db.query(f"SELECT {columns} FROM summary_stats WHERE scope = 'sensor' "
+                               "ORDER BY latest_health IS NULL, latest_health, key LIMIT ?",
+                               (int(sensors),), db_conn)
+    sensor_count = db.query_one("SELECT COUNT(*) FROM summary_stats WHERE scope = 'sensor'", (), db_conn)[0]
+
+    counts = {}
+    for scope, rows in (("fleet", fleet), ("day", day_rows), ("sensor", sensor_rows)):
+        keys = [row[0] for row in rows]
+        if not keys:
+            continue
+        found = db.query("SELECT key, field, label, n FROM summary_counts "
+                         f"WHERE scope = ? AND key IN ({', '.join('?' * len(keys))})",
+                         [scope] + keys, db_conn)
+        by_key = counts.setdefault(scope, {})
+        for key, field, label, n in found:
+            by_key.setdefault((field, key), {})[label] = n
+
+    empty = [None, 0, 0] + [None] * (len(_SUMMARY_FIELDS) - 2)
+    return {
+        "fleet": _summary_entry(fleet[0] if fleet else empty, counts.get("fleet", {})),
+        "days": [{"day": row[0], **_summary_entry(row, counts.get("day", {}))} for row in day_rows],
+        "sensors": [{"sensor_id": row[0] or None, **_summary_entry(row, counts.get("sensor", {}))}
+                    for row in sensor_rows],
+        "sensor_count": sensor_count,
+    }
+
+HISTORY_COLUMNS = ["id", "timestamp", SENSOR_COLUMN] + [c for c in READING_COLUMNS if c != SENSOR_COLUMN]
+
+def _history_filters(cursor=None, order="desc", sensor_id=None, start=None, end=None, alert=None):
+    where, params = [], []
+    if cursor is not None:
+        where.append("id < ?" if order == "desc" else "id > ?")
+        params.append(int(cursor))
+    if sensor_id is not None:
+        where.append("sensor_id = ?")
+        params.append(str(sensor_id))
+    if start is not None:
+        where.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("timestamp < ?")
+        params.append(end)
+    if alert is not None:
+        where.append("alert = ?")
+        params.append(alert)
+    clause = (" WHERE " + " AND ".join(where)) if where else ""
+    return clause, params
+
+def iter_history(limit=200, cursor=None, order="desc", sensor_id=None, start=None, end=None,
+                 alert=None, db_conn=None, batch_size=1000):
+    """
+    Keyset-paginated history: yields rows as tuples in HISTORY_COLUMNS order
+    without materializing a DataFrame.
+    :param cursor: id to continue from (exclusive); the last id of the previous page
+    :param order: "desc" walks from newest to oldest, "asc" the other way
+    :param start, end: ISO timestamps, start inclusive and end exclusive
+    """
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+    clause, params = _history_filters(cursor, order, sensor_id, start, end, alert)
+    query = (f"SELECT {', '.join(HISTORY_COLUMNS)} FROM temperature_readings{clause} "
+             f"ORDER BY id {order.upper()} LIMIT ?")
+    if db_conn is None:
+        # Streamed responses may fetch from several threads, and the cursor
+        # outlives the request: use a connection of its own
+        with db.dedicated_connection() as own_conn:
+            yield from iter_history(limit, cursor, order, sensor_id, start, end, alert,
+                                    db_conn=own_conn, batch_size=batch_size)
+        return
+    cur = db.execute(query, params + [int(limit)], db_conn)
+    while rows := cur.fetchmany(batch_size):
+        yield from rows
+
+def history_next_cursor(limit=200, cursor=None, order="desc", sensor_id=None, start=None,
+                        end=None, alert=None, db_conn=None):
+    """
+    Cursor for the page after this one (id of its last row), or None when
+    the page is not full. Lets a streamed response advertise the cursor up front.
+    """
+    clause, params = _history_filters(cursor, order, sensor_id, start, end, alert)
+    query = (f"SELECT id FROM temperature_readings{clause} "
+             f"ORDER BY id {order.upper()} LIMIT 1 OFFSET ?")
+    row = db.query_one(query, params + [int(limit) - 1], db_conn)
+    return row[0] if row else None
@@ -0,0 +1,169 @@
+"""
+Data-access layer: a per-thread SQLite connection pool.
+
+sqlite3 connections must not be shared between threads, and one shared
+connection serializes every reader behind the ingest writer. Instead each
+thread (API worker, live flusher, job process) lazily gets its own
+connection from the pool and keeps reusing it; with WAL, readers never
+block the writer.
+
+Statements are always parameterized and written with "?" placeholders,
+and the backend object owns connect() and the paramstyle. That is the only
+seam: the schema, migrations (BEGIN IMMEDIATE, PRAGMA user_version) and
+upserts (INSERT OR REPLACE / ON CONFLICT) are SQLite SQL, so another
+database would need those ported as well, not just a new backend class.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteBackend:
+    """Local SQLite file tuned for bulk ingest with concurrent readers."""
+    paramstyle = "qmark"
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        # Pool connections stay on their own thread; check_same_thread is off
+        # so streamed responses may fetch from a threadpool that hops threads
+        db_conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        db_conn.execute("PRAGMA journal_mode=WAL")      # readers don't block the writer
+        db_conn.execute("PRAGMA synchronous=NORMAL")    # relaxed fsync, safe under WAL
+        db_conn.execute("PRAGMA temp_store=MEMORY")
+        db_conn.execute("PRAGMA cache_size=-65536")     # 64 MiB page cache
+        return db_conn
+
+    def sql(self, statement):
+        """Statement in this driver's paramstyle (a psycopg backend maps "?" to "%s")."""
+        return statement
+
+    def __repr__(self):
+        return f"SQLiteBackend({self.path!r})"
+
+
+class ConnectionPool:
+    """One lazily opened connection per thread, all closed by close_all()."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        db_conn = getattr(self._local, "conn", None)
+        if db_conn is None:
+            db_conn = self._local.conn = self.backend.connect()
+            with self._lock:
+                self._connections.append(db_conn)
+        return db_conn
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for db_conn in connections:
+            db_conn.close()
+        self._local = threading.local()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_initializer = None   # called on first use when nothing was configured yet
+
+
+def set_initializer(initializer):
+    """Register the callable that configures the pool (and schema) on first use."""
+    global _initializer
+    _initializer = initializer
+
+
+def configure(backend):
+    """Point the pool at `backend`, closing connections to any previous one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(backend)
+    return _pool
+
+
+def is_configured():
+    return _pool is not None
+
+
+def pool():
+    if _pool is None and _initializer is not None:
+        _initializer()
+    if _pool is None:
+        raise RuntimeError("Database not configured; call computation_engine.init_storage()")
+    return _pool
+
+
+def connection():
+    """This thread's pooled connection."""
+    return pool().connection()
+
+
+@contextmanager
+def transaction():
+    """This thread's connection inside a transaction (commit, or rollback on error)."""
+    db_conn = connection()
+    with db_conn:
+        yield db_conn
+
+
+@contextmanager
+def dedicated_connection():
+    """A connection outside the pool, closed afterwards (long streamed reads)."""
+    db_conn = pool().backend.connect()
+    try:
+        yield db_conn
+    finally:
+        db_conn.close()
+
+
+def _sql(statement):
+    # Standalone connections (scratch DBs) are SQLite and need no rewriting
+    return _pool.backend.sql(statement) if _pool is not None else statement
+
+
+def execute(statement, params=(), db_conn=None):
+    """
+    Run one parameterized statement on db_conn (default: this thread's
+    pooled connection); returns the cursor.
+    """
+    cur = (db_conn or connection()).cursor()
+    cur.execute(_sql(statement), params)
+    return cur
+
+
+def executemany(statement, rows, db_conn=None):
+    cur = (db_conn or connection()).cursor()
+    cur.executemany(_sql(statement), rows)
+    return cur
+
+
+def query(statement, params=(), db_conn=None):
+    return execute(statement, params, db_conn).fetchall()
+
+
+def query_one(statement, params=(), db_conn=None):
+    return execute(statement, params, db_conn).fetchone()
+
+
+def read_frame(statement, params=(), db_conn=None):
+    """Query result as a pandas DataFrame."""
+    import pandas as pd
+    cur = execute(statement, params, db_conn)
+    return pd.DataFrame.from_records(cur.fetchall(), columns=[d[0] for d in cur.description])
+
+
+def close():
+    """Close every pooled connection (app shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = None
@@ -0,0 +1,151 @@
+"""
+Background job queue for uploaded CSVs.
+
+Pipelines run in a bounded process pool so pandas/matplotlib work never
+blocks the API event loop. Workers publish their current stage into a
+shared dict that the status endpoint reads. Uploads are keyed by content
+hash so the same file submitted twice maps to the same job.
+"""
+import os
+import uuid
+import threading
+import multiprocessing as mp
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from . import profiling, run_pipeline_on_uploaded_csv
+from .computation_engine import resolve_outputs
+
+MAX_WORKERS = int(os.environ.get("CALIBRATION_WORKERS", os.cpu_count() or 1))
+MAX_PENDING_JOBS = int(os.environ.get("CALIBRATION_MAX_PENDING", 32))
+MAX_FINISHED_JOBS = 1000
+
+
+class QueueFullError(Exception):
+    pass
+
+
+_lock = threading.Lock()
+_executor = None
+_manager = None
+_progress = None
+_jobs = OrderedDict()    # job_id -> {"future", "key", "csv_path"}
+_jobs_by_key = {}        # (csv_hash, incremental) -> job_id
+
+
+def _ensure_pool():
+    # spawn, not fork: children must not inherit the parent's SQLite connection
+    global _executor, _manager, _progress
+    if _executor is None:
+        ctx = mp.get_context("spawn")
+        _manager = ctx.Manager()
+        _progress = _manager.dict()
+        _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=ctx,
+                                        initializer=_init_worker)
+
+
+def _init_worker():
+    # Workers live for many jobs: load the models once, before the first job
+    from .models import MODELS_ENABLED, warm_models
+    if MODELS_ENABLED:
+        warm_models()
+    # Jobs already run one per core: reports only render in parallel on spare cores
+    if "CALIBRATION_RENDER_WORKERS" not in os.environ:
+        from . import rendering
+        rendering.RENDER_WORKERS = max(1, (os.cpu_count() or 1) // MAX_WORKERS)
+
+
+def _run_job(job_id, csv_path, csv_hash, outputs, incremental, progress_store):
+    """Worker entry point: runs the pipeline and publishes stage updates."""
+    def progress(stage, fraction=None):
+        progress_store[job_id] = {"stage": stage, "progress": fraction}
+    return run_pipeline_on_uploaded_csv(csv_path, progress=progress, run_id=csv_hash,
+                                        outputs=outputs, incremental=incremental)
+
+
+def _record_timings(future):
+    # Workers' metrics stay in the worker; the API process records them here
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        profiling.record_failure()
+    elif future.result().get("timings"):
+        profiling.record(future.result()["timings"])
+
+
+def _evict_finished():
+    finished = [jid for jid, job in _jobs.items() if job["future"].done()]
+    for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        job = _jobs.pop(jid)
+        if _jobs_by_key.get(job["key"]) == jid:
+            del _jobs_by_key[job["key"]]
+        _progress.pop(jid, None)
+
+
+def submit_job(csv_path, csv_hash, outputs=None, incremental=False):
+    """
+    Queue a pipeline run for csv_path.
+    :param outputs: report artifacts to render eagerly (others render lazily)
+    :param incremental: continue each sensor from its saved streaming state
+    :return: (job_id, deduplicated) — deduplicated is True when an
+             identical file is already queued, running or done
+    Outputs are not part of the dedup key: a second run of the same file
+    would write the same run dir and store its readings twice. The first
+    job's run serves any other outputs lazily (artifacts.ensure_artifact).
+    """
+    outputs = resolve_outputs(outputs or ())
+    key = (csv_hash, bool(incremental))
+    with _lock:
+        _ensure_pool()
+        existing = _jobs_by_key.get(key)
+        if existing is not None:
+            future = _jobs[existing]["future"]
+            if not (future.done() and future.exception() is not None):
+                return existing, True
+
+        pending = sum(1 for job in _jobs.values() if not job["future"].done())
+        if pending >= MAX_PENDING_JOBS:
+            raise QueueFullError(f"{pending} jobs already pending, try again later")
+
+        job_id = uuid.uuid4().hex
+        _progress[job_id] = {"stage": "queued", "progress": 0.0}
+        future = _executor.submit(_run_job, job_id, csv_path, csv_hash, outputs,
+                                  bool(incremental), _progress)
+        future.add_done_callback(_record_timings)
+        _jobs[job_id] = {"future": future, "key": key, "csv_path": csv_path}
+        _jobs_by_key[key] = job_id
+        _evict_finished()
+        return job_id, False
+
+
+def get_job(job_id):
+    """
+    Status snapshot for a job, or None if unknown.
+    status is one of queued / running / done / failed.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        future = job["future"]
+        info = dict(_progress.get(job_id, {}))
+
+    status = {"job_id": job_id, "stage": info.get("stage"), "progress": info.get("progress")}
+    if future.done():
+        error = future.exception()
+        if error is not None:
+            status.update(status="failed", stage="failed", error=str(error))
+        else:
+            status.update(status="done", stage="done", progress=1.0, result=future.result())
+    else:
+        status["status"] = "queued" if status["stage"] == "queued" else "running"
+    return status
+
+
+def shutdown():
+    global _executor, _manager, _progress
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _manager.shutdown()
+        _executor = _manager = _progress = None
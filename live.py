@@ -0,0 +1,336 @@
+"""
+Real-time ingest of individual readings.
+
+Readings arrive one at a time (WebSocket) or as NDJSON lines and are
+processed immediately by a scalar version of the pipeline: correction,
+anomaly detection, drift/RUL and alert rules. Each sensor's context (last
+measured values and drift window) lives in memory, seeded from the
+stream_state table, so a live series continues where the last incremental
+upload stopped and vice versa. Seeding queries the DB, so the async
+handlers run it in a thread pool (load_context) before processing; each
+flush checks the saved state first and, if a batch run has moved it on
+since, continues from the batch's context instead of overwriting it.
+
+Processed rows are buffered and written by a background thread in
+micro-batches through save_to_db, together with the sensors' state. A
+failed write puts its rows back at the front of the buffer and the writer
+retries with exponential backoff.
+CRITICAL/WARNING alerts, and a throttled feed of latest readings, are
+pushed to subscribed dashboards.
+"""
+import json
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .computation_engine import (
+    CONTEXT_ROWS, DRIFT_WINDOW, SENSOR_COLUMN, load_stream_state, save_stream_state,
+    save_to_db,
+)
+from .rules import ALERT_RULES, MAINTENANCE_RULES, evaluate_rules_row
+
+FLUSH_INTERVAL = 0.25      # seconds between micro-batch writes
+FLUSH_MAX_ROWS = 5_000     # write early once this many rows are buffered
+FLUSH_RETRY_MAX_DELAY = 30.0  # backoff cap (seconds) while writes keep failing
+PUSH_ALERTS = ("CRITICAL", "WARNING")
+READING_PUSH_INTERVAL = 0.5  # latest-reading updates per sensor, at most this often
+SUBSCRIBER_QUEUE_SIZE = 1_000
+
+MIN_VAL, MAX_VAL, SPIKE_THRESHOLD = 95, 105, 2.0
+THRESHOLDS = {"min_val": MIN_VAL, "max_val": MAX_VAL}
+
+_lock = threading.Lock()
+_sensors = {}        # sensor_id (None = single series) -> deque of (measured, offset)
+_synced = {}         # sensor_id -> stream_state rows as last loaded or written by this process
+_unsynced = {}       # sensor_id -> readings appended to its context since the last flush
+_buffer = []         # processed rows waiting for the next flush
+_flusher = None
+_stop = threading.Event()
+_wake = threading.Event()  # set to flush before FLUSH_INTERVAL elapses
+_subscribers = set()   # (event loop, asyncio.Queue)
+_last_push = {}        # sensor_id -> monotonic time of the last reading pushed
+
+
+def json_row(row):
+    """Processed row with NaN replaced by None, ready for JSON."""
+    return {k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in row.items()}
+
+
+def _float(value):
+    return math.nan if value is None or value == "" else float(value)
+
+
+def sensor_of(reading):
+    sensor = reading.get(SENSOR_COLUMN)
+    return None if sensor is None else str(sensor)
+
+
+def needs_context(reading):
+    """True until the reading's sensor has been seeded (see load_context)."""
+    return sensor_of(reading) not in _sensors
+
+
+def _state_frame(sensors):
+    # A frame load_stream_state can look the sensors' saved state up from
+    return pd.DataFrame({SENSOR_COLUMN: pd.Series(list(sensors), dtype=object)})
+
+
+def load_context(reading):
+    """
+    Seed the reading's sensor context from stream_state, once per sensor.
+    Queries the DB outside _lock; async callers run it in a thread pool.
+    """
+    sensor = sensor_of(reading)
+    if sensor in _sensors:
+        return
+    saved, _ = load_stream_state(_state_frame([sensor]))
+    rows = [] if saved is None else list(zip(saved["measured"], saved["offset"]))
+    with _lock:
+        if sensor not in _sensors:
+            _sensors[sensor] = deque(rows, maxlen=CONTEXT_ROWS)
+            _synced[sensor] = rows
+
+
+def _classify(value, history):
+    """Scalar classify_anomalies for one reading given its sensor's history."""
+    if value < MIN_VAL or value > MAX_VAL:
+        return "Out-of-Range"
+    prev = history[-1][0] if len(history) >= 1 else None
+    prev2 = history[-2][0] if len(history) >= 2 else None
+    if prev is not None and abs(value - prev) > SPIKE_THRESHOLD:
+        return "Spike"
+    if prev2 is not None:
+        if value == prev == prev2:
+            return "Stuck"
+        if (value - prev) * (prev - prev2) < 0:
+            return "Noisy"
+    return "Normal"
+
+
+def _drift(offset, history):
+    """Scalar rolling_mean: mean of the last DRIFT_WINDOW non-NaN offsets."""
+    window = [o for _, o in list(history)[-(DRIFT_WINDOW - 1):]] + [offset]
+    window = [o for o in window if not math.isnan(o)]
+    return sum(window) / len(window) if window else math.nan
+
+
+def process_reading(reading):
+    """
+    Run one reading (a dict with measured, ideal and optional sensor_id /
+    timestamp) through the pipeline and queue it for the next DB write.
+    Results match the batch pipeline for the same sequence of readings.
+    :return: the processed row as a dict
+    """
+    measured, ideal = _float(reading["measured"]), _float(reading["ideal"])
+    sensor = sensor_of(reading)
+    load_context(reading)
+    offset = measured - ideal
+    row = {
+        "timestamp": reading.get("timestamp") or datetime.now().isoformat(),
+        SENSOR_COLUMN: sensor,
+        "measured": measured,
+        "ideal": ideal,
+        "offset": offset,
+        "corrected": measured - offset,
+    }
+    with _lock:
+        history = _sensors[sensor]
+        row["anomaly"] = _classify(measured, history)
+        drift = row["drift"] = _drift(offset, history)
+        row["rul_days"] = math.nan if math.isnan(drift) else max(0.0, 30 - abs(drift) * 10)
+        row["health"] = math.nan if math.isnan(drift) else min(100.0, max(0.0, 100 - abs(drift) * 20))
+        row["alert"] = evaluate_rules_row(row, ALERT_RULES, THRESHOLDS)
+        row["maintenance"] = evaluate_rules_row(row, MAINTENANCE_RULES, THRESHOLDS)
+        history.append((measured, offset))
+        _unsynced[sensor] = _unsynced.get(sensor, 0) + 1
+        _buffer.append(row)
+        flush_now = len(_buffer) >= FLUSH_MAX_ROWS
+    _publish(row)
+    if flush_now:
+        _wake.set()
+    return row
+
+
+def parse_ndjson_line(line):
+    """One NDJSON line as a reading dict; blank lines return None."""
+    line = line.strip()
+    if not line:
+        return None
+    reading = json.loads(line)
+    if not isinstance(reading, dict):
+        raise TypeError(f"expected a JSON object, got {type(reading).__name__}")
+    return reading
+
+
+def process_ndjson_line(line):
+    """Parse and process one NDJSON line; blank lines return None."""
+    reading = parse_ndjson_line(line)
+    return None if reading is None else process_reading(reading)
+
+
+# ---------------------------
+# Micro-batched writes
+# ---------------------------
+def _same_state(a, b):
+    return len(a) == len(b) and np.array_equal(np.array(a, dtype=float), np.array(b, dtype=float),
+                                               equal_nan=True)
+
+
+def _rebase(pending, db_conn):
+    """
+    Context to persist for each flushed sensor. A sensor whose saved state
+    is no longer what this process last loaded or wrote was moved on by a
+    batch run; its live readings since the last flush continue from there.
+    :param pending: sensor -> (context, readings appended since last flush, synced rows)
+    :return: sensor -> (context rows, whether the saved state had moved on)
+    """
+    saved, _ = load_stream_state(_state_frame(pending), db_conn=db_conn)
+    current = {sensor: [] for sensor in pending}
+    if saved is not None:
+        for sensor, measured, offset in saved.itertuples(index=False):
+            current[None if pd.isna(sensor) else sensor].append((measured, offset))
+    merged = {}
+    for sensor, (context, appended, synced) in pending.items():
+        if _same_state(current[sensor], synced):
+            merged[sensor] = (context, False)
+        else:
+            recent = context[-appended:] if appended else []
+            merged[sensor] = ((current[sensor] + recent)[-CONTEXT_ROWS:], True)
+    return merged
+
+
+def flush(db_conn=None):
+    """
+    Write buffered rows (and the state of the sensors they touched) in one
+    transaction. If the write fails the rows go back to the front of the
+    buffer, ahead of anything that arrived meanwhile, and the error is raised.
+    :return: number of rows written
+    """
+    global _buffer
+    with _lock:
+        rows, _buffer = _buffer, []
+        pending = {sensor: (list(_sensors[sensor]), _unsynced.pop(sensor, 0), _synced.get(sensor, []))
+                   for sensor in {row[SENSOR_COLUMN] for row in rows}}
+    if not rows:
+        return 0
+    df = pd.DataFrame(rows)
+    if df[SENSOR_COLUMN].isna().all():
+        df = df.drop(columns=SENSOR_COLUMN)
+    merged = {}
+
+    def write_state(db_conn):
+        # Runs after the readings are inserted, so the transaction already
+        # holds the write lock: no batch run can save state in between
+        merged.update(_rebase(pending, db_conn))
+        state = [(sensor, measured, offset) for sensor, (context, _) in merged.items()
+                 for measured, offset in context]
+        save_stream_state(pd.DataFrame(state, columns=[SENSOR_COLUMN, "measured", "offset"]), db_conn)
+
+    try:
+        save_to_db(df, db_conn=db_conn, extra_writes=write_state)
+    except Exception:
+        with _lock:
+            _buffer[:0] = rows
+            for sensor, (_, appended, _) in pending.items():
+                _unsynced[sensor] = _unsynced.get(sensor, 0) + appended
+        raise
+    with _lock:
+        for sensor, (context, rebased) in merged.items():
+            _synced[sensor] = context
+            if rebased:
+                # Keep the readings that arrived while this flush was writing
+                newer = _unsynced.get(sensor, 0)
+                recent = list(_sensors[sensor])[-newer:] if newer else []
+                _sensors[sensor] = deque(context + recent, maxlen=CONTEXT_ROWS)
+    return len(rows)
+
+
+def _flush_loop():
+    # Writer thread (with its own pooled connection): wakes every
+    # FLUSH_INTERVAL or as soon as FLUSH_MAX_ROWS are buffered. While writes
+    # fail it backs off (doubling up to FLUSH_RETRY_MAX_DELAY) and ignores
+    # early wake-ups.
+    delay = None
+    while not _stop.is_set():
+        if delay is None:
+            _wake.wait(FLUSH_INTERVAL)
+            _wake.clear()
+        else:
+            _stop.wait(delay)
+        try:
+            flush()
+            delay = None
+        except Exception as e:
+            delay = min(FLUSH_RETRY_MAX_DELAY, 2 * (delay or FLUSH_INTERVAL))
+            print(f"⚠️ Live ingest flush failed, retrying in {delay:g}s: {e}")
+    try:
+        flush()
+    except Exception as e:
+        print(f"⚠️ Live ingest final flush failed, {len(_buffer)} rows not written: {e}")
+
+
+def start():
+    """Start the writer thread; until then processed rows are only buffered."""
+    global _flusher
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _stop.clear()
+            _flusher = threading.Thread(target=_flush_loop, name="live-flush", daemon=True)
+            _flusher.start()
+
+
+def stop():
+    """Stop the writer thread after a final flush."""
+    global _flusher
+    _stop.set()
+    _wake.set()
+    if _flusher is not None:
+        _flusher.join()
+        _flusher = None
+
+
+# ---------------------------
+# Push to dashboards
+# ---------------------------
+def subscribe():
+    """
+    Register a subscriber on the running event loop.
+    :return: asyncio.Queue receiving {"type": "alert" | "reading", ...} messages
+    """
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    _subscribers.add((asyncio.get_running_loop(), queue))
+    return queue
+
+
+def unsubscribe(queue):
+    for entry in [e for e in _subscribers if e[1] is queue]:
+        _subscribers.discard(entry)
+
+
+def _offer(queue, message):
+    # Slow dashboards lose their oldest messages rather than stalling ingest
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+def _publish(row):
+    if not _subscribers:
+        return
+    if row["alert"] in PUSH_ALERTS:
+        message = {"type": "alert", **row}
+    else:
+        now = time.monotonic()
+        if now - _last_push.get(row[SENSOR_COLUMN], 0) < READING_PUSH_INTERVAL:
+            return
+        message = {"type": "reading", **row}
+    _last_push[row[SENSOR_COLUMN]] = time.monotonic()
+    message = json_row(message)
+    for loop, queue in list(_subscribers):
+        loop.call_soon_threadsafe(_offer, queue, message)
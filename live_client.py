@@ -0,0 +1,81 @@
+"""
+Local generator client for the live ingest endpoint.
+
+Simulates a fleet of sensors drifting around their ideal value, with the
+occasional spike and stuck run, and posts the readings as NDJSON batches to
+POST /ingest/.
+
+    python -m pipeline.live_client --url http://127.0.0.1:8000 --sensors 5 --rate 1000 --seconds 10
+    python -m pipeline.live_client --stdout --seconds 1 > readings.ndjson
+"""
+import sys
+import json
+import time
+import argparse
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+
+def generate_readings(sensors=5, seed=0, ideal=100.0):
+    """Endless stream of reading dicts, round-robin over the sensors."""
+    rng = np.random.default_rng(seed)
+    level = np.full(sensors, ideal)
+    stuck = np.zeros(sensors, dtype=int)
+    while True:
+        level += rng.normal(0, 0.05, sensors)
+        for i in range(sensors):
+            if stuck[i]:
+                stuck[i] -= 1
+                value = round(level[i], 1)
+            else:
+                value = level[i] + rng.normal(0, 0.3)
+                if rng.random() < 0.005:
+                    value += rng.choice([-1, 1]) * rng.uniform(3, 8)   # spike / out of range
+                elif rng.random() < 0.002:
+                    stuck[i] = 3
+            yield {"sensor_id": f"sensor-{i}", "timestamp": datetime.now().isoformat(),
+                   "measured": round(float(value), 3), "ideal": ideal}
+
+
+def post_batch(url, readings, timeout=30):
+    body = "".join(json.dumps(r) + "\n" for r in readings).encode()
+    request = urllib.request.Request(url.rstrip("/") + "/ingest/", data=body,
+                                     headers={"Content-Type": "application/x-ndjson"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sensors", type=int, default=5)
+    parser.add_argument("--rate", type=float, default=500, help="readings per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch-interval", type=float, default=0.1)
+    parser.add_argument("--stdout", action="store_true", help="print NDJSON instead of posting")
+    args = parser.parse_args(argv)
+
+    readings = generate_readings(args.sensors)
+    per_batch = max(1, int(args.rate * args.batch_interval))
+    sent = alerts = 0
+    start = time.monotonic()
+    while time.monotonic() - start < args.seconds:
+        batch = [next(readings) for _ in range(per_batch)]
+        if args.stdout:
+            sys.stdout.write("".join(json.dumps(r) + "\n" for r in batch))
+        else:
+            result = post_batch(args.url, batch)
+            alerts += len(result["alerts"])
+            for error in result["errors"]:
+                print(f"⚠️ line {error['line']}: {error['error']}", file=sys.stderr)
+        sent += len(batch)
+        time.sleep(max(0.0, start + sent / args.rate - time.monotonic()))
+    if not args.stdout:
+        elapsed = time.monotonic() - start
+        print(f"✅ Sent {sent} readings in {elapsed:.1f}s ({sent / elapsed:,.0f}/s), {alerts} alerts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Opt-in model-backed scoring with the models shipped in this package.
+
+- anomaly_rf.pkl (+ anomaly_scaler.pkl): per-reading anomaly class
+- isolation_forest.pkl (on the anomaly scaler): anomaly_score column
+- drift_lstm_model.h5 (+ drift_scaler.pkl): 24-reading windows -> drift
+- rul_cnn_lstm_model.h5 (+ rul_scaler.pkl): 48-reading windows -> RUL, health
+
+Every model takes the same MODEL_FEATURES per reading. Models are loaded
+once per process and kept warm. A model whose file or runtime (Keras for
+.h5, scikit-learn for .pkl) is missing is skipped, and so is a frame that
+lacks a feature column. In both cases the heuristic values are kept, as
+they are for readings with too little history to fill a window.
+
+Enable with CALIBRATION_MODELS=1 or models=True on the pipeline runners.
+"""
+import os
+import threading
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .computation_engine import ANOMALY_LABELS, SENSOR_COLUMN, sensor_order
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_ENABLED = os.environ.get("CALIBRATION_MODELS", "0") == "1"
+
+# The models' training code is not in this repo and the scalers were fitted
+# without feature names, so the order is read off the shipped scalers: all
+# three take 8 features whose fitted means are ~25, 25, 0.3-0.7, 25, 290-720,
+# 0.49, 12-29 and 50 (temperatures in °C, |offset|, hours since calibration,
+# a 0-1 duty cycle, the same interval in days, % relative humidity).
+# The first four are derived from pipeline columns; the rest must come from
+# the CSV. Override the order/names with CALIBRATION_MODEL_FEATURES=a,b,c,...
+MODEL_FEATURES = os.environ.get(
+    "CALIBRATION_MODEL_FEATURES",
+    "measured,ideal,abs_offset,corrected,hours_since_calibration,duty_cycle,"
+    "days_since_calibration,humidity",
+).split(",")
+DERIVED_FEATURES = {
+    "abs_offset": ("offset", lambda df: df["offset"].abs()),
+}
+
+MODEL_FILES = {
+    "anomaly_rf": "anomaly_rf.pkl",
+    "anomaly_scaler": "anomaly_scaler.pkl",
+    "isolation_forest": "isolation_forest.pkl",
+    "drift_lstm": "drift_lstm_model.h5",
+    "drift_scaler": "drift_scaler.pkl",
+    "rul_cnn_lstm": "rul_cnn_lstm_model.h5",
+    "rul_scaler": "rul_scaler.pkl",
+}
+DRIFT_WINDOW_ROWS = 24
+RUL_WINDOW_ROWS = 48
+# Rows of feature history per sensor carried across chunks (see tail_context)
+MODEL_CONTEXT_ROWS = max(DRIFT_WINDOW_ROWS, RUL_WINDOW_ROWS) - 1
+PREDICT_BATCH = 4096
+
+RF_LABELS = {
+    "normal": "Normal",
+    "out_of_range": "Out-of-Range",
+    "spike": "Spike",
+    "stuck_value": "Stuck",
+    "noise": "Noisy",
+    "trend_deviation": "Trend-Deviation",
+}
+
+_lock = threading.Lock()
+_loaded = {}   # name -> model, or None when unavailable
+
+
+def _load(path):
+    if path.endswith(".h5"):
+        try:
+            import keras
+        except ImportError:
+            from tensorflow import keras
+        return keras.models.load_model(path, compile=False)
+    import joblib
+    return joblib.load(path)
+
+
+def get_model(name):
+    """Model `name` from MODEL_FILES, loaded on first use; None if unavailable."""
+    with _lock:
+        if name not in _loaded:
+            path = os.path.join(MODEL_DIR, MODEL_FILES[name])
+            try:
+                _loaded[name] = _load(path) if os.path.exists(path) else None
+            except Exception as e:
+                print(f"⚠️ Model {name} unavailable, using heuristics: {e}")
+                _loaded[name] = None
+        return _loaded[name]
+
+
+def warm_models():
+    """Load every model up front (worker start-up) so the first job is not slower."""
+    return {name: get_model(name) is not None for name in MODEL_FILES}
+
+
+def model_features(df):
+    """
+    (n, len(MODEL_FEATURES)) float32 matrix for df, or None if a feature
+    column is missing.
+    """
+    columns = []
+    for name in MODEL_FEATURES:
+        if name in df.columns:
+            columns.append(df[name].values)
+        elif name in DERIVED_FEATURES and DERIVED_FEATURES[name][0] in df.columns:
+            columns.append(DERIVED_FEATURES[name][1](df).values)
+        else:
+            return None
+    return np.column_stack(columns).astype(np.float32)
+
+
+def _scale(scaler, features):
+    # StandardScaler arithmetic without sklearn's per-call validation
+    return ((features - scaler.mean_) / scaler.scale_).astype(np.float32)
+
+
+def windowed_predict(model, features, sensors, window, batch_size=PREDICT_BATCH):
+    """
+    Run a sequence model over every window of `window` consecutive readings
+    of the same sensor, ending at each row.
+    Windows are strided views into the sensor-ordered feature matrix; only
+    one batch of windows is materialized at a time.
+    :return: (n, outputs) float array, NaN where a row has fewer than
+             `window` readings of history or NaN features
+    """
+    n = len(features)
+    if sensors is None:
+        order, positions = np.arange(n), np.arange(n)
+    else:
+        order, positions, _ = sensor_order(sensors)
+    ordered = features[order]
+    result = None
+    if n >= window:
+        views = sliding_window_view(ordered, window, axis=0).transpose(0, 2, 1)  # (n-w+1, w, f)
+        # A window ending at row e is scoreable if it stays inside one
+        # sensor's series and holds no NaN features
+        nan_count = np.r_[0, np.cumsum(np.isnan(ordered).any(axis=1))]
+        ends = np.arange(window - 1, n)
+        clean = nan_count[ends + 1] - nan_count[ends + 1 - window] == 0
+        ends = ends[clean & (positions[ends] >= window - 1)]
+        for first in range(0, len(ends), batch_size):
+            batch_ends = ends[first:first + batch_size]
+            output = model.predict_on_batch(np.ascontiguousarray(views[batch_ends - window + 1]))
+            output = np.column_stack([np.asarray(o).reshape(len(batch_ends), -1)
+                                      for o in (output if isinstance(output, (list, tuple)) else [output])])
+            if result is None:
+                result = np.full((n, output.shape[1]), np.nan)
+            result[batch_ends] = output
+    if result is None:
+        return None
+    out = np.empty_like(result)
+    out[order] = result
+    return out
+
+
+def apply_models(df, context=None):
+    """
+    Overwrite heuristic anomaly / drift / rul_days / health values with
+    model predictions wherever a model can score the row.
+    :param context: the last MODEL_CONTEXT_ROWS rows per sensor before df
+                    (feature columns), so windows span chunk boundaries
+    """
+    frame = df if context is None or not len(context) else pd.concat([context, df], ignore_index=True)
+    features = model_features(frame)
+    if features is None:
+        return df
+    n_context = len(frame) - len(df)
+    sensors = frame[SENSOR_COLUMN].values if SENSOR_COLUMN in frame.columns else None
+
+    rf, scaler = get_model("anomaly_rf"), get_model("anomaly_scaler")
+    if rf is not None and scaler is not None:
+        own = features[n_context:]
+        valid = ~np.isnan(own).any(axis=1)
+        if valid.any():
+            scaled = _scale(scaler, own[valid])
+            labels = pd.Series(rf.predict(scaled)).map(RF_LABELS).fillna("Normal").values
+            anomaly = np.array(df["anomaly"], dtype=object)
+            anomaly[valid] = labels
+            df["anomaly"] = pd.Categorical(anomaly, categories=ANOMALY_LABELS)
+            forest = get_model("isolation_forest")
+            if forest is not None:
+                score = np.full(len(df), np.nan)
+                score[valid] = forest.score_samples(scaled)
+                df["anomaly_score"] = score
+
+    lstm, scaler = get_model("drift_lstm"), get_model("drift_scaler")
+    if lstm is not None and scaler is not None:
+        predicted = windowed_predict(lstm, _scale(scaler, features), sensors, DRIFT_WINDOW_ROWS)
+        if predicted is not None:
+            drift = predicted[n_context:, 0]   # outputs: current_offset, offset_7d, offset_30d
+            df["drift"] = np.where(np.isnan(drift), df["drift"], drift)
+
+    cnn, scaler = get_model("rul_cnn_lstm"), get_model("rul_scaler")
+    if cnn is not None and scaler is not None:
+        predicted = windowed_predict(cnn, _scale(scaler, features), sensors, RUL_WINDOW_ROWS)
+        if predicted is not None:
+            rul, health = predicted[n_context:, 0], predicted[n_context:, 1] * 100
+            df["rul_days"] = np.where(np.isnan(rul), df["rul_days"], np.maximum(rul, 0))
+            df["health"] = np.where(np.isnan(health), df["health"], np.clip(health, 0, 100))
+    return df
+
+
+def model_context_columns(df):
+    """Columns tail_context must keep for apply_models' context."""
+    return [c for c in MODEL_FEATURES + ["offset"] if c in df.columns]
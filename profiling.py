@@ -0,0 +1,249 @@
+"""
+Per-stage timing and memory instrumentation for pipeline runs.
+
+A run is wrapped in profile_run(); the runners mark stage transitions
+(through _report_stage, or stage() directly in the chunked pipeline) and
+add rows processed / bytes written to the running stage. Stages repeated
+per chunk accumulate. Marks outside a profiled run are no-ops.
+
+Finished runs are folded into process-wide totals, exposed in the
+Prometheus text format by render_metrics() (the API's /metrics). Job
+workers return their breakdown with the result and the API process
+records it, see jobs.py.
+
+Set CALIBRATION_PROFILE_SLOW_SECONDS to run every pipeline under cProfile
+and keep a dump (static/profiles/<run id>-<time>.prof, read it with
+`python -m pstats`) for runs that take at least that long.
+"""
+import os
+import sys
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:   # not available on Windows
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.path.join(BASE_DIR, "static", "profiles")
+_slow = os.environ.get("CALIBRATION_PROFILE_SLOW_SECONDS")
+PROFILE_SLOW_SECONDS = float(_slow) if _slow else None
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes():
+    """Current resident set size (Linux), else the peak so far."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024   # macOS reports bytes
+
+
+class RunProfile:
+    """Stage timings of one run; a stage marked again accumulates."""
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.stages = {}
+        self._current = None
+        self._started = time.perf_counter()
+        self._stage_started = None
+        self._stage_peak = None
+
+    def _entry(self, name):
+        if name not in self.stages:
+            self.stages[name] = {"seconds": 0.0, "calls": 0, "rows": 0, "bytes_written": 0,
+                                 "rss_bytes": 0, "peak_rss_growth_bytes": 0}
+        return self.stages[name]
+
+    def _close(self):
+        if self._current is None:
+            return
+        entry = self._entry(self._current)
+        entry["seconds"] += time.perf_counter() - self._stage_started
+        entry["calls"] += 1
+        entry["rss_bytes"] = max(entry["rss_bytes"], rss_bytes())
+        entry["peak_rss_growth_bytes"] += peak_rss_bytes() - self._stage_peak
+        self._current = None
+
+    def stage(self, name, rows=0):
+        """Close the running stage and start `name` with `rows` rows."""
+        if name == self._current:
+            self.count(rows=rows)
+            return
+        self._close()
+        self._current = name
+        self._stage_started = time.perf_counter()
+        self._stage_peak = peak_rss_bytes()
+        self.count(rows=rows)
+
+    def count(self, rows=0, bytes_written=0):
+        """Add rows processed / bytes written to the running stage."""
+        if self._current is not None:
+            entry = self._entry(self._current)
+            entry["rows"] += int(rows)
+            entry["bytes_written"] += int(bytes_written)
+
+    def finish(self, status="done"):
+        """Close the last stage; :return: the breakdown dict (JSON-ready)."""
+        self._close()
+        return {"run_id": self.run_id, "status": status,
+                "seconds": time.perf_counter() - self._started,
+                "peak_rss_bytes": peak_rss_bytes(), "stages": self.stages}
+
+
+_active = contextvars.ContextVar("calibration_profile", default=None)
+
+
+def current():
+    return _active.get()
+
+
+def stage(name, rows=0):
+    profile = _active.get()
+    if profile is not None:
+        profile.stage(name, rows)
+
+
+def count(rows=0, bytes_written=0):
+    profile = _active.get()
+    if profile is not None:
+        profile.count(rows, bytes_written)
+
+
+def file_bytes(paths):
+    """Total size of the files that exist among `paths`."""
+    return sum(os.path.getsize(p) for p in paths if p and os.path.exists(p))
+
+
+@contextmanager
+def profile_run(run_id=None, slow_seconds=None):
+    """
+    Profile the enclosed pipeline run. The breakdown is in `.timings` of
+    the yielded object after the block, and is recorded into the metrics.
+    :param slow_seconds: keep a cProfile dump when the run takes at least
+                         this long (default CALIBRATION_PROFILE_SLOW_SECONDS)
+    """
+    slow_seconds = PROFILE_SLOW_SECONDS if slow_seconds is None else slow_seconds
+    profile = RunProfile(run_id)
+    token = _active.set(profile)
+    profiler = None
+    if slow_seconds is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    status = "failed"
+    try:
+        yield profile
+        status = "done"
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _active.reset(token)
+        profile.timings = profile.finish(status)
+        if profiler is not None and profile.timings["seconds"] >= slow_seconds:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            name = f"{run_id or 'run'}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.prof"
+            path = os.path.join(PROFILE_DIR, name)
+            profiler.dump_stats(path)
+            profile.timings["profile_dump"] = path
+            print(f"⚠️ Slow run ({profile.timings['seconds']:.1f}s), cProfile dump saved: {path}")
+        record(profile.timings)
+
+
+# ---------------------------
+# Process-wide metrics
+# ---------------------------
+_lock = threading.Lock()
+_stage_totals = {}    # stage -> summed RunProfile entry
+_stage_histograms = {}  # stage -> [count per DURATION_BUCKETS bound, +Inf]
+_runs = {}            # status -> count
+_run_seconds = 0.0
+_slow_dumps = 0
+
+
+def record(timings):
+    """Fold a finished run's breakdown into the process-wide metrics."""
+    global _run_seconds, _slow_dumps
+    with _lock:
+        _runs[timings["status"]] = _runs.get(timings["status"], 0) + 1
+        _run_seconds += timings["seconds"]
+        _slow_dumps += "profile_dump" in timings
+        for name, entry in timings["stages"].items():
+            totals = _stage_totals.setdefault(name, {"seconds": 0.0, "calls": 0, "rows": 0,
+                                                     "bytes_written": 0, "rss_bytes": 0})
+            for key in ("seconds", "calls", "rows", "bytes_written"):
+                totals[key] += entry[key]
+            totals["rss_bytes"] = max(totals["rss_bytes"], entry["rss_bytes"])
+            histogram = _stage_histograms.setdefault(name, [0] * (len(DURATION_BUCKETS) + 1))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                histogram[i] += entry["seconds"] <= bound
+            histogram[-1] += 1
+
+
+def record_failure():
+    """Count a run that failed before returning a breakdown."""
+    with _lock:
+        _runs["failed"] = _runs.get("failed", 0) + 1
+
+
+def _metric(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+
+def render_metrics():
+    """Metrics in the Prometheus text exposition format."""
+    with _lock:
+        totals = {name: dict(entry) for name, entry in _stage_totals.items()}
+        histograms = {name: list(h) for name, h in _stage_histograms.items()}
+        runs, run_seconds, slow_dumps = dict(_runs), _run_seconds, _slow_dumps
+
+    lines = []
+    _metric(lines, "calibration_runs_total", "counter", "Pipeline runs by outcome.",
+            [({"status": status}, n) for status, n in sorted(runs.items())])
+    _metric(lines, "calibration_run_seconds_total", "counter", "Wall time of all pipeline runs.",
+            [({}, run_seconds)])
+    _metric(lines, "calibration_slow_run_profiles_total", "counter",
+            "cProfile dumps kept for slow runs.", [({}, slow_dumps)])
+    for key, name, kind, help_text in (
+        ("seconds", "calibration_stage_seconds_total", "counter", "Time spent in each pipeline stage."),
+        ("calls", "calibration_stage_calls_total", "counter", "Stage executions (chunks count separately)."),
+        ("rows", "calibration_stage_rows_total", "counter", "Rows processed by each stage."),
+        ("bytes_written", "calibration_stage_bytes_written_total", "counter",
+         "Bytes written by each stage (database growth, report files)."),
+        ("rss_bytes", "calibration_stage_max_rss_bytes", "gauge",
+         "Largest resident set size seen at the end of each stage."),
+    ):
+        _metric(lines, name, kind, help_text,
+                [({"stage": stage}, entry[key]) for stage, entry in sorted(totals.items())])
+
+    name = "calibration_stage_duration_seconds"
+    lines.append(f"# HELP {name} Per-run duration of each pipeline stage.")
+    lines.append(f"# TYPE {name} histogram")
+    for stage, histogram in sorted(histograms.items()):
+        for bound, n in zip(DURATION_BUCKETS + ("+Inf",), histogram):
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {n}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {totals[stage]["seconds"]}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {histogram[-1]}')
+
+    _metric(lines, "calibration_process_resident_memory_bytes", "gauge",
+            "Resident set size of the API process.", [({}, rss_bytes())])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,243 @@
+"""
+Report chart and PDF rendering.
+
+Figures are built once per process as templates (matplotlib Figure objects,
+no pyplot state) and reused: each render only swaps in new line data,
+bars or table text. Line series are decimated to the plot's pixel columns
+before drawing, keeping each column's lowest and highest sample, so long
+runs draw as fast as short ones and spikes stay visible.
+
+The PNG charts and the PDF are independent artifacts. With more than one
+RENDER_WORKERS they are rendered at the same time in a spawn process pool
+whose workers keep their own templates; otherwise they are rendered in
+turn in the calling process. The PDF's pages share one output stream, so
+they are rendered in order by a single worker.
+"""
+import os
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+RENDER_WORKERS = int(os.environ.get("CALIBRATION_RENDER_WORKERS", min(3, os.cpu_count() or 1)))
+CHART_DPI = 100
+LINE_FIGSIZE = (10, 5)
+BAR_FIGSIZE = (8, 4)
+TABLE_FIGSIZE = (12, 6)
+# Samples per line are cut to two per pixel column of a line chart
+DECIMATE_WIDTH = int(LINE_FIGSIZE[0] * CHART_DPI)
+
+# Page name -> summary keys it draws
+PAGE_INPUTS = {
+    "table": ("head",),
+    "drift": ("drift",),
+    "rul_health": ("rul_days", "health"),
+    "alerts": ("alert_counts",),
+    "maintenance": ("maintenance_counts",),
+}
+PDF_PAGES = ["table", "drift", "rul_health", "alerts", "maintenance"]
+LINE_SERIES = ("drift", "rul_days", "health")
+
+_lock = threading.Lock()
+_templates = {}
+_executor = None
+
+
+def decimate(x, y, width=DECIMATE_WIDTH):
+    """
+    Min/max decimation: split the samples into `width` equal runs and keep
+    the lowest and highest sample of each, in their original order.
+    Runs that are all NaN keep one NaN sample, so gaps stay gaps.
+    :return: (x, y), unchanged when there are at most 2 * width samples
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 2 * width:
+        return x, y
+    per = -(-n // width)
+    runs = -(-n // per)
+    pad = runs * per - n
+    missing = np.isnan(y)
+    lo = np.pad(np.where(missing, np.inf, y), (0, pad), constant_values=np.inf)
+    hi = np.pad(np.where(missing, -np.inf, y), (0, pad), constant_values=-np.inf)
+    picks = np.stack([lo.reshape(runs, per).argmin(axis=1), hi.reshape(runs, per).argmax(axis=1)], axis=1)
+    keep = np.unique(picks + (np.arange(runs) * per)[:, None])
+    return np.asarray(x)[keep], y[keep]
+
+
+def chart_inputs(summary):
+    """The summary's line series decimated as (x, y) pairs, plus its table and counts."""
+    data = {key: summary[key] for key in ("head", "alert_counts", "maintenance_counts")}
+    for key in LINE_SERIES:
+        data[key] = decimate(summary["index"], summary[key])
+    return data
+
+
+# ---------------------------
+# Figure templates
+# ---------------------------
+def _pdf_style():
+    """The seaborn whitegrid theme as rcParams, applied per figure, not globally."""
+    import seaborn as sns
+    from cycler import cycler
+    return {**sns.axes_style("whitegrid"), **sns.plotting_context("notebook"),
+            "axes.prop_cycle": cycler(color=sns.color_palette("deep"))}
+
+
+def _rc_context(style):
+    import matplotlib
+    return matplotlib.rc_context(_pdf_style() if style == "pdf" else None)
+
+
+def _line_template(title, ylabel, labels):
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=LINE_FIGSIZE, dpi=CHART_DPI)
+    ax = figure.add_subplot()
+    lines = [ax.plot([], [], label=label)[0] for label in labels]
+    ax.set_title(title)
+    ax.set_xlabel("Reading #")
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    return {"figure": figure, "axes": ax, "lines": lines}
+
+
+def _axes_template(figsize):
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=figsize, dpi=CHART_DPI)
+    return {"figure": figure, "axes": figure.add_subplot(), "table": None}
+
+
+_TEMPLATES = {
+    "drift": lambda: _line_template("Drift Over Time", "Drift", ["Drift"]),
+    "rul_health": lambda: _line_template("RUL & Health", "Value", ["RUL (days)", "Health (%)"]),
+    "table": lambda: _axes_template(TABLE_FIGSIZE),
+    "alerts": lambda: _axes_template(BAR_FIGSIZE),
+    "maintenance": lambda: _axes_template(BAR_FIGSIZE),
+}
+
+
+def _template(page, style):
+    key = (page, style)
+    if key not in _templates:
+        _templates[key] = _TEMPLATES[page]()
+    return _templates[key]
+
+
+def _draw_lines(template, series):
+    for line, (x, y) in zip(template["lines"], series):
+        line.set_data(x, y)
+    template["axes"].relim()
+    template["axes"].autoscale_view()
+
+
+def _draw_table(template, head):
+    values, columns = head.values, list(head.columns)
+    table = template["table"]
+    if table is not None and len(table.get_celld()) == (len(values) + 1) * len(columns) \
+            and [table[0, c].get_text().get_text() for c in range(len(columns))] == [str(c) for c in columns]:
+        for (row, col), cell in table.get_celld().items():
+            if row:
+                cell.get_text().set_text(values[row - 1][col])
+        return
+    if table is not None:
+        table.remove()
+    ax = template["axes"]
+    ax.axis("off")
+    table = ax.table(cellText=values, colLabels=columns, loc="center")
+    table.auto_set_font_size(False)
+    table.set_fontsize(9)
+    template["table"] = table
+
+
+def _draw_bars(template, counts, title, color):
+    ax = template["axes"]
+    ax.clear()
+    counts.sort_values(ascending=False).plot(kind="bar", color=color, ax=ax)
+    ax.set_title(title)
+
+
+def _draw_page(page, data, style):
+    """Update page's template with data and return its figure."""
+    template = _template(page, style)
+    if page == "table":
+        _draw_table(template, data["head"])
+    elif page == "drift":
+        _draw_lines(template, [data["drift"]])
+    elif page == "rul_health":
+        _draw_lines(template, [data["rul_days"], data["health"]])
+    elif page == "alerts":
+        _draw_bars(template, data["alert_counts"], "Alert Levels", ["green", "orange", "red"])
+    elif page == "maintenance":
+        _draw_bars(template, data["maintenance_counts"], "Maintenance Suggestions", "skyblue")
+    return template["figure"]
+
+
+def render_artifact(name, path, data):
+    """
+    Render one artifact: "drift" / "rul_health" as PNG, or "pdf" with all
+    PDF_PAGES. Also the pool workers' entry point.
+    :param data: chart_inputs() (only the keys the artifact's pages use)
+    """
+    with _lock:
+        if name != "pdf":
+            with _rc_context("png"):
+                _draw_page(name, data, "png").savefig(path)
+            return path
+        from matplotlib.backends.backend_pdf import PdfPages
+        with _rc_context("pdf"), PdfPages(path) as pdf:
+            for page in PDF_PAGES:
+                pdf.savefig(_draw_page(page, data, "pdf"))
+    return path
+
+
+# ---------------------------
+# Worker pool
+# ---------------------------
+def _init_worker():
+    # Build every template up front so a worker's first render is a warm one
+    for style, pages in (("png", ("drift", "rul_health")), ("pdf", PDF_PAGES)):
+        with _rc_context(style):
+            for page in pages:
+                _template(page, style)
+
+
+def _ensure_pool():
+    # spawn, like the job queue: children must not inherit the parent's SQLite connection
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=mp.get_context("spawn"),
+                                        initializer=_init_worker)
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _artifact_inputs(name, data):
+    pages = PDF_PAGES if name == "pdf" else [name]
+    return {key: data[key] for page in pages for key in PAGE_INPUTS[page]}
+
+
+def render_artifacts(summary, targets):
+    """
+    Render chart/PDF artifacts from a report summary, in parallel when
+    RENDER_WORKERS allows.
+    :param summary: see computation_engine.summarize_for_report
+    :param targets: {"drift" | "rul_health" | "pdf": output path}
+    :return: the targets
+    """
+    data = chart_inputs(summary)
+    tasks = [(name, path, _artifact_inputs(name, data)) for name, path in targets.items()]
+    if RENDER_WORKERS <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            render_artifact(*task)
+        return targets
+    futures = [_ensure_pool().submit(render_artifact, *task) for task in tasks]
+    for future in futures:
+        future.result()
+    return targets
@@ -0,0 +1,135 @@
+"""
+Declarative, column-wise rule engine for alerts and maintenance tiers.
+
+A rule table is an ordered list of ``(label, conditions)`` pairs plus a
+default label. ``conditions`` is a list of ``(column, op, value)`` clauses
+that are OR-ed together; the first rule that matches a row wins. ``value``
+is either a literal or the name of a key in the thresholds dict, so sites
+can override thresholds and whole tables without writing per-row Python.
+"""
+import operator
+import numpy as np
+import pandas as pd
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+DEFAULT_THRESHOLDS = {
+    "min_val": 95,
+    "max_val": 105,
+    "health_critical": 50,
+    "rul_critical": 7,
+    "health_warning": 70,
+}
+
+ALERT_RULES = {
+    "rules": [
+        ("CRITICAL", [("measured", "<", "min_val"), ("measured", ">", "max_val")]),
+        ("WARNING", [("anomaly", "!=", "Normal")]),
+    ],
+    "default": "NORMAL",
+}
+
+MAINTENANCE_RULES = {
+    "rules": [
+        ("Recalibrate within 1 week", [("health", "<", "health_critical"),
+                                       ("rul_days", "<", "rul_critical")]),
+        ("Monitor closely, recalibrate soon", [("health", "<", "health_warning")]),
+    ],
+    "default": "No action needed",
+}
+
+
+def _resolve(value, thresholds):
+    if isinstance(value, str) and value in thresholds:
+        return thresholds[value]
+    return value
+
+
+def _condition_mask(df, conditions, thresholds):
+    mask = np.zeros(len(df), dtype=bool)
+    for column, op, value in conditions:
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown rule operator: {op!r}")
+        result = OPERATORS[op](df[column], _resolve(value, thresholds))
+        mask |= np.asarray(result, dtype=bool)
+    return mask
+
+
+def table_categories(table):
+    """Labels a rule table can produce, in rule order with the default last."""
+    return list(dict.fromkeys([label for label, _ in table["rules"]] + [table["default"]]))
+
+
+def evaluate_rules(df, table, thresholds=None):
+    """
+    Evaluate an ordered rule table over whole columns.
+    :return: pandas Categorical with the table's labels as categories
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    categories = table_categories(table)
+
+    codes = np.full(len(df), categories.index(table["default"]), dtype=np.int8)
+    # Apply in reverse so earlier rules take precedence over later ones
+    for label, conditions in reversed(table["rules"]):
+        codes[_condition_mask(df, conditions, thresholds)] = categories.index(label)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def evaluate_rules_grid(columns, table, thresholds=None, labels=None):
+    """
+    Evaluate a rule table under many threshold sets at once (what-if sweeps).
+    Threshold values may be (configs, 1) arrays and columns 1-D (rows,) or
+    2-D (configs, rows) arrays; results broadcast to (configs, rows).
+    :param columns: column name -> array
+    :param labels: column name -> label list, for columns passed as integer
+                   codes into that list (rules compare the labels)
+    :return: (int8 codes into categories, categories)
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    labels = labels or {}
+    categories = table_categories(table)
+
+    masks = []
+    for label, conditions in table["rules"]:
+        mask = False
+        for column, op, value in conditions:
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown rule operator: {op!r}")
+            value = _resolve(value, thresholds)
+            if column in labels:
+                lookup = OPERATORS[op](np.array(labels[column], dtype=object), value).astype(bool)
+                mask = mask | lookup[columns[column]]
+            else:
+                mask = mask | OPERATORS[op](columns[column], value)
+        masks.append((categories.index(label), mask))
+
+    shape = np.broadcast_shapes(*(np.shape(c) for c in columns.values()),
+                                *(np.shape(mask) for _, mask in masks))
+    codes = np.full(shape, categories.index(table["default"]), dtype=np.int8)
+    for code, mask in reversed(masks):
+        np.copyto(codes, code, where=mask)
+    return codes, categories
+
+
+def evaluate_rules_row(row, table, thresholds=None):
+    """
+    Evaluate an ordered rule table against a single reading (a dict).
+    Same semantics as evaluate_rules, without building a DataFrame; used on
+    the per-message live ingest path.
+    :return: the matching label
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    for label, conditions in table["rules"]:
+        for column, op, value in conditions:
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown rule operator: {op!r}")
+            if OPERATORS[op](row[column], _resolve(value, thresholds)):
+                return label
+    return table["default"]
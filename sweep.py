@@ -0,0 +1,229 @@
+"""
+Threshold what-if sweeps over stored history.
+
+A sweep evaluates a grid of threshold configurations against
+temperature_readings in one pass. Readings are read in id order in chunks
+and every configuration is applied at once by broadcasting (configs ×
+readings) masks, so a sweep costs one table scan however many
+configurations it holds.
+
+Anomalies are re-derived from the stored measured values with the rules of
+detect_anomalies (spike/stuck/noisy compare each reading with the previous
+ones of its sensor, carried across chunks). Drift, RUL and health do not
+depend on thresholds and are read as stored. Alerts and maintenance tiers
+come from the same rule tables as the pipeline (rules.py).
+
+Each configuration gets its label counts and confusion stats against the
+stored labels, or against one reference configuration of the grid.
+
+    python -m pipeline.sweep --grid min_val=94,95,96 --grid spike_threshold=1.5,2,2.5
+"""
+import sys
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from . import db
+from .rules import (
+    ALERT_RULES, DEFAULT_THRESHOLDS, MAINTENANCE_RULES, evaluate_rules_grid, table_categories,
+)
+from .computation_engine import (
+    ANOMALY_LABELS, SENSOR_COLUMN, _history_filters, _with_context, classify_anomalies,
+    sensor_order, tail_context,
+)
+
+SWEEP_DEFAULTS = {**DEFAULT_THRESHOLDS, "spike_threshold": 2.0}
+MAX_SWEEP_CONFIGS = 256
+# configs × readings evaluated per chunk; the int64 confusion keys dominate
+# memory, so this is ~64 MB plus a few int8/bool arrays of the same shape
+SWEEP_CELLS = 8_000_000
+SWEEP_OUTPUTS = ("alert", "maintenance")
+
+
+def expand_grid(grid):
+    """{"min_val": [94, 95], "spike_threshold": [1.5, 2]} -> the 4 combinations."""
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    return [dict(zip(grid, combo)) for combo in itertools.product(*values)]
+
+
+def resolve_configs(configs):
+    """
+    Validate threshold configurations and fill in SWEEP_DEFAULTS.
+    :raises ValueError: empty or too large a grid, unknown or non-numeric thresholds
+    """
+    if not configs:
+        raise ValueError("no threshold configurations given")
+    if len(configs) > MAX_SWEEP_CONFIGS:
+        raise ValueError(f"{len(configs)} configurations given, at most {MAX_SWEEP_CONFIGS} allowed")
+    resolved = []
+    for config in configs:
+        unknown = set(config) - set(SWEEP_DEFAULTS)
+        if unknown:
+            raise ValueError(f"unknown thresholds: {', '.join(sorted(unknown))} "
+                             f"(known: {', '.join(SWEEP_DEFAULTS)})")
+        try:
+            resolved.append({name: float(config.get(name, default))
+                             for name, default in SWEEP_DEFAULTS.items()})
+        except (TypeError, ValueError):
+            raise ValueError(f"thresholds must be numbers: {config}") from None
+    return resolved
+
+
+def _rule_columns(*tables):
+    return {column for table in tables for _, conditions in table["rules"] for column, _, _ in conditions}
+
+
+def _label_counts(codes, n_labels):
+    """Per-config label counts of (configs × rows) codes in one bincount."""
+    k = codes.shape[0]
+    keys = np.arange(k)[:, None] * n_labels + codes
+    return np.bincount(keys.ravel(), minlength=k * n_labels).reshape(k, n_labels)
+
+
+def _confusion(base, codes, n_labels):
+    """
+    (configs, n_labels + 1, n_labels) counts of baseline label × config label;
+    baseline row n_labels holds rows whose stored label is not in the table.
+    """
+    k = codes.shape[0]
+    keys = (np.arange(k)[:, None] * (n_labels + 1) + base) * n_labels + codes
+    return np.bincount(keys.ravel(), minlength=k * (n_labels + 1) * n_labels) \
+             .reshape(k, n_labels + 1, n_labels)
+
+
+def confusion_stats(matrix, categories, default):
+    """
+    JSON-ready confusion stats; "positive" means any label but the table's
+    default (an alert / a maintenance action).
+    """
+    known = matrix[:-1]
+    positive = np.array([c != default for c in categories])
+    tp = int(known[np.ix_(positive, positive)].sum())
+    fp = int(known[np.ix_(~positive, positive)].sum())
+    fn = int(known[np.ix_(positive, ~positive)].sum())
+    tn = int(known[np.ix_(~positive, ~positive)].sum())
+    total = int(known.sum())
+    return {
+        "matrix": {base: {label: int(n) for label, n in zip(categories, row)}
+                   for base, row in zip(categories, known)},
+        "unmatched": int(matrix[-1].sum()),
+        "agreement": float(np.trace(known)) / total if total else None,
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": tp / (tp + fp) if tp + fp else None,
+        "recall": tp / (tp + fn) if tp + fn else None,
+    }
+
+
+def sweep_thresholds(configs, sensor_id=None, start=None, end=None, reference=None,
+                     alert_rules=None, maintenance_rules=None, chunk_rows=None, db_conn=None):
+    """
+    Evaluate threshold configurations over the stored readings in one pass.
+    :param configs: threshold dicts (keys of SWEEP_DEFAULTS; missing keys
+                    take the defaults), e.g. from expand_grid()
+    :param start, end: ISO timestamps, start inclusive and end exclusive;
+                       readings before start are not used as history, so
+                       each sensor's series restarts at start
+    :param reference: index of the configuration the others are compared
+                      with; None compares with the stored labels
+    :param chunk_rows: readings per chunk (default SWEEP_CELLS / configs)
+    :return: {"rows": n, "baseline": ..., "configs": [{"config", "anomaly",
+             "alert", "maintenance", "alert_confusion", "maintenance_confusion"}]}
+    """
+    configs = resolve_configs(configs)
+    k = len(configs)
+    if reference is not None and not 0 <= int(reference) < k:
+        raise ValueError(f"reference must index one of the {k} configurations")
+    tables = {"alert": alert_rules or ALERT_RULES, "maintenance": maintenance_rules or MAINTENANCE_RULES}
+    categories = {name: table_categories(table) for name, table in tables.items()}
+    # (configs, 1) columns broadcast against (rows,) readings
+    thresholds = {name: np.array([c[name] for c in configs])[:, None] for name in SWEEP_DEFAULTS}
+    columns = sorted((_rule_columns(*tables.values()) - {"anomaly"}) | {"measured"})
+    query_columns = ["id", SENSOR_COLUMN] + [c for c in columns if c != SENSOR_COLUMN] + list(SWEEP_OUTPUTS)
+    chunk_rows = int(chunk_rows or max(1_000, SWEEP_CELLS // k))
+
+    anomaly_counts = np.zeros((k, len(ANOMALY_LABELS)), dtype=np.int64)
+    confusion = {name: np.zeros((k, len(categories[name]) + 1, len(categories[name])), dtype=np.int64)
+                 for name in tables}
+    rows = 0
+    cursor = None
+    context = None
+    while True:
+        clause, params = _history_filters(cursor, "asc", sensor_id, start, end)
+        df = db.read_frame(f"SELECT {', '.join(query_columns)} FROM temperature_readings{clause} "
+                           "ORDER BY id LIMIT ?", params + [chunk_rows], db_conn)
+        if df.empty:
+            break
+        cursor = int(df["id"].iloc[-1])
+        df["measured"] = df["measured"].astype(float)
+
+        # Group by sensor with the previous chunk's last readings in front
+        values, sensors, n_context = _with_context(df, "measured", context)
+        context = tail_context(context, df, columns=("measured",))
+        order, positions, _ = sensor_order(sensors)
+        anomaly = classify_anomalies(values[order], positions=positions,
+                                     min_val=thresholds["min_val"], max_val=thresholds["max_val"],
+                                     spike_threshold=thresholds["spike_threshold"])
+        keep = order >= n_context
+        anomaly = np.broadcast_to(anomaly, (k, len(order)))[:, keep]
+        order = order[keep] - n_context
+
+        frame = {c: df[c].to_numpy()[order] for c in columns}
+        frame["anomaly"] = anomaly
+        anomaly_counts += _label_counts(anomaly, len(ANOMALY_LABELS))
+        for name, table in tables.items():
+            codes, _ = evaluate_rules_grid(frame, table, thresholds, labels={"anomaly": ANOMALY_LABELS})
+            codes = np.broadcast_to(codes, (k, len(order)))
+            if reference is None:
+                base = pd.Categorical(df[name].to_numpy()[order], categories=categories[name]).codes
+                base = np.where(base < 0, len(categories[name]), base)
+            else:
+                base = codes[int(reference)]
+            confusion[name] += _confusion(base, codes, len(categories[name]))
+        rows += len(df)
+
+    results = []
+    for i, config in enumerate(configs):
+        entry = {"config": config,
+                 "anomaly": {label: int(n) for label, n in zip(ANOMALY_LABELS, anomaly_counts[i])}}
+        for name, table in tables.items():
+            matrix = confusion[name][i]
+            entry[name] = {label: int(n) for label, n in zip(categories[name], matrix.sum(axis=0))}
+            entry[f"{name}_confusion"] = confusion_stats(matrix, categories[name], table["default"])
+        results.append(entry)
+    return {"rows": rows, "baseline": "stored" if reference is None else int(reference),
+            "configs": results}
+
+
+def _parse_grid(items):
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        grid[name] = [float(v) for v in values.split(",") if v]
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help=f"threshold values to combine ({', '.join(SWEEP_DEFAULTS)})")
+    parser.add_argument("--sensor-id")
+    parser.add_argument("--start", help="ISO timestamp (inclusive)")
+    parser.add_argument("--end", help="ISO timestamp (exclusive)")
+    parser.add_argument("--reference", type=int, help="compare with this configuration, not stored labels")
+    args = parser.parse_args(argv)
+
+    report = sweep_thresholds(expand_grid(_parse_grid(args.grid)), sensor_id=args.sensor_id,
+                              start=args.start, end=args.end, reference=args.reference)
+    names = [n for n in SWEEP_DEFAULTS if any(g.partition("=")[0] == n for g in args.grid)]
+    print(f"✅ Swept {len(report['configs'])} configurations over {report['rows']:,} readings")
+    for entry in report["configs"]:
+        config = ", ".join(f"{n}={entry['config'][n]:g}" for n in names) or "defaults"
+        stats = entry["alert_confusion"]
+        print(f"{config:<48} alerts {entry['alert']}  precision={stats['precision']}  recall={stats['recall']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Synthetic calibration data with controllable defect rates.
+
+Every sensor reads its ideal value plus a slow drift (and optional
+jitter); defects are injected at the given per-reading rates:
+- spike: a jump of SPIKE_SIZE that stays inside the 95–105 band
+- out_of_range: a reading OUT_OF_RANGE_SIZE away from ideal
+- stuck: the sensor repeats its last value for STUCK_RUN readings
+- noise: a ±NOISE_SIZE push whose sign alternates from reading to reading
+Sensors are interleaved in time order, like a fleet export. Jitter makes
+consecutive readings change direction, which the anomaly rules label
+Noisy, so it is off by default to keep the injected rates readable.
+
+    python -m pipeline.synthetic readings.csv --rows 1000000 --sensors 20 --spike-rate 0.01
+"""
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+SPIKE_SIZE = (2.5, 4.0)
+OUT_OF_RANGE_SIZE = (6.0, 10.0)
+STUCK_RUN = (3, 6)
+NOISE_SIZE = 0.8
+
+
+def generate_calibration_frame(rows, sensors=1, spike_rate=0.005, stuck_rate=0.002,
+                               noise_rate=0.01, drift_rate=0.05, out_of_range_rate=0.002,
+                               jitter=0.0, ideal=100.0, interval="1min",
+                               start="2024-01-01", seed=0):
+    """
+    :param rows: total readings across all sensors
+    :param drift_rate: mean offset gained per day (each sensor gets a
+                       random sign and a ±50% spread)
+    :param jitter: std of the measurement noise on every reading
+    :return: DataFrame with timestamp, sensor_id (when sensors > 1),
+             measured and ideal columns
+    """
+    rng = np.random.default_rng(seed)
+    per_sensor = -(-rows // sensors)
+    step = np.arange(per_sensor)
+    days = step * (pd.Timedelta(interval) / pd.Timedelta("1D"))
+    slopes = drift_rate * rng.choice([-1, 1], sensors) * rng.uniform(0.5, 1.5, sensors)
+    measured = ideal + slopes[:, None] * days + rng.normal(0, jitter, (sensors, per_sensor))
+
+    def hits(rate):
+        return rng.random((sensors, per_sensor)) < rate
+
+    noisy = hits(noise_rate)
+    measured[noisy] += NOISE_SIZE * np.where(step % 2, 1, -1)[np.nonzero(noisy)[1]]
+    spikes = hits(spike_rate)
+    measured[spikes] += rng.choice([-1, 1], spikes.sum()) * rng.uniform(*SPIKE_SIZE, spikes.sum())
+    out = hits(out_of_range_rate)
+    measured[out] = ideal + rng.choice([-1, 1], out.sum()) * rng.uniform(*OUT_OF_RANGE_SIZE, out.sum())
+
+    # Stuck runs copy the value before the run forward
+    for sensor, first in zip(*np.nonzero(hits(stuck_rate))):
+        if first:
+            length = rng.integers(STUCK_RUN[0], STUCK_RUN[1] + 1)
+            measured[sensor, first:first + length] = measured[sensor, first - 1]
+
+    times = pd.date_range(start, periods=per_sensor, freq=interval)
+    df = pd.DataFrame({
+        "timestamp": np.repeat(times.values, sensors),     # time-major: sensors interleaved
+        "measured": np.round(measured.T.ravel(), 6),
+        "ideal": ideal,
+    })
+    if sensors > 1:
+        width = len(str(sensors - 1))
+        df.insert(1, "sensor_id", np.tile([f"sensor-{i:0{width}d}" for i in range(sensors)], per_sensor))
+    return df.head(rows)
+
+
+def write_calibration_csv(path, rows, **kwargs):
+    """generate_calibration_frame() written to `path`; returns the path."""
+    generate_calibration_frame(rows, **kwargs).to_csv(path, index=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--sensors", type=int, default=1)
+    for name in ("spike", "stuck", "noise", "drift", "out-of-range"):
+        parser.add_argument(f"--{name}-rate", type=float, default=None)
+    parser.add_argument("--jitter", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    options = {k: v for k, v in vars(args).items() if k not in ("path", "rows") and v is not None}
+    write_calibration_csv(args.path, args.rows, **options)
+    print(f"✅ Wrote {args.rows:,} readings from {args.sensors} sensor(s) to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
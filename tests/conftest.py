@@ -0,0 +1,21 @@
+import pytest
+
+from .. import computation_engine, db
+from ..computation_engine import init_storage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """This thread's pooled connection to a scratch database, closed afterwards."""
+    db.close()
+    db_conn = init_storage(str(tmp_path / "calibration.db"))
+    yield db_conn
+    db.close()
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    """Report and chart files go to tmp_path instead of static/."""
+    monkeypatch.setattr(computation_engine, "REPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(computation_engine, "CHART_DIR", str(tmp_path))
+    return tmp_path
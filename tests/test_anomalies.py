@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..benchmark import _reference_anomalies, _synthetic_measured
+from ..computation_engine import detect_anomalies
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_vectorized_labels_match_reference_loop(seed):
+    values = _synthetic_measured(20_000, seed=seed)
+    df = detect_anomalies(pd.DataFrame({"measured": values}))
+    assert list(df["anomaly"].astype(str)) == _reference_anomalies(values)
+
+
+@pytest.mark.parametrize("values", [[], [100.0], [94.0, 100.0], [100.0, 100.0, 100.0],
+                                    [100.0, 103.0, 100.5, 101.0, 100.0]])
+def test_short_series_match_reference_loop(values):
+    df = detect_anomalies(pd.DataFrame({"measured": np.array(values, dtype=float)}))
+    assert list(df["anomaly"].astype(str)) == _reference_anomalies(values)
+
+
+def test_thresholds_are_passed_through():
+    values = _synthetic_measured(5_000, seed=3)
+    df = detect_anomalies(pd.DataFrame({"measured": values}), min_val=99, max_val=101,
+                          spike_threshold=0.5)
+    assert list(df["anomaly"].astype(str)) == _reference_anomalies(values, 99, 101, 0.5)
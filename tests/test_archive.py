@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..benchmark import _synthetic_measured
+from ..computation_engine import (
+    assign_alerts_and_maintenance, compute_correction, detect_anomalies, iter_history,
+    predict_drift_and_rul, save_to_db,
+)
+
+pytest.importorskip("pyarrow")
+from .. import archive  # noqa: E402
+
+NOW = datetime(2024, 1, 4)
+CUTOFF = "2024-01-03T00:00:00.000000"
+
+
+def _frame(n, seed):
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="min").astype(str),
+        "sensor_id": np.random.default_rng(seed).choice(["sensor-0", "sensor-1", "sensor-2"], n),
+        "measured": _synthetic_measured(n, seed=seed),
+        "ideal": 100.0,
+    })
+    return assign_alerts_and_maintenance(predict_drift_and_rul(detect_anomalies(compute_correction(df))))
+
+
+@pytest.fixture
+def compacted(storage, tmp_path):
+    """Rows older than CUTOFF before compaction, and the archive they went to."""
+    save_to_db(_frame(4_000, 3), db_conn=storage)
+    old = list(iter_history(10_000, order="asc", end=CUTOFF, db_conn=storage))
+    path = str(tmp_path / "history")
+    # Batches that straddle the day partitions
+    assert archive.compact_history(retention_days=1, now=NOW, batch_rows=1_000, path=path) == len(old)
+    return storage, old, path
+
+
+def _walk(path, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        page = list(archive.iter_history(limit, cursor, path=path, **filters))
+        pages.append(page)
+        if len(page) < limit:
+            return pages
+        cursor = page[-1][0]
+
+
+def test_compaction_moves_old_rows_into_the_archive(compacted):
+    db_conn, old, path = compacted
+    assert len(old) == 2 * 24 * 60
+    assert archive.archived_until(db_conn) == CUTOFF
+    assert db_conn.execute("SELECT MIN(timestamp) FROM temperature_readings").fetchone()[0] >= CUTOFF
+    assert db_conn.execute("SELECT COUNT(*) FROM temperature_readings").fetchone()[0] == 4_000 - len(old)
+    archived = archive.read_history(path=path).astype(object)
+    archived = archived.where(archived.notna(), None)
+    assert list(archived.itertuples(index=False, name=None)) == old
+    # Nothing left to move
+    assert archive.compact_history(retention_days=1, now=NOW, path=path) == 0
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [7, 500, 5_000])
+def test_archive_pages_match_the_rows_they_replaced(compacted, order, limit):
+    _, old, path = compacted
+    rows = [row for page in _walk(path, limit, order=order) for row in page]
+    assert rows == (old if order == "asc" else old[::-1])
+
+
+def test_archive_filters_match_sqlite(compacted):
+    _, old, path = compacted
+    start, end = "2024-01-01T20:00:00", "2024-01-02T04:00:00"
+    expected = [row for row in old if row[2] == "sensor-1" and start <= row[1] < end]
+    rows = [row for page in _walk(path, 50, order="asc", sensor_id="sensor-1", start=start, end=end)
+            for row in page]
+    assert rows == expected and len(expected) > 50
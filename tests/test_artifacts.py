@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+import pytest
+
+from .. import EAGER_OUTPUTS, artifacts, run_pipeline_on_uploaded_csv
+from ..benchmark import _synthetic_measured
+
+
+@pytest.fixture
+def runs(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setattr(artifacts, "_touched", {})
+    return storage
+
+
+def _csv(tmp_path, name="readings.csv", seed=0):
+    path = str(tmp_path / name)
+    pd.DataFrame({"measured": _synthetic_measured(200, seed=seed), "ideal": 100.0}).to_csv(path, index=False)
+    return path
+
+
+def _readings(db_conn):
+    return db_conn.execute("SELECT COUNT(*) FROM temperature_readings").fetchone()[0]
+
+
+def test_reupload_after_eviction_renders_without_storing_again(runs, tmp_path):
+    csv_path = _csv(tmp_path)
+    first = run_pipeline_on_uploaded_csv(csv_path)
+    assert not first["cached"] and _readings(runs) == 200
+    assert run_pipeline_on_uploaded_csv(csv_path)["cached"]
+
+    assert artifacts.evict_runs(max_age_days=0) == [first["run_id"]]
+    assert not os.path.exists(first["processed_csv"])
+
+    again = run_pipeline_on_uploaded_csv(csv_path)
+    assert not again["cached"] and again["run_id"] == first["run_id"]
+    assert os.path.exists(again["processed_csv"])
+    assert _readings(runs) == 200
+    # A new file is still stored
+    run_pipeline_on_uploaded_csv(_csv(tmp_path, "other.csv", seed=1))
+    assert _readings(runs) == 400
+
+
+def test_cache_hits_are_written_in_batches(runs, tmp_path):
+    run_id = run_pipeline_on_uploaded_csv(_csv(tmp_path))["run_id"]
+    recorded = runs.execute("SELECT last_accessed FROM runs").fetchone()[0]
+    assert artifacts.lookup_run(run_id) is not None
+    assert runs.execute("SELECT last_accessed FROM runs").fetchone()[0] == recorded
+    artifacts.flush_touches()
+    assert runs.execute("SELECT last_accessed FROM runs").fetchone()[0] > recorded
+
+
+def test_missing_outputs_render_lazily_from_the_stored_results(runs, tmp_path):
+    csv_path = _csv(tmp_path)
+    first = run_pipeline_on_uploaded_csv(csv_path)
+    assert set(first["artifacts"]) == set(EAGER_OUTPUTS) and first["chart_files"] == {}
+
+    more = run_pipeline_on_uploaded_csv(csv_path, outputs=("drift",))
+    assert more["cached"] and set(more["artifacts"]) == {*EAGER_OUTPUTS, "drift"}
+    assert os.path.exists(more["chart_files"]["drift"])
+    assert os.path.exists(artifacts.ensure_artifact(first["run_id"], "pdf"))
+    assert _readings(runs) == 200
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from .. import db
+from ..backfill import backfill
+from ..benchmark import _synthetic_measured
+from ..computation_engine import init_storage
+
+READINGS_QUERY = "SELECT * FROM temperature_readings ORDER BY id"
+
+
+class Killed(Exception):
+    pass
+
+
+@pytest.fixture
+def exports(tmp_path):
+    folder = tmp_path / "exports"
+    folder.mkdir()
+    for day in range(5):
+        pd.DataFrame({
+            "timestamp": pd.date_range(f"2024-01-0{day + 1}", periods=300, freq="min").astype(str),
+            "sensor_id": [f"sensor-{i % 2}" for i in range(300)],
+            "measured": _synthetic_measured(300, seed=day),
+            "ideal": 100.0,
+        }).to_csv(folder / f"day-{day}.csv", index=False)
+    return folder
+
+
+def _kill_after(n):
+    def progress(done, total, path):
+        if done == n:
+            raise Killed(path)
+    return progress
+
+
+def test_interrupted_backfill_resumes_with_the_first_unsaved_file(tmp_path, exports):
+    db.close()
+    init_storage(str(tmp_path / "whole.db"))
+    try:
+        backfill(str(exports), workers=1, models=False, summary_path=None)
+        whole = db.read_frame(READINGS_QUERY)
+    finally:
+        db.close()
+
+    init_storage(str(tmp_path / "resumed.db"))
+    try:
+        with pytest.raises(Killed):
+            backfill(str(exports), workers=1, models=False, summary_path=None, progress=_kill_after(2))
+        assert db.query_one("SELECT COUNT(*) FROM temperature_readings")[0] == 600
+        checkpointed = [row[0] for row in db.query("SELECT path FROM backfill_files ORDER BY path")]
+        assert checkpointed == [str(exports / f"day-{day}.csv") for day in range(2)]
+
+        report = backfill(str(exports), workers=1, models=False, summary_path=None)
+        assert (report["skipped"], report["processed"], report["rows_written"]) == (2, 3, 900)
+        assert report["totals"]["rows"] == 1_500
+        resumed = db.read_frame(READINGS_QUERY)
+    finally:
+        db.close()
+    pd.testing.assert_frame_equal(resumed, whole)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..benchmark import _synthetic_measured
+from ..computation_engine import (
+    HISTORY_COLUMNS, assign_alerts_and_maintenance, compute_correction, detect_anomalies,
+    history_next_cursor, iter_history, predict_drift_and_rul, save_to_db,
+)
+
+
+def _frame(n, seed):
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="15s").astype(str),
+        "sensor_id": np.random.default_rng(seed).choice(["sensor-0", "sensor-1", "sensor-2"], n),
+        "measured": _synthetic_measured(n, seed=seed),
+        "ideal": 100.0,
+    })
+    return assign_alerts_and_maintenance(predict_drift_and_rul(detect_anomalies(compute_correction(df))))
+
+
+@pytest.fixture
+def readings(storage):
+    save_to_db(_frame(2_500, 2), db_conn=storage)
+    return storage
+
+
+def _walk(db_conn, limit, **filters):
+    """Every page in turn, following each page's next cursor."""
+    pages, cursor = [], None
+    while True:
+        page = list(iter_history(limit, cursor, db_conn=db_conn, **filters))
+        next_cursor = history_next_cursor(limit, cursor, db_conn=db_conn, **filters)
+        pages.append(page)
+        if len(page) == limit:
+            assert next_cursor == page[-1][0]
+        else:
+            assert next_cursor is None
+            return pages
+        cursor = next_cursor
+
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+@pytest.mark.parametrize("limit", [1, 7, 500, 2_500])
+def test_pages_cover_every_row_once_in_order(readings, order, limit):
+    ids = [row[0] for page in _walk(readings, limit, order=order) for row in page]
+    expected = [r[0] for r in readings.execute(f"SELECT id FROM temperature_readings ORDER BY id {order}")]
+    assert ids == expected
+
+
+def test_filters_apply_to_every_page(readings):
+    start, end = "2024-01-01T00:01:00", "2024-01-01T09:00:00"
+    pages = _walk(readings, 100, sensor_id="sensor-1", start=start, end=end, alert="NORMAL")
+    rows = [dict(zip(HISTORY_COLUMNS, row)) for page in pages for row in page]
+    expected = readings.execute("SELECT COUNT(*) FROM temperature_readings WHERE sensor_id = ? "
+                                "AND timestamp >= ? AND timestamp < ? AND alert = ?",
+                                ("sensor-1", start, end, "NORMAL")).fetchone()[0]
+    assert len(rows) == expected > 100
+    assert all(r["sensor_id"] == "sensor-1" and r["alert"] == "NORMAL"
+               and start <= r["timestamp"] < end for r in rows)
+
+
+def test_cursor_pages_are_stable_under_new_inserts(readings):
+    first = list(iter_history(50, db_conn=readings))
+    save_to_db(_frame(100, 9), db_conn=readings)
+    second = list(iter_history(50, first[-1][0], db_conn=readings))
+    assert second[0][0] == first[-1][0] - 1
+
+
+def test_invalid_order_is_rejected(readings):
+    with pytest.raises(ValueError):
+        list(iter_history(10, order="sideways", db_conn=readings))
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from .. import db
+from ..benchmark import _synthetic_measured
+from ..computation_engine import init_storage, run_pipeline, run_pipeline_streaming
+
+READINGS_QUERY = "SELECT * FROM temperature_readings ORDER BY id"
+
+
+def _frame(n, sensors, seed, start="2024-01-01"):
+    """Round-robin readings from `sensors` sensors."""
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=n, freq="10s").astype(str),
+        "sensor_id": [f"sensor-{i % sensors}" for i in range(n)],
+        "measured": _synthetic_measured(n, seed=seed),
+        "ideal": 100.0,
+    })
+
+
+def _stored(db_path, csv_paths, run):
+    db.close()
+    init_storage(str(db_path))
+    try:
+        for csv_path in csv_paths:
+            run(csv_path)
+        return db.read_frame(READINGS_QUERY)
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("cuts", [(4_000,), (1, 2_999, 7_001)])
+def test_incremental_uploads_equal_one_full_run(tmp_path, streaming, cuts):
+    df = _frame(9_000, 3, 7)
+    # sensor-3 only shows up in a later upload
+    late = _frame(1_000, 1, 8, start="2024-01-02").assign(sensor_id="sensor-3")
+    df = pd.concat([df, late], ignore_index=True)
+    full_csv = str(tmp_path / "full.csv")
+    df.to_csv(full_csv, index=False)
+    parts = []
+    for i, (first, last) in enumerate(zip((0,) + cuts, cuts + (len(df),))):
+        parts.append(str(tmp_path / f"part-{i}.csv"))
+        df.iloc[first:last].to_csv(parts[-1], index=False)
+
+    def run(csv_path, incremental=False):
+        if streaming:
+            run_pipeline_streaming(csv_path, chunksize=1_234, out_dir=str(tmp_path), outputs=(),
+                                   incremental=incremental)
+        else:
+            run_pipeline(csv_path, out_dir=str(tmp_path), outputs=(), incremental=incremental)
+
+    whole = _stored(tmp_path / "whole.db", [full_csv], run)
+    split = _stored(tmp_path / "split.db", parts, lambda path: run(path, incremental=True))
+    pd.testing.assert_frame_equal(split, whole)
+
+
+def test_standalone_uploads_restart_every_series(tmp_path):
+    df = _frame(2_000, 2, 3)
+    parts = [str(tmp_path / "a.csv"), str(tmp_path / "b.csv")]
+    df.iloc[:1_000].to_csv(parts[0], index=False)
+    df.iloc[1_000:].to_csv(parts[1], index=False)
+    split = _stored(tmp_path / "split.db", parts,
+                    lambda path: run_pipeline(path, out_dir=str(tmp_path), outputs=()))
+    # The first reading of each sensor in the second file has no history
+    second = split.iloc[1_000:1_002]
+    assert (second["drift"] == second["offset"]).all()
+
+
+def test_rendering_an_evicted_run_again_keeps_the_saved_state(tmp_path):
+    df = _frame(2_000, 2, 4)
+    parts = [str(tmp_path / "a.csv"), str(tmp_path / "b.csv")]
+    df.iloc[:1_000].to_csv(parts[0], index=False)
+    df.iloc[1_000:].to_csv(parts[1], index=False)
+
+    def run(csv_path):
+        run_pipeline(csv_path, out_dir=str(tmp_path), outputs=(), incremental=True)
+        if csv_path == parts[0]:
+            run_pipeline(csv_path, out_dir=str(tmp_path), outputs=(), incremental=True,
+                         save_readings=False)
+
+    whole = _stored(tmp_path / "whole.db", parts,
+                    lambda path: run_pipeline(path, out_dir=str(tmp_path), outputs=(), incremental=True))
+    again = _stored(tmp_path / "again.db", parts, run)
+    pd.testing.assert_frame_equal(again, whole)
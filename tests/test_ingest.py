@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..benchmark import _synthetic_measured
+from ..computation_engine import (
+    assign_alerts_and_maintenance, compute_correction, detect_anomalies, predict_drift_and_rul,
+    save_to_db,
+)
+
+
+def _processed(timestamps):
+    df = pd.DataFrame({"timestamp": timestamps, "measured": _synthetic_measured(len(timestamps)),
+                       "ideal": 100.0})
+    return assign_alerts_and_maintenance(predict_drift_and_rul(detect_anomalies(compute_correction(df))))
+
+
+def _stored(db_conn, column="timestamp"):
+    return [row[0] for row in db_conn.execute(f"SELECT {column} FROM temperature_readings ORDER BY id")]
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 50_000])
+def test_batches_store_every_row_in_order(storage, batch_size):
+    df = _processed(pd.date_range("2024-01-01", periods=100, freq="min").astype(str))
+    stats = save_to_db(df, db_conn=storage, batch_size=batch_size)
+    assert stats["rows"] == 100
+    assert _stored(storage, "measured") == df["measured"].tolist()
+    assert _stored(storage)[0] == "2024-01-01T00:00:00.000000"
+
+
+def test_offsets_are_stored_as_utc(storage):
+    df = _processed(["2024-03-01T10:00:00+02:00", "2024-03-01T10:00:00-05:30", "2024-03-01T10:00:00Z"])
+    save_to_db(df, db_conn=storage)
+    assert _stored(storage) == ["2024-03-01T08:00:00.000000", "2024-03-01T15:30:00.000000",
+                                "2024-03-01T10:00:00.000000"]
+
+
+def test_unparseable_timestamps_fall_back_to_the_batch_time(storage):
+    df = _processed(["2024-03-01T10:00:00", "not a time"])
+    save_to_db(df, db_conn=storage)
+    first, second = _stored(storage)
+    assert first == "2024-03-01T10:00:00.000000"
+    assert not np.isnan(pd.Timestamp(second).value)
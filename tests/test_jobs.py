@@ -0,0 +1,79 @@
+from concurrent.futures import Future
+
+import pytest
+
+from .. import jobs
+
+
+class _Executor:
+    """Records submissions instead of starting worker processes."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+        return Future()
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    pool = _Executor()
+    monkeypatch.setattr(jobs, "_executor", pool)
+    monkeypatch.setattr(jobs, "_progress", {})
+    monkeypatch.setattr(jobs, "_ensure_pool", lambda: None)
+    monkeypatch.setattr(jobs, "_jobs", jobs.OrderedDict())
+    monkeypatch.setattr(jobs, "_jobs_by_key", {})
+    return pool
+
+
+def test_same_file_joins_the_running_job(executor):
+    job_id, deduplicated = jobs.submit_job("a.csv", "abc")
+    assert not deduplicated
+    again, deduplicated = jobs.submit_job("a-copy.csv", "abc")
+    assert (again, deduplicated) == (job_id, True)
+    assert len(executor.submitted) == 1
+
+
+def test_other_files_are_separate_jobs(executor):
+    first, _ = jobs.submit_job("a.csv", "abc")
+    other, deduplicated = jobs.submit_job("b.csv", "def")
+    assert not deduplicated and first != other
+    assert len(executor.submitted) == 2
+
+
+def test_failed_job_is_resubmitted(executor):
+    job_id, _ = jobs.submit_job("a.csv", "abc")
+    jobs._jobs[job_id]["future"].set_exception(RuntimeError("boom"))
+    assert jobs.get_job(job_id)["status"] == "failed"
+    retry, deduplicated = jobs.submit_job("a.csv", "abc")
+    assert retry != job_id and not deduplicated
+
+
+def test_queue_is_bounded(executor, monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_PENDING_JOBS", 2)
+    jobs.submit_job("a.csv", "a")
+    jobs.submit_job("b.csv", "b")
+    with pytest.raises(jobs.QueueFullError):
+        jobs.submit_job("c.csv", "c")
+
+
+def test_same_file_with_other_outputs_joins_the_running_job(executor):
+    job_id, _ = jobs.submit_job("a.csv", "abc", outputs=("csv",))
+    again, deduplicated = jobs.submit_job("a.csv", "abc", outputs=("csv", "pdf"))
+    assert (again, deduplicated) == (job_id, True)
+    assert len(executor.submitted) == 1
+
+
+def test_finished_job_serves_other_outputs_lazily(executor):
+    job_id, _ = jobs.submit_job("a.csv", "abc", outputs=("csv",))
+    jobs._jobs[job_id]["future"].set_result({})
+    assert jobs.submit_job("a.csv", "abc", outputs=("pdf",)) == (job_id, True)
+    assert len(executor.submitted) == 1
+
+
+def test_incremental_run_of_the_same_file_is_a_separate_job(executor):
+    first, _ = jobs.submit_job("a.csv", "abc")
+    incremental, deduplicated = jobs.submit_job("a.csv", "abc", incremental=True)
+    assert first != incremental and not deduplicated
+    assert jobs.submit_job("a.csv", "abc", incremental=True) == (incremental, True)
@@ -0,0 +1,125 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import live
+from ..benchmark import _synthetic_measured
+from ..computation_engine import CONTEXT_ROWS, run_pipeline, save_to_db
+
+
+@pytest.fixture
+def fresh_live(storage):
+    def reset():
+        for state in (live._sensors, live._synced, live._unsynced, live._last_push):
+            state.clear()
+        live._buffer.clear()
+    reset()
+    yield storage
+    reset()
+
+
+def _saved(db_conn, sensor):
+    return [tuple(r) for r in db_conn.execute(
+        "SELECT measured, offset FROM stream_state WHERE sensor_id = ? ORDER BY position", [sensor])]
+
+
+def _readings(sensor, values):
+    return [{"sensor_id": sensor, "measured": m, "ideal": 100.0} for m in values]
+
+
+def _upload(tmp_path, sensor, seed):
+    csv_path = str(tmp_path / f"{sensor}-{seed}.csv")
+    pd.DataFrame({"measured": _synthetic_measured(50, seed=seed), "ideal": 100.0,
+                  "sensor_id": sensor}).to_csv(csv_path, index=False)
+    run_pipeline(csv_path, out_dir=str(tmp_path), outputs=(), incremental=True)
+
+
+def _stored(db_conn):
+    return db_conn.execute("SELECT measured FROM temperature_readings ORDER BY id").fetchall()
+
+
+def test_first_reading_is_seeded_from_saved_state(tmp_path, fresh_live):
+    _upload(tmp_path, "s1", seed=1)
+    reading = _readings("s1", [100.5])[0]
+    assert live.needs_context(reading)
+    live.load_context(reading)
+    assert not live.needs_context(reading)
+    assert list(live._sensors["s1"]) == _saved(fresh_live, "s1")
+
+
+def test_flush_keeps_state_a_batch_run_saved_meanwhile(tmp_path, fresh_live):
+    for reading in _readings("s1", [100.1, 100.2, 100.3]):
+        live.process_reading(reading)
+    live.flush()
+    np.testing.assert_allclose(_saved(fresh_live, "s1"),
+                               [(m, m - 100.0) for m in (100.1, 100.2, 100.3)][-CONTEXT_ROWS:])
+
+    # An incremental upload for the same sensor moves its saved state on
+    _upload(tmp_path, "s1", seed=2)
+    batch = _saved(fresh_live, "s1")
+    live_rows = [live.process_reading(r) for r in _readings("s1", [99.9, 100.4])]
+    live.flush()
+
+    expected = (batch + [(r["measured"], r["offset"]) for r in live_rows])[-CONTEXT_ROWS:]
+    np.testing.assert_allclose(_saved(fresh_live, "s1"), expected)
+    # Live readings from now on continue from the merged context too
+    np.testing.assert_allclose(list(live._sensors["s1"]), expected)
+
+
+def test_unchanged_state_is_overwritten_by_live_context(fresh_live):
+    for values, sensor in (([100.0, 100.5], "s1"), ([101.0], None)):
+        for reading in _readings(sensor, values):
+            live.process_reading(reading)
+    live.flush()
+    live.process_reading(_readings("s1", [100.7])[0])
+    live.flush()
+    np.testing.assert_allclose(_saved(fresh_live, "s1"),
+                               [(100.0, 0.0), (100.5, 0.5), (100.7, 0.7)][-CONTEXT_ROWS:])
+    assert _saved(fresh_live, "") == [(101.0, 1.0)]
+
+
+def test_failed_flush_requeues_its_rows_in_order(fresh_live, monkeypatch):
+    calls = []
+
+    def fail_once(*args, **kwargs):
+        calls.append(len(args[0]))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return save_to_db(*args, **kwargs)
+
+    monkeypatch.setattr(live, "save_to_db", fail_once)
+    for reading in _readings("s1", [100.1, 100.2]):
+        live.process_reading(reading)
+    with pytest.raises(RuntimeError):
+        live.flush()
+    live.process_reading(_readings("s1", [100.3])[0])
+    assert live.flush() == 3
+    assert _stored(fresh_live) == [(100.1,), (100.2,), (100.3,)]
+    np.testing.assert_allclose(_saved(fresh_live, "s1"),
+                               [(m, m - 100.0) for m in (100.1, 100.2, 100.3)][-CONTEXT_ROWS:])
+
+
+def test_writer_retries_until_every_row_is_written(fresh_live, monkeypatch):
+    failures = []
+
+    def fail_once(*args, **kwargs):
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("database is locked")
+        return save_to_db(*args, **kwargs)
+
+    monkeypatch.setattr(live, "save_to_db", fail_once)
+    monkeypatch.setattr(live, "FLUSH_INTERVAL", 0.01)
+    values = list(np.round(np.linspace(99, 101, 40), 2))
+    live.start()
+    try:
+        for reading in _readings("s1", values):
+            live.process_reading(reading)
+        deadline = time.monotonic() + 5
+        while len(_stored(fresh_live)) < len(values) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        live.stop()
+    assert failures and [m for (m,) in _stored(fresh_live)] == values
@@ -0,0 +1,82 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..computation_engine import load_csv, parse_timestamps, run_pipeline, run_pipeline_streaming
+from ..models import MODEL_FEATURES, get_model
+from ..synthetic import generate_calibration_frame
+
+FEATURES = ["hours_since_calibration", "duty_cycle", "days_since_calibration", "humidity"]
+
+
+def _csv(tmp_path, df, name="readings.csv"):
+    path = str(tmp_path / name)
+    df.to_csv(path, index=False)
+    return path
+
+
+def _with_features(rows, seed=0):
+    df = generate_calibration_frame(rows, sensors=2, seed=seed)
+    rng = np.random.default_rng(seed)
+    for name in FEATURES:
+        df[name] = rng.uniform(0, 50, len(df))
+    return df
+
+
+def test_missing_required_columns_are_named(tmp_path):
+    path = _csv(tmp_path, generate_calibration_frame(10).drop(columns=["measured", "ideal"]))
+    with pytest.raises(KeyError, match="measured, ideal"):
+        load_csv(path)
+
+
+def test_sensor_alias_and_unknown_columns(tmp_path):
+    df = generate_calibration_frame(10, sensors=2).rename(columns={"sensor_id": "device_id"})
+    df["operator"] = "x"
+    loaded = load_csv(_csv(tmp_path, df), models=False)
+    assert list(loaded.columns) == ["timestamp", "sensor_id", "measured", "ideal"]
+    assert loaded["sensor_id"].tolist() == df["device_id"].tolist()
+
+
+def test_offsets_are_converted_to_naive_utc(tmp_path):
+    df = generate_calibration_frame(4)
+    df["timestamp"] = ["2024-01-01T02:00:00+02:00", "2024-01-01T00:01:00Z",
+                       "2023-12-31T18:32:00-05:30", "2024-01-01T00:03:00"]
+    loaded = load_csv(_csv(tmp_path, df), models=False)
+    assert loaded["timestamp"].dt.tz is None
+    assert loaded["timestamp"].tolist() == list(pd.date_range("2024-01-01", periods=4, freq="min"))
+
+
+def test_unparseable_timestamps_keep_their_text():
+    values = pd.Series(["2024-01-01T00:00:00+01:00", "yesterday"])
+    assert parse_timestamps(values) is values
+
+
+def test_model_features_are_read_only_when_models_are_on(tmp_path):
+    path = _csv(tmp_path, _with_features(10))
+    assert not set(FEATURES) & set(load_csv(path, models=False).columns)
+    loaded = load_csv(path, models=True)
+    assert set(FEATURES) <= set(loaded.columns)
+    assert all(loaded[name].dtype == np.float64 for name in FEATURES)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_csv_with_model_features_is_scored(tmp_path, storage, streaming):
+    if not set(MODEL_FEATURES) <= {"measured", "ideal", "abs_offset", "corrected", *FEATURES}:
+        pytest.skip("CALIBRATION_MODEL_FEATURES overrides the feature set")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")   # pickles from an older scikit-learn
+        if get_model("isolation_forest") is None or get_model("anomaly_scaler") is None:
+            pytest.skip("scikit-learn models unavailable")
+    path = _csv(tmp_path, _with_features(500))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if streaming:
+            manifest = run_pipeline_streaming(path, chunksize=200, out_dir=str(tmp_path),
+                                              outputs=("csv",), models=True)[1]
+            df = pd.read_csv(manifest["csv"])
+        else:
+            df = run_pipeline(path, out_dir=str(tmp_path), outputs=(), models=True)[0]
+    assert "anomaly_score" in df.columns
+    assert df["anomaly_score"].notna().all()
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import models
+from ..computation_engine import compute_correction, tail_context
+
+
+class _Recorder:
+    """Stands in for a Keras sequence model: records windows, echoes the last row."""
+
+    def __init__(self):
+        self.windows = []
+
+    def predict_on_batch(self, x):
+        self.windows.append(x.copy())
+        return x[:, -1, :2]
+
+
+@pytest.fixture
+def sequence_models(monkeypatch):
+    identity = SimpleNamespace(mean_=np.zeros(len(models.MODEL_FEATURES)),
+                               scale_=np.ones(len(models.MODEL_FEATURES)))
+    stubs = {"drift_lstm": _Recorder(), "drift_scaler": identity,
+             "rul_cnn_lstm": _Recorder(), "rul_scaler": identity}
+    monkeypatch.setattr(models, "_loaded", {name: stubs.get(name) for name in models.MODEL_FILES})
+    return stubs
+
+
+def _frame(n, sensors=("a", "b"), seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "sensor_id": [sensors[i % len(sensors)] for i in range(n)],
+        "measured": rng.normal(25, 1, n),
+        "ideal": 25.0,
+        "hours_since_calibration": np.arange(n, dtype=float),
+        "duty_cycle": rng.random(n),
+        "days_since_calibration": np.arange(n) / 24,
+        "humidity": rng.uniform(30, 70, n),
+    })
+    df = compute_correction(df)
+    df["drift"], df["rul_days"], df["health"] = -1.0, -1.0, -1.0
+    return df
+
+
+def test_windows_follow_each_sensor_in_feature_order(sequence_models):
+    df = _frame(120)
+    out = models.apply_models(df.copy())
+
+    # 60 readings per sensor: a window ends at every position from window - 1 on
+    n_features = len(models.MODEL_FEATURES)
+    for name, window in (("drift_lstm", models.DRIFT_WINDOW_ROWS), ("rul_cnn_lstm", models.RUL_WINDOW_ROWS)):
+        windows = np.concatenate(sequence_models[name].windows)
+        assert windows.shape == (2 * (60 - window + 1), window, n_features)
+    drift_windows = np.concatenate(sequence_models["drift_lstm"].windows)
+
+    first = df[df["sensor_id"] == "a"].head(models.DRIFT_WINDOW_ROWS)
+    expected = np.column_stack([first["measured"], first["ideal"], first["offset"].abs(),
+                                first["corrected"], first["hours_since_calibration"],
+                                first["duty_cycle"], first["days_since_calibration"],
+                                first["humidity"]]).astype(np.float32)
+    np.testing.assert_array_equal(drift_windows[0], expected)
+
+    # The stubs echo the window's last row, so each prediction lands on that row
+    positions = df.groupby("sensor_id").cumcount()
+    for column, window in (("drift", models.DRIFT_WINDOW_ROWS), ("rul_days", models.RUL_WINDOW_ROWS)):
+        scored = positions >= window - 1
+        np.testing.assert_allclose(out[column][scored], df["measured"][scored].astype(np.float32))
+        assert (out[column][~scored] == -1.0).all()
+
+
+def test_windows_span_chunk_boundaries(sequence_models):
+    df = _frame(300, sensors=("a", "b", "c"), seed=1)
+    whole = models.apply_models(df.copy())
+    context, parts = None, []
+    for first in range(0, len(df), 37):
+        chunk = models.apply_models(df.iloc[first:first + 37].copy().reset_index(drop=True),
+                                    context=context)
+        context = tail_context(context, chunk, rows=models.MODEL_CONTEXT_ROWS,
+                               columns=models.model_context_columns(chunk))
+        parts.append(chunk)
+    chunked = pd.concat(parts, ignore_index=True)
+    for column in ("drift", "rul_days", "health"):
+        np.testing.assert_allclose(chunked[column], whole[column])
+
+
+def test_frame_without_a_feature_keeps_the_heuristics(sequence_models):
+    df = _frame(60).drop(columns="humidity")
+    out = models.apply_models(df.copy())
+    assert (out["drift"] == -1.0).all() and not sequence_models["drift_lstm"].windows
@@ -0,0 +1,80 @@
+import os
+
+import pandas as pd
+import pytest
+
+from .. import profiling
+from ..benchmark import _synthetic_measured
+from ..computation_engine import run_pipeline, run_pipeline_streaming
+
+COMPUTE_STAGES = ("compute_correction", "detect_anomalies", "predict_drift_and_rul",
+                  "assign_alerts_and_maintenance")
+
+
+@pytest.fixture
+def metrics(monkeypatch, tmp_path):
+    """Empty process-wide totals; cProfile dumps go to tmp_path."""
+    monkeypatch.setattr(profiling, "_stage_totals", {})
+    monkeypatch.setattr(profiling, "_stage_histograms", {})
+    monkeypatch.setattr(profiling, "_runs", {})
+    monkeypatch.setattr(profiling, "_run_seconds", 0.0)
+    monkeypatch.setattr(profiling, "_slow_dumps", 0)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path / "profiles"))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "readings.csv")
+    pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=3_000, freq="min").astype(str),
+        "sensor_id": [f"sensor-{i % 3}" for i in range(3_000)],
+        "measured": _synthetic_measured(3_000, seed=4),
+        "ideal": 100.0,
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_stages_count_the_rows_they_processed(storage, metrics, csv_path, tmp_path):
+    with profiling.profile_run("whole") as profile:
+        run_pipeline(csv_path, out_dir=str(tmp_path), outputs=("csv",), models=False)
+    timings = profile.timings
+    assert timings["status"] == "done" and timings["run_id"] == "whole"
+    stages = timings["stages"]
+    for name in ("load_csv",) + COMPUTE_STAGES + ("save_to_db", "generate_report"):
+        assert stages[name]["rows"] == 3_000 and stages[name]["calls"] == 1, name
+    assert stages["save_to_db"]["bytes_written"] > 0
+    assert stages["generate_report"]["bytes_written"] == os.path.getsize(tmp_path / "processed.csv")
+    assert sum(entry["seconds"] for entry in stages.values()) <= timings["seconds"]
+
+
+def test_chunked_stages_accumulate(storage, metrics, csv_path, tmp_path):
+    with profiling.profile_run() as profile:
+        run_pipeline_streaming(csv_path, chunksize=700, out_dir=str(tmp_path), outputs=(), models=False)
+    stages = profile.timings["stages"]
+    for name in COMPUTE_STAGES + ("save_to_db",):
+        assert stages[name]["rows"] == 3_000 and stages[name]["calls"] == 5, name
+
+
+def test_marks_outside_a_profiled_run_are_ignored(metrics):
+    profiling.stage("load_csv", rows=10)
+    profiling.count(rows=10, bytes_written=10)
+    assert profiling.current() is None and profiling._stage_totals == {}
+
+
+def test_failed_runs_are_recorded_and_exposed(metrics):
+    with pytest.raises(RuntimeError):
+        with profiling.profile_run() as profile:
+            profiling.stage("load_csv", rows=5)
+            raise RuntimeError("boom")
+    assert profile.timings["status"] == "failed"
+    text = profiling.render_metrics()
+    assert 'calibration_runs_total{status="failed"} 1' in text
+    assert 'calibration_stage_rows_total{stage="load_csv"} 5' in text
+    assert 'calibration_stage_duration_seconds_count{stage="load_csv"} 1' in text
+
+
+def test_slow_runs_keep_a_cprofile_dump(metrics):
+    with profiling.profile_run("slow", slow_seconds=0) as profile:
+        profiling.stage("load_csv")
+    assert os.path.exists(profile.timings["profile_dump"])
+    assert "calibration_slow_run_profiles_total 1" in profiling.render_metrics()
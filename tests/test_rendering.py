@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from ..rendering import decimate
+
+
+def _runs(y, width):
+    per = -(-len(y) // width)
+    return [y[start:start + per] for start in range(0, len(y), per)]
+
+
+@pytest.mark.parametrize("n", [2_001, 10_000, 99_999])
+def test_decimation_keeps_every_runs_min_and_max(n):
+    rng = np.random.default_rng(n)
+    y = rng.normal(0, 1, n)
+    y[rng.choice(n, 20, replace=False)] = rng.choice([-50.0, 50.0], 20)   # spikes
+    x = np.arange(n) * 10
+    dx, dy = decimate(x, y, width=1_000)
+    assert len(dy) <= 2_000
+    assert np.all(np.diff(dx) > 0)                  # original order, no duplicates
+    assert np.array_equal(dy, y[dx // 10])          # samples, not aggregates
+    kept = set(dy.tolist())
+    for run in _runs(y, 1_000):
+        assert run.min() in kept and run.max() in kept
+    assert dy.min() == y.min() and dy.max() == y.max()
+
+
+def test_short_series_are_unchanged():
+    x, y = np.arange(2_000), np.linspace(0, 1, 2_000)
+    dx, dy = decimate(x, y, width=1_000)
+    assert dx is x and np.array_equal(dy, y)
+
+
+def test_gaps_stay_gaps():
+    y = np.arange(10_000, dtype=float)
+    y[3_000:3_500] = np.nan
+    dx, dy = decimate(np.arange(10_000), y, width=100)
+    assert np.isnan(dy).any()
+    # No run inside the gap gets a value; runs next to it keep their own extremes
+    assert not np.isnan(dy[(dx < 3_000) | (dx >= 3_500)]).any()
+    assert {2_999.0, 3_500.0} <= set(dy[~np.isnan(dy)].tolist())
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import timeseries
+from ..benchmark import _synthetic_measured
+from ..computation_engine import (
+    MIGRATIONS, assign_alerts_and_maintenance, compute_correction, detect_anomalies,
+    predict_drift_and_rul, save_to_db,
+)
+
+ROLLUP_QUERY = "SELECT * FROM readings_rollup ORDER BY resolution, sensor_id, bucket_start"
+ROLLUP_BACKFILL = MIGRATIONS[2][1]     # 3: readings_rollup, backfilled from temperature_readings
+
+
+def _processed(timestamps, sensors=None, seed=0):
+    n = len(timestamps)
+    df = pd.DataFrame({"timestamp": timestamps, "measured": _synthetic_measured(n, seed=seed),
+                       "ideal": 100.0})
+    if sensors is not None:
+        df["sensor_id"] = sensors
+    return assign_alerts_and_maintenance(predict_drift_and_rul(detect_anomalies(compute_correction(df))))
+
+
+def _ingest(db_conn):
+    rng = np.random.default_rng(4)
+    sensors = rng.choice(["sensor-0", "sensor-1", "sensor-2"], 6_000).astype(object)
+    sensors[::50] = None
+    sensors[::70] = np.nan
+    fleet = _processed(pd.date_range("2024-01-01", periods=6_000, freq="20s").astype(str), sensors, 4)
+    single = _processed(pd.date_range("2024-01-03", periods=1_500, freq="20s").astype(str), seed=5)
+    for df in (fleet, single):
+        save_to_db(df, db_conn=db_conn, batch_size=1_000)
+
+
+def _rebuilt_rollups(db_conn):
+    incremental = pd.read_sql_query(ROLLUP_QUERY, db_conn)
+    with db_conn:
+        db_conn.execute("DELETE FROM readings_rollup")
+        db_conn.execute(ROLLUP_BACKFILL)
+    return incremental, pd.read_sql_query(ROLLUP_QUERY, db_conn)
+
+
+def test_incremental_rollups_equal_the_migration_backfill(storage):
+    _ingest(storage)
+    incremental, backfilled = _rebuilt_rollups(storage)
+    assert not incremental["sensor_id"].isin(["nan", "None"]).any()
+    pd.testing.assert_frame_equal(incremental, backfilled, check_dtype=False)
+
+
+def test_offset_timestamps_agree_between_text_and_rollups(storage):
+    # Mixed offsets in one file; all of them are 2024-01-01 09:59:30 UTC onwards
+    timestamps = ["2024-01-01T11:59:30+02:00", "2024-01-01T04:29:45-05:30", "2024-01-01T10:00:00Z",
+                  "2024-01-01T10:00:15+00:00"] * 25
+    save_to_db(_processed(timestamps), db_conn=storage)
+    stored = [row[0] for row in storage.execute("SELECT timestamp FROM temperature_readings "
+                                                 "ORDER BY id LIMIT 4")]
+    assert stored == ["2024-01-01T09:59:30.000000", "2024-01-01T09:59:45.000000",
+                      "2024-01-01T10:00:00.000000", "2024-01-01T10:00:15.000000"]
+
+    incremental, backfilled = _rebuilt_rollups(storage)
+    pd.testing.assert_frame_equal(incremental, backfilled, check_dtype=False)
+    minutes = incremental[incremental["resolution"] == 60]
+    assert list(minutes["bucket_start"]) == [pd.Timestamp("2024-01-01 09:59", tz="UTC").value // 10**9,
+                                             pd.Timestamp("2024-01-01 10:00", tz="UTC").value // 10**9]
+    assert list(minutes["drift_n"]) == [50, 50]
+
+
+@pytest.mark.parametrize("limit, source", [(100_000, "raw"), (1_000, "rollup_3600")])
+def test_chart_source_follows_the_raw_point_limit(storage, monkeypatch, limit, source):
+    _ingest(storage)
+    monkeypatch.setattr(timeseries, "RAW_POINT_LIMIT", limit)
+    series = timeseries.chart_series("drift", start="2024-01-01", end="2024-01-04", width=400,
+                                     db_conn=storage)
+    assert series["source"] == source
+    assert 0 < len(series["t"]) <= 400
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..benchmark import _synthetic_measured
+from ..computation_engine import (
+    assign_alerts_and_maintenance, compute_correction, detect_anomalies, predict_drift_and_rul,
+)
+from ..rules import ALERT_RULES, MAINTENANCE_RULES, evaluate_rules, evaluate_rules_row
+
+
+def _reference_alerts(df, min_val=95, max_val=105):
+    # The per-row loop the rule tables replaced
+    alerts, maint = [], []
+    for _, row in df.iterrows():
+        if row["measured"] < min_val or row["measured"] > max_val:
+            alerts.append("CRITICAL")
+        elif row["anomaly"] != "Normal":
+            alerts.append("WARNING")
+        else:
+            alerts.append("NORMAL")
+        if row["health"] < 50 or row["rul_days"] < 7:
+            maint.append("Recalibrate within 1 week")
+        elif row["health"] < 70:
+            maint.append("Monitor closely, recalibrate soon")
+        else:
+            maint.append("No action needed")
+    return alerts, maint
+
+
+def _processed(n, seed):
+    df = pd.DataFrame({"measured": _synthetic_measured(n, seed=seed), "ideal": 100.0})
+    # Wide offsets so every maintenance tier shows up; NaN health must fall through
+    df.loc[df.index[::7], "ideal"] = 97.0
+    df = predict_drift_and_rul(detect_anomalies(compute_correction(df)))
+    df.loc[df.index[::11], "health"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_rule_tables_match_the_row_loop(seed):
+    df = _processed(5_000, seed)
+    alerts, maint = _reference_alerts(df)
+    df = assign_alerts_and_maintenance(df)
+    assert list(df["alert"].astype(str)) == alerts
+    assert list(df["maintenance"].astype(str)) == maint
+    assert set(maint) == {"Recalibrate within 1 week", "Monitor closely, recalibrate soon",
+                          "No action needed"}
+
+
+def test_thresholds_are_passed_through():
+    df = _processed(2_000, 2)
+    alerts, _ = _reference_alerts(df, 99, 101)
+    assert list(assign_alerts_and_maintenance(df, min_val=99, max_val=101)["alert"].astype(str)) == alerts
+
+
+def test_unknown_operator_is_rejected():
+    table = {"rules": [("CRITICAL", [("measured", "~", "max_val")])], "default": "NORMAL"}
+    with pytest.raises(ValueError, match="operator"):
+        evaluate_rules(pd.DataFrame({"measured": [1.0]}), table)
+
+
+@pytest.mark.parametrize("table", [ALERT_RULES, MAINTENANCE_RULES])
+@pytest.mark.parametrize("thresholds", [None, {"min_val": 99, "max_val": 101, "health_warning": 90}])
+def test_row_evaluation_matches_the_columns(table, thresholds):
+    df = _processed(3_000, 3)
+    df["anomaly"] = df["anomaly"].astype(str)
+    rows = df.to_dict(orient="records")
+    expected = list(evaluate_rules(df, table, thresholds).astype(str))
+    assert [evaluate_rules_row(row, table, thresholds) for row in rows] == expected
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import db
+from ..benchmark import _synthetic_measured
+from ..computation_engine import (
+    classify_anomalies, init_storage, predict_drift_and_rul, run_per_sensor,
+    run_pipeline, run_pipeline_streaming,
+)
+
+STORED_TABLES = {
+    "temperature_readings": "SELECT * FROM temperature_readings ORDER BY id",
+    "readings_rollup": "SELECT * FROM readings_rollup ORDER BY resolution, sensor_id, bucket_start",
+    "summary_stats": "SELECT * FROM summary_stats ORDER BY scope, key",
+    "summary_counts": "SELECT * FROM summary_counts ORDER BY scope, key, field, label",
+}
+
+
+def _stored(db_path, run):
+    db.close()
+    init_storage(str(db_path))
+    try:
+        run()
+        return {name: db.read_frame(sql) for name, sql in STORED_TABLES.items()}
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("chunksize", [997, 10_000])
+def test_streaming_stores_what_the_in_memory_run_stores(tmp_path, reports, chunksize):
+    csv_path = str(tmp_path / "readings.csv")
+    pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=12_000, freq="min").astype(str),
+        "sensor_id": np.random.default_rng(5).choice(["a", "b", "c", "d"], 12_000),
+        "measured": _synthetic_measured(12_000, seed=5),
+        "ideal": 100.0,
+    }).to_csv(csv_path, index=False)
+    whole = _stored(tmp_path / "whole.db",
+                    lambda: run_pipeline(csv_path, out_dir=str(reports), outputs=()))
+    chunked = _stored(tmp_path / "chunked.db",
+                      lambda: run_pipeline_streaming(csv_path, chunksize=chunksize,
+                                                     out_dir=str(reports), outputs=()))
+    for name in STORED_TABLES:
+        pd.testing.assert_frame_equal(chunked[name], whole[name], obj=name)
+
+
+def test_drift_is_the_per_sensor_rolling_mean():
+    rng = np.random.default_rng(0)
+    offset = rng.normal(0, 1, 5_000)
+    offset[rng.random(5_000) < 0.05] = np.nan
+    df = pd.DataFrame({"sensor_id": rng.choice(["a", "b", "c"], 5_000), "offset": offset})
+    expected = df.groupby("sensor_id")["offset"].transform(lambda s: s.rolling(3, min_periods=1).mean())
+    drift = predict_drift_and_rul(df.copy())["drift"]
+    np.testing.assert_allclose(drift, expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_anomalies_never_compare_across_sensors():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({"sensor_id": rng.choice(["a", "b"], 2_000),
+                       "measured": np.round(rng.normal(100, 2, 2_000), 1)})
+    expected = df.groupby("sensor_id")["measured"].transform(
+        lambda s: pd.Series(classify_anomalies(s.values), index=s.index))
+    codes = run_per_sensor(classify_anomalies, df["measured"].values, df["sensor_id"].values)
+    np.testing.assert_array_equal(codes, expected.values)
+
+
+def test_drift_of_a_single_series_is_the_rolling_mean():
+    offset = pd.Series(np.random.default_rng(1).normal(0, 1, 1_000))
+    drift = predict_drift_and_rul(pd.DataFrame({"offset": offset}))["drift"]
+    np.testing.assert_allclose(drift, offset.rolling(3, min_periods=1).mean(), rtol=1e-9, atol=1e-12)
+
+
+def test_drift_continues_across_chunks():
+    offset = np.random.default_rng(2).normal(0, 1, 100)
+    whole = predict_drift_and_rul(pd.DataFrame({"offset": offset}))["drift"].values
+    context = pd.DataFrame({"offset": offset[:60]})
+    tail = predict_drift_and_rul(pd.DataFrame({"offset": offset[60:]}), context=context)["drift"].values
+    np.testing.assert_allclose(tail, whole[60:], rtol=1e-9, atol=1e-12)
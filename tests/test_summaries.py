@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from .. import db
+from ..computation_engine import MIGRATIONS, get_summary, process_frame, save_to_db
+from ..synthetic import generate_calibration_frame
+
+SUMMARY_QUERIES = {
+    "summary_stats": "SELECT * FROM summary_stats ORDER BY scope, key",
+    "summary_counts": "SELECT * FROM summary_counts ORDER BY scope, key, field, label",
+}
+SUMMARY_BACKFILL = MIGRATIONS[7][2:]   # 8: summary tables, backfilled from temperature_readings
+
+
+def _ingest(db_conn):
+    fleet = process_frame(generate_calibration_frame(6_000, sensors=3, jitter=0.2, seed=4), models=False)
+    fleet["sensor_id"] = fleet["sensor_id"].astype(object)
+    fleet.loc[fleet.index[::50], "sensor_id"] = None
+    # A later upload overlapping the same days, and a sensorless file
+    late = process_frame(generate_calibration_frame(2_000, sensors=2, start="2024-01-03", seed=6),
+                         models=False)
+    single = process_frame(generate_calibration_frame(1_500, start="2024-01-02", seed=5), models=False)
+    for df in (fleet, late, single):
+        save_to_db(df, db_conn=db_conn, batch_size=700)
+
+
+def _summaries(db_conn):
+    return {name: db.read_frame(sql, (), db_conn) for name, sql in SUMMARY_QUERIES.items()}
+
+
+def test_incremental_summaries_equal_the_migration_backfill(storage):
+    _ingest(storage)
+    incremental = _summaries(storage)
+    with storage:
+        for name in SUMMARY_QUERIES:
+            storage.execute(f"DELETE FROM {name}")
+        for statement in SUMMARY_BACKFILL:
+            storage.execute(statement)
+    backfilled = _summaries(storage)
+    assert (incremental["summary_stats"]["key"] == "").any()
+    # SQL's SUM over no drift values is NULL where the running total stays 0
+    for frames in (incremental, backfilled):
+        stats = frames["summary_stats"]
+        stats.loc[stats["drift_n"] == 0, "drift_sum"] = np.nan
+    for name in SUMMARY_QUERIES:
+        pd.testing.assert_frame_equal(incremental[name], backfilled[name], check_dtype=False, rtol=1e-9)
+
+
+def test_summary_totals_match_the_stored_readings(storage):
+    _ingest(storage)
+    readings = db.read_frame("SELECT * FROM temperature_readings", (), storage)
+    summary = get_summary(db_conn=storage)
+    assert summary["fleet"]["readings"] == len(readings)
+    assert summary["fleet"]["alerts"] == readings["alert"].value_counts().to_dict()
+    assert summary["sensor_count"] == readings["sensor_id"].fillna("").nunique()
+    by_sensor = {entry["sensor_id"] or "": entry["readings"] for entry in summary["sensors"]}
+    assert by_sensor == readings["sensor_id"].fillna("").value_counts().to_dict()
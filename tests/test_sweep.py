@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from .. import db
+from ..computation_engine import (
+    ANOMALY_LABELS, assign_alerts_and_maintenance, compute_correction, detect_anomalies,
+    predict_drift_and_rul, save_to_db,
+)
+from ..rules import ALERT_RULES, MAINTENANCE_RULES, table_categories
+from ..sweep import SWEEP_DEFAULTS, expand_grid, sweep_thresholds
+from ..synthetic import generate_calibration_frame
+
+GRID = {"min_val": [94, 95, 96], "spike_threshold": [1.5, 2.5], "health_warning": [60, 80]}
+
+
+@pytest.fixture
+def stored(storage):
+    df = generate_calibration_frame(6_000, sensors=3, spike_rate=0.02, stuck_rate=0.01,
+                                    noise_rate=0.02, out_of_range_rate=0.01, jitter=0.3, seed=6)
+    save_to_db(assign_alerts_and_maintenance(predict_drift_and_rul(detect_anomalies(compute_correction(df)))),
+               db_conn=storage)
+    return db.read_frame("SELECT * FROM temperature_readings ORDER BY id")
+
+
+def _pipeline_labels(stored, config):
+    """The batch pipeline's labels for the stored readings under `config`."""
+    config = {**SWEEP_DEFAULTS, **config}
+    df = stored[["sensor_id", "measured", "drift", "rul_days", "health"]].copy()
+    df = detect_anomalies(df, min_val=config["min_val"], max_val=config["max_val"],
+                          spike_threshold=config["spike_threshold"])
+    return assign_alerts_and_maintenance(df, min_val=config["min_val"], max_val=config["max_val"],
+                                         thresholds=config)
+
+
+def _counts(labels, categories):
+    counts = pd.Series(labels).astype(str).value_counts()
+    return {label: int(counts.get(label, 0)) for label in categories}
+
+
+def _matrix(base, labels, categories):
+    table = pd.crosstab(pd.Series(base, dtype=str), pd.Series(labels, dtype=str))
+    return {b: {label: int(table.at[b, label]) if b in table.index and label in table.columns else 0
+                for label in categories} for b in categories}
+
+
+@pytest.mark.parametrize("chunk_rows", [997, 100_000])
+def test_sweep_matches_the_pipeline_for_every_config(stored, chunk_rows):
+    configs = expand_grid(GRID)
+    result = sweep_thresholds(configs, chunk_rows=chunk_rows)
+    assert result["rows"] == len(stored) and len(result["configs"]) == len(configs)
+    categories = {"alert": table_categories(ALERT_RULES), "maintenance": table_categories(MAINTENANCE_RULES)}
+    for config, entry in zip(configs, result["configs"]):
+        expected = _pipeline_labels(stored, config)
+        assert entry["anomaly"] == _counts(expected["anomaly"], ANOMALY_LABELS), config
+        for name in ("alert", "maintenance"):
+            assert entry[name] == _counts(expected[name], categories[name]), (config, name)
+            confusion = entry[f"{name}_confusion"]
+            assert confusion["matrix"] == _matrix(stored[name], expected[name], categories[name])
+            assert confusion["unmatched"] == 0
+
+
+def test_reference_config_is_the_baseline(stored):
+    configs = expand_grid(GRID)
+    result = sweep_thresholds(configs, reference=3, chunk_rows=1_500)
+    reference = _pipeline_labels(stored, configs[3])
+    assert result["configs"][3]["alert_confusion"]["agreement"] == 1.0
+    for config, entry in zip(configs, result["configs"]):
+        expected = _pipeline_labels(stored, config)
+        assert entry["alert_confusion"]["matrix"] == _matrix(
+            reference["alert"], expected["alert"], table_categories(ALERT_RULES))
+
+
+def test_sensor_and_time_filters_limit_the_rows(stored):
+    start, end = "2024-01-01T10:00:00", "2024-01-02T00:00:00"
+    result = sweep_thresholds([{}], sensor_id="sensor-1", start=start, end=end)
+    subset = stored[(stored["sensor_id"] == "sensor-1") & (stored["timestamp"] >= start)
+                    & (stored["timestamp"] < end)].reset_index(drop=True)
+    assert result["rows"] == len(subset) > 0
+    # Each sensor's series restarts at `start`
+    expected = _pipeline_labels(subset, {})
+    assert result["configs"][0]["anomaly"] == _counts(expected["anomaly"], ANOMALY_LABELS)
+    assert result["configs"][0]["alert_confusion"]["matrix"] == _matrix(
+        subset["alert"], expected["alert"], table_categories(ALERT_RULES))
+
+
+@pytest.mark.parametrize("configs, message", [
+    ([], "no threshold"),
+    ([{"min_value": 90}], "unknown thresholds"),
+    ([{"min_val": "low"}], "must be numbers"),
+])
+def test_invalid_configs_are_rejected(configs, message):
+    with pytest.raises(ValueError, match=message):
+        sweep_thresholds(configs)
@@ -0,0 +1,91 @@
+import gzip
+import hashlib
+import os
+
+import pytest
+
+from ..synthetic import generate_calibration_frame
+from ..upload_stream import UploadRejected, UploadSink
+
+CSV = generate_calibration_frame(2_000, sensors=2, seed=1).to_csv(index=False).encode()
+
+
+def _feed(sink, data, piece=7_000):
+    for start in range(0, len(data), piece):
+        sink.write(data[start:start + piece])
+    return sink.close()
+
+
+@pytest.fixture
+def part(tmp_path):
+    return str(tmp_path / "upload.part")
+
+
+@pytest.mark.parametrize("encode", [
+    lambda data: data,
+    gzip.compress,
+    # Concatenated members, as written by `cat a.gz b.gz` or pigz
+    lambda data: gzip.compress(data[:10_000]) + gzip.compress(data[10_000:]),
+], ids=["plain", "gzip", "gzip-members"])
+def test_uploads_are_stored_and_hashed_as_plain_csv(part, encode):
+    sink = UploadSink(part)
+    assert _feed(sink, encode(CSV)) == hashlib.sha256(CSV).hexdigest()
+    assert open(part, "rb").read() == CSV
+    assert sink.size == len(CSV)
+
+
+def test_zstd_uploads_are_decoded(part):
+    zstandard = pytest.importorskip("zstandard")
+    sink = UploadSink(part)
+    assert _feed(sink, zstandard.ZstdCompressor().compress(CSV)) == hashlib.sha256(CSV).hexdigest()
+    assert open(part, "rb").read() == CSV
+
+
+def test_zstd_without_zstandard_is_unsupported(part):
+    try:
+        import zstandard  # noqa: F401
+        pytest.skip("zstandard is installed")
+    except ImportError:
+        pass
+    with pytest.raises(UploadRejected) as rejected:
+        UploadSink(part).write(b"\x28\xb5\x2f\xfd" + b"\0" * 16)
+    assert rejected.value.status_code == 415
+
+
+def test_uploads_over_the_limit_are_refused(part):
+    with pytest.raises(UploadRejected) as rejected:
+        _feed(UploadSink(part, max_bytes=len(CSV) - 1), CSV)
+    assert rejected.value.status_code == 413
+
+
+def test_decompressed_size_counts_against_the_limit(part):
+    # A small gzip that inflates past the limit is stopped while decoding
+    data = gzip.compress(CSV)
+    limit = len(CSV) // 2
+    assert len(data) < limit
+    sink = UploadSink(part, max_bytes=limit)
+    with pytest.raises(UploadRejected) as rejected:
+        _feed(sink, data)
+    assert rejected.value.status_code == 413 and sink.size <= limit + 1024 * 1024
+
+
+@pytest.mark.parametrize("encode", [lambda data: data, gzip.compress], ids=["plain", "gzip"])
+def test_header_without_required_columns_is_refused_from_the_first_piece(part, encode):
+    bad = CSV.replace(b"measured", b"reading", 1)
+    sink = UploadSink(part)
+    with pytest.raises(UploadRejected, match="measured") as rejected:
+        # The first piece holds the header; the rest is never needed
+        sink.write(encode(bad)[:4_096])
+    assert rejected.value.status_code == 400
+    sink.discard()
+    assert not os.path.exists(part)
+
+
+@pytest.mark.parametrize("data, message", [
+    (gzip.compress(CSV)[:-20], "truncated gzip"),
+    (gzip.compress(CSV)[:10] + b"\xff" * 200, "corrupt gzip"),
+], ids=["truncated", "corrupt"])
+def test_broken_gzip_is_refused(part, data, message):
+    with pytest.raises(UploadRejected, match=message) as rejected:
+        _feed(UploadSink(part), data)
+    assert rejected.value.status_code == 400
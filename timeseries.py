@@ -0,0 +1,212 @@
+"""
+Downsampled chart series over temperature_readings.
+
+Charts ask for a metric over a time window at a given pixel width and get
+back at most ~width points. Small windows are read from the raw table;
+wider ones from readings_rollup (per-minute/hour/day count/min/max/sum
+buckets kept current by save_to_db), so zooming out over months of data
+only touches a few thousand rollup rows. Windows reaching back past the
+last history compaction (archive.py) are always served from rollups,
+which keep covering archived readings.
+
+Two reductions are offered:
+- "minmax": per-pixel min, max and mean, so spikes never disappear
+- "lttb": Largest-Triangle-Three-Buckets, a single line that keeps the
+  visual shape of the series
+"""
+import numpy as np
+import pandas as pd
+
+from . import db
+from .archive import archived_until
+from .computation_engine import ROLLUP_METRICS, ROLLUP_RESOLUTIONS, SENSOR_COLUMN
+
+CHART_METHODS = ("minmax", "lttb")
+# Raw rows are used while the window holds at most this many readings
+RAW_POINT_LIMIT = 50_000
+# Rollup resolution is chosen so a window yields at most width * this many buckets
+ROLLUP_OVERSAMPLE = 4
+MAX_CHART_WIDTH = 10_000
+
+
+def minmax_buckets(t, mins, maxs, sums, counts, start, end, n_buckets):
+    """
+    Reduce sorted samples into n_buckets equal-width time buckets.
+    Raw readings pass mins = maxs = sums = values and counts = 1; rollup
+    rows pass their per-bucket aggregates, which combine exactly.
+    :return: dict of bucket start times (epoch s) and min / max / avg arrays,
+             empty buckets dropped
+    """
+    span = max(end - start, 1)
+    idx = np.clip(((t - start) * n_buckets // span).astype(np.int64), 0, n_buckets - 1)
+    if not len(idx):
+        return {"t": idx, "min": mins, "max": maxs, "avg": sums}
+    first = np.flatnonzero(np.r_[True, idx[1:] != idx[:-1]])
+    n = np.add.reduceat(counts, first)
+    return {
+        "t": start + idx[first] * span / n_buckets,
+        "min": np.fmin.reduceat(mins, first),
+        "max": np.fmax.reduceat(maxs, first),
+        "avg": np.add.reduceat(sums, first) / n,
+    }
+
+
+def lttb(t, v, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a sorted series.
+    :return: (t, v) with at most `threshold` points, first and last kept
+    """
+    n = len(t)
+    if threshold >= n or threshold < 3:
+        return t, v
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_t = t[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else t[-1]
+        avg_v = v[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else v[-1]
+        area = np.abs((t[a] - avg_t) * (v[lo:hi] - v[a]) - (t[a] - t[lo:hi]) * (avg_v - v[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return t[keep], v[keep]
+
+
+def _iso(epoch):
+    return pd.Timestamp(epoch, unit="s").strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def _epoch(value):
+    return None if value is None else pd.Timestamp(value).value / 10**9
+
+
+def _default_bounds(db_conn, sensor_id):
+    # Both ends come straight off the timestamp index
+    where, params = "", []
+    if sensor_id is not None:
+        where, params = " WHERE sensor_id = ?", [str(sensor_id)]
+    first = db.query_one(f"SELECT timestamp FROM temperature_readings{where} "
+                         "ORDER BY timestamp LIMIT 1", params, db_conn)
+    last = db.query_one(f"SELECT timestamp FROM temperature_readings{where} "
+                        "ORDER BY timestamp DESC LIMIT 1", params, db_conn)
+    first = _epoch(first[0]) if first else None
+    last = _epoch(last[0]) if last else None
+    if _archived_until(db_conn) is not None:
+        # Archived readings are gone from the raw table but not from the rollups
+        resolution = ROLLUP_RESOLUTIONS[0]
+        oldest, newest = db.query_one(
+            "SELECT MIN(bucket_start), MAX(bucket_start) FROM readings_rollup WHERE resolution = ?"
+            + (" AND sensor_id = ?" if sensor_id is not None else ""),
+            [resolution] + params, db_conn)
+        if oldest is not None:
+            first = oldest if first is None else min(first, oldest)
+            newest += resolution
+            last = newest if last is None else max(last, newest)
+    return first, last
+
+
+def _archived_until(db_conn):
+    cutoff = archived_until(db_conn)
+    return _epoch(cutoff) if cutoff else None
+
+
+def _raw_filter(start, end, sensor_id):
+    where, params = ["timestamp >= ?", "timestamp <= ?"], [_iso(start), _iso(end)]
+    if sensor_id is not None:
+        where.append("sensor_id = ?")
+        params.append(str(sensor_id))
+    return " WHERE " + " AND ".join(where), params
+
+
+def _read_raw(db_conn, metric, start, end, sensor_id):
+    where, params = _raw_filter(start, end, sensor_id)
+    df = db.read_frame(
+        f"SELECT timestamp, {metric} AS v FROM temperature_readings{where} "
+        f"AND {metric} IS NOT NULL ORDER BY timestamp", params, db_conn)
+    t = pd.to_datetime(df["timestamp"], errors="coerce", format="ISO8601")
+    valid = t.notna().values
+    t = t.values[valid].astype("datetime64[ms]").astype(np.int64) / 1000.0
+    v = df["v"].values[valid].astype(float)
+    return t, v, v, v, np.ones(len(v))
+
+
+def _read_rollup(db_conn, metric, start, end, sensor_id, resolution):
+    # Without a sensor filter, buckets are combined across the fleet
+    where = "resolution = ? AND bucket_start >= ? AND bucket_start <= ?"
+    params = [resolution, int(start // resolution * resolution), int(end)]
+    if sensor_id is not None:
+        where += " AND sensor_id = ?"
+        params.append(str(sensor_id))
+    rows = db.query(
+        f"SELECT bucket_start, SUM({metric}_n), MIN({metric}_min), MAX({metric}_max), "
+        f"SUM({metric}_sum) FROM readings_rollup WHERE {where} AND {metric}_n > 0 "
+        "GROUP BY bucket_start ORDER BY bucket_start", params, db_conn)
+    data = np.array(rows, dtype=float).reshape(-1, 5)
+    return data[:, 0], data[:, 2], data[:, 3], data[:, 4], data[:, 1]
+
+
+def _pick_resolution(start, end, width):
+    for resolution in ROLLUP_RESOLUTIONS:
+        if (end - start) / resolution <= width * ROLLUP_OVERSAMPLE:
+            return resolution
+    return ROLLUP_RESOLUTIONS[-1]
+
+
+def chart_series(metric, start=None, end=None, width=800, sensor_id=None,
+                 method="minmax", db_conn=None):
+    """
+    Downsampled series of `metric` (drift, rul_days or health) for a chart
+    `width` pixels wide.
+    :param start, end: window bounds (anything pd.Timestamp accepts);
+                       default to the first/last stored reading
+    :param sensor_id: only this sensor; otherwise all sensors combined
+    :param method: "minmax" -> t/min/max/avg per pixel, "lttb" -> t/v line
+    :return: dict with the series (t in epoch milliseconds) and its source
+             ("raw" or "rollup_<seconds>")
+    """
+    if metric not in ROLLUP_METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; expected one of {ROLLUP_METRICS}")
+    if method not in CHART_METHODS:
+        raise ValueError(f"Unknown method {method!r}; expected one of {CHART_METHODS}")
+    width = max(1, min(int(width), MAX_CHART_WIDTH))
+
+    start, end = _epoch(start), _epoch(end)
+    if start is None or end is None:
+        first, last = _default_bounds(db_conn, sensor_id)
+        start = first if start is None else start
+        end = last if end is None else end
+
+    result = {"metric": metric, "method": method, "width": width,
+              SENSOR_COLUMN: sensor_id, "source": "raw", "t": []}
+    if start is None or end is None or end < start:
+        return result
+
+    archived = _archived_until(db_conn)
+    raw = archived is None or start >= archived
+    if raw:
+        # Bounded probe: counting stops past RAW_POINT_LIMIT, so a zoomed-out
+        # window costs the same however many readings it spans
+        where, params = _raw_filter(start, end, sensor_id)
+        raw = db.query_one(f"SELECT COUNT(*) FROM (SELECT 1 FROM temperature_readings{where} LIMIT ?)",
+                           params + [RAW_POINT_LIMIT + 1], db_conn)[0] <= RAW_POINT_LIMIT
+    if raw:
+        series = _read_raw(db_conn, metric, start, end, sensor_id)
+    else:
+        resolution = _pick_resolution(start, end, width)
+        result["source"] = f"rollup_{resolution}"
+        series = _read_rollup(db_conn, metric, start, end, sensor_id, resolution)
+
+    t, mins, maxs, sums, counts = series
+    if method == "minmax":
+        buckets = minmax_buckets(t, mins, maxs, sums, counts, start, end, width)
+        result.update({k: buckets[k].tolist() for k in ("min", "max", "avg")})
+        t = buckets["t"]
+    else:
+        # Rollup rows carry the bucket mean as the line's value
+        t, v = lttb(t, sums / counts, width)
+        result["v"] = v.tolist()
+    result.update(start=start * 1000, end=end * 1000, t=(np.asarray(t) * 1000).tolist())
+    return result
@@ -0,0 +1,171 @@
+"""
+Streaming decode of CSV uploads: plain, gzip or zstd (by magic bytes).
+
+UploadSink is fed the request body piece by piece and writes the plain CSV
+to disk, hashing it and checking its header on the way, so duplicate
+uploads are recognised by content whatever their encoding and bad or
+oversized uploads are refused before they are received in full. Its
+methods block on decompression and file I/O; the API calls them from a
+thread pool.
+"""
+import io
+import os
+import zlib
+import hashlib
+
+from .computation_engine import csv_header, resolve_input_columns
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Applies to the bytes received and to the (decompressed) CSV
+MAX_UPLOAD_BYTES = int(os.environ.get("CALIBRATION_MAX_UPLOAD_BYTES", 4 * 1024 ** 3))
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_INPUT_BYTES = 64 * 1024   # zstd can't cap its output size; feed it small slices
+
+
+class UploadRejected(Exception):
+    """Upload refused while it streams in; carries the HTTP status."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _Plain:
+    def feed(self, data):
+        yield data
+
+    def finish(self):
+        pass
+
+
+class _Gunzip:
+    """Incremental gzip decoding in UPLOAD_CHUNK_BYTES pieces; concatenated members are joined."""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._fed = False
+
+    def feed(self, data):
+        try:
+            while data:
+                self._fed = True
+                yield self._inflater.decompress(data, UPLOAD_CHUNK_BYTES)
+                data = self._inflater.unconsumed_tail
+                if self._inflater.eof:
+                    data = self._inflater.unused_data
+                    self._reset()
+        except zlib.error as e:
+            raise ValueError(f"corrupt gzip data: {e}") from None
+
+    def finish(self):
+        if self._fed:
+            raise ValueError("truncated gzip data")
+
+
+class _Unzstd:
+    def __init__(self):
+        try:
+            import zstandard
+        except ImportError:
+            raise UploadRejected(415, "zstd uploads need the zstandard package: pip install zstandard") from None
+        self._error = zstandard.ZstdError
+        self._inflater = zstandard.ZstdDecompressor().decompressobj()
+
+    def feed(self, data):
+        try:
+            for start in range(0, len(data), ZSTD_INPUT_BYTES):
+                yield self._inflater.decompress(data[start:start + ZSTD_INPUT_BYTES])
+        except self._error as e:
+            raise ValueError(f"corrupt zstd data: {e}") from None
+
+    def finish(self):
+        pass
+
+
+def upload_decoder(head):
+    """Decoder for an upload starting with `head`: gzip and zstd by magic bytes, else plain."""
+    if head.startswith(GZIP_MAGIC):
+        return _Gunzip()
+    if head.startswith(ZSTD_MAGIC):
+        return _Unzstd()
+    return _Plain()
+
+
+class UploadSink:
+    """
+    Writes an upload to `path` as plain CSV while it streams in: gzip/zstd
+    is decompressed on the fly, the CSV bytes are hashed, and the header is
+    checked as soon as its line is complete. Problems raise UploadRejected
+    as early as possible, so bad uploads are not received in full.
+    """
+
+    def __init__(self, path, max_bytes=MAX_UPLOAD_BYTES):
+        self.path, self.max_bytes = path, max_bytes
+        self.received = self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = open(path, "wb")
+        self._decoder = None
+        self._prefix = b""    # raw bytes until the format is known
+        self._header = b""    # CSV bytes until the header is checked, then None
+
+    def write(self, data):
+        self.received += len(data)
+        if self.received > self.max_bytes:
+            raise UploadRejected(413, f"Upload exceeds {self.max_bytes:,} bytes")
+        if self._decoder is None:
+            self._prefix += data
+            if len(self._prefix) < len(ZSTD_MAGIC):
+                return
+            self._decoder = upload_decoder(self._prefix)
+            data, self._prefix = self._prefix, b""
+        self._decode(data)
+
+    def _decode(self, data):
+        try:
+            for piece in self._decoder.feed(data):
+                self._write_csv(piece)
+        except ValueError as e:
+            raise UploadRejected(400, f"Unreadable CSV: {e}") from None
+
+    def _write_csv(self, piece):
+        self.size += len(piece)
+        if self.size > self.max_bytes:
+            raise UploadRejected(413, f"CSV exceeds {self.max_bytes:,} bytes")
+        if self._header is not None:
+            self._header += piece
+            if b"\n" in self._header:
+                self._check_header()
+        self._digest.update(piece)
+        self._file.write(piece)
+
+    def _check_header(self):
+        line, self._header = self._header.split(b"\n", 1)[0], None
+        try:
+            resolve_input_columns(csv_header(io.BytesIO(line)))
+        except KeyError as e:
+            raise UploadRejected(400, f"CSV is missing required column: {e}") from None
+        except ValueError as e:
+            raise UploadRejected(400, f"Unreadable CSV: {e}") from None
+
+    def close(self):
+        """Flush the end of the upload; :return: sha256 hex digest of the CSV."""
+        if self._decoder is None:   # shorter than any magic number
+            self._decoder = upload_decoder(self._prefix)
+            self._decode(self._prefix)
+        try:
+            self._decoder.finish()
+        except ValueError as e:
+            raise UploadRejected(400, f"Unreadable CSV: {e}") from None
+        if self._header is not None:
+            self._check_header()
+        self._file.close()
+        return self._digest.hexdigest()
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)